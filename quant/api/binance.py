@@ -2,8 +2,12 @@
 # coding=utf-8
 
 import hashlib
-import requests
+import json
+import logging
+import os
+import threading
 import time
+from . import http_pool
 from .binance_exceptions import BinanceAPIException
 from .binance_validation import validate_order
 from urllib import urlencode
@@ -19,25 +23,28 @@ class Client(object):
     WEBSITE_URL = 'https://www.binance.com'
     API_VERSION = 'v1'
 
+    # products所有Client共用, 一个进程只加载一次
     _products = None
+    _products_lock = threading.Lock()
 
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, products_cache_file=None, products_cache_ttl=0):
 
         self.API_KEY = api_key
         self.API_SECRET = api_secret
-        self.session = self._init_session()
+        self.products_cache_file = products_cache_file
+        self.products_cache_ttl = products_cache_ttl
+        self.headers = self._init_headers()
 
         # init DNS and SSL cert
         self.ping()
-        self.get_products()
+        self.load_products()
 
-    def _init_session(self):
+    def _init_headers(self):
 
-        session = requests.session()
-        session.headers.update({'Accept': 'application/json',
-                                'User-Agent': 'binance/python',
-                                'X-MBX-APIKEY': self.API_KEY})
-        return session
+        # 连接走共用的http_pool, 每个client只带自己的header
+        return {'Accept': 'application/json',
+                'User-Agent': 'binance/python',
+                'X-MBX-APIKEY': self.API_KEY}
 
     def _create_api_uri(self, path):
         return self.API_URL + '/' + self.API_VERSION + '/' + path
@@ -68,7 +75,7 @@ class Client(object):
             kwargs['params'] = kwargs['data']
             del (kwargs['data'])
 
-        response = getattr(self.session, method)(uri, **kwargs)
+        response = http_pool.request(method, uri, headers=self.headers, **kwargs)
         return self._handle_response(response)
 
     def _request_website(self, method, path, **kwargs):
@@ -83,7 +90,7 @@ class Client(object):
             kwargs['params'] = kwargs['data']
             del (kwargs['data'])
 
-        response = getattr(self.session, method)(uri, **kwargs)
+        response = http_pool.request(method, uri, headers=self.headers, **kwargs)
         return self._handle_response(response)
 
     def _handle_response(self, response):
@@ -113,11 +120,55 @@ class Client(object):
         :param products:
         :return:
         """
-        self._products = {}
+        parsed = {}
         if 'data' in products:
             products = products['data']
         for p in products:
-            self._products[p['symbol']] = p
+            parsed[p['symbol']] = p
+        Client._products = parsed
+
+    def _read_products_cache(self):
+        if not self.products_cache_file or not os.path.exists(self.products_cache_file):
+            return None
+        try:
+            with open(self.products_cache_file, 'r') as f:
+                cache = json.load(f)
+        except (IOError, ValueError) as e:
+            logging.warn('binance products cache %s is broken: %s' % (self.products_cache_file, e))
+            return None
+        if time.time() - cache.get('time', 0) > self.products_cache_ttl:
+            return None
+        return cache.get('products')
+
+    def _write_products_cache(self, products):
+        if not self.products_cache_file:
+            return
+        try:
+            directory = os.path.dirname(self.products_cache_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp_file = self.products_cache_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({'time': time.time(), 'products': products}, f)
+            os.rename(tmp_file, self.products_cache_file)
+        except (IOError, OSError) as e:
+            logging.warn('write binance products cache %s failed: %s' % (self.products_cache_file, e))
+
+    def load_products(self):
+        """
+        下单校验用的products, 已经加载过直接返回;
+        否则先读本地缓存(products_cache_ttl秒内有效), 没有再请求接口并写缓存
+        """
+        with Client._products_lock:
+            if Client._products is not None:
+                return Client._products
+
+            products = self._read_products_cache()
+            if products is not None:
+                self._parse_products(products)
+            else:
+                self._write_products_cache(self.get_products())
+            return Client._products
 
     # Website Endpoints
 
@@ -361,3 +412,18 @@ class Client(object):
         :return:
         """
         return self._delete('userDataStream', False, data=params)
+
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(api_key=None, api_secret=None, **kwargs):
+    """同一个api key共用一个Client, 不用每个交易对都ping和拉取products"""
+    key = (api_key, api_secret)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = Client(api_key, api_secret, **kwargs)
+            _shared_clients[key] = client
+    return client
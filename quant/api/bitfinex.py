@@ -1,6 +1,7 @@
 # coding=utf-8
 from __future__ import absolute_import
 import requests
+from . import http_pool
 import json
 import base64
 import hmac
@@ -105,7 +106,7 @@ class PublicClient(object):
         """
         return self._get(self.url_for(PATH_LENDBOOK, path_arg=currency, parameters=parameters))
 
-    def depth(self, symbol, parameters=None):
+    def depth(self, symbol, parameters=None, limit=5):
         """
         curl "https://api.bitfinex.com/v1/book/btcusd"
         {"bids":[{"price":"561.1101","amount":"0.985","timestamp":"1395557729.0"}],"asks":[{"price":"562.9999","amount":"0.985","timestamp":"1395557711.0"}]}
@@ -121,8 +122,8 @@ class PublicClient(object):
         """
         if not parameters:
             parameters = {
-                'limit_bids': 5,
-                'limit_asks': 5
+                'limit_bids': limit,
+                'limit_asks': limit
             }
         return self._get(self.url_for(PATH_ORDERBOOK, path_arg=symbol, parameters=parameters))
         # data = self._get(self.url_for(PATH_ORDERBOOK, path_arg=symbol, parameters=parameters))
@@ -147,7 +148,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url):
         try:
-            resp = requests.get(url, timeout=TIMEOUT)
+            resp = http_pool.get(url, timeout=TIMEOUT)
         except requests.exceptions.RequestException as e:
             raise e
         else:
@@ -197,7 +198,7 @@ class PrivateClient(PublicClient):
     @classmethod
     def _post(cls, url, headers):
         try:
-            resp = requests.post(url, headers=headers, verify=True)
+            resp = http_pool.post(url, headers=headers, verify=True)
         except requests.exceptions.RequestException as e:
             raise e
         else:
@@ -1,5 +1,7 @@
 import requests
 
+from . import http_pool
+
 
 class PublicClient(object):
     """
@@ -16,7 +18,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            response = requests.get(url, timeout=5, params=params)
+            response = http_pool.get(url, timeout=5, params=params)
         except requests.exceptions.RequestException as e:
             print('bitflyer get' + url + ' failed: ' + str(e))
         else:
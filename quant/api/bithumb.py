@@ -10,7 +10,7 @@ import urllib
 import requests
 import time
 
-import pycurl
+from . import http_pool
 
 
 class PublicClient(object):
@@ -28,7 +28,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            response = requests.get(url, timeout=5, params=params)
+            response = http_pool.get(url, timeout=5, params=params)
         except requests.exceptions.RequestException as e:
             print('bithumb get' + url + ' failed: ' + str(e))
         else:
@@ -44,7 +44,7 @@ class PublicClient(object):
 
         return self._get(url)
 
-    def depth(self, currency):
+    def depth(self, currency, count=5):
         """
         这里的currency指的是market_currency, base_currency为krw
         https://api.bithumb.com/public/orderbook/eth
@@ -79,7 +79,7 @@ class PublicClient(object):
         url = self._build_for(path)
 
         params = {
-            'count': 5
+            'count': count
         }
         return self._get(url, params)
 
@@ -91,9 +91,6 @@ class PrivateClient(PublicClient):
         self._secret = api_secret
         self.contents = ''
 
-    def http_body_callback(self, buf):
-        self.contents = buf
-
     @classmethod
     def micro_time(cls, get_as_float=False):
         if get_as_float:
@@ -140,24 +137,16 @@ class PrivateClient(PublicClient):
         utf8_api_sign = api_sign.decode('utf-8')
 
         # Connects to Bithumb API server and returns JSON result value.
-        curl_handle = pycurl.Curl()
-        curl_handle.setopt(pycurl.POST, 1)
-        # vervose mode :: 1 => True, 0 => False
-        curl_handle.setopt(pycurl.VERBOSE, 0)
-        curl_handle.setopt(pycurl.POSTFIELDS, e_uri_data)
-
         url = self.base_url + endpoint
-        curl_handle.setopt(curl_handle.URL, url)
-        curl_handle.setopt(curl_handle.HTTPHEADER,
-                           ['Api-Key: ' + self._key, 'Api-Sign: ' + utf8_api_sign, 'Api-Nonce: ' + nonce])
-        curl_handle.setopt(curl_handle.WRITEFUNCTION, self.http_body_callback)
-        curl_handle.perform()
-
-        # Get http response status code. Just for test
-        # response_code = curl_handle.getinfo(pycurl.RESPONSE_CODE)
-        # print(self.contents)
+        headers = {
+            'Api-Key': self._key,
+            'Api-Sign': utf8_api_sign,
+            'Api-Nonce': nonce,
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        response = http_pool.post(url, data=e_uri_data, headers=headers)
 
-        curl_handle.close()
+        self.contents = response.content
         if self.contents:
             try:
                 return json.loads(self.contents)
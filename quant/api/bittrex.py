@@ -21,6 +21,8 @@ else:
 
 import requests
 
+from . import http_pool
+
 BUY_ORDERBOOK = 'buy'
 SELL_ORDERBOOK = 'sell'
 BOTH_ORDERBOOK = 'both'
@@ -61,7 +63,7 @@ def encrypt(api_key, api_secret, export=True, export_fn='secrets.json'):
 
 
 def using_requests(request_url, apisign):
-    return requests.get(
+    return http_pool.get(
         request_url,
         headers={"apisign": apisign}
     ).json()
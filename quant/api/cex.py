@@ -5,6 +5,8 @@ import time
 
 import requests
 
+from . import http_pool
+
 BASE_URL = 'https://cex.io/api'
 TIMEOUT = 5
 
@@ -16,14 +18,14 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            resp = requests.get(url=url, params=params, timeout=TIMEOUT)
+            resp = http_pool.get(url=url, params=params, timeout=TIMEOUT)
         except requests.exceptions.RequestException as e:
             print("cex get %s failed: " % url + str(e))
         else:
             if resp.status_code == requests.codes.ok:
                 return resp.json()
 
-    def depth(self, symbol):
+    def depth(self, symbol, depth=5):
         """
         api返回的ask是降序排列，需要转换一下
         {
@@ -44,7 +46,7 @@ class PublicClient(object):
         """
         url = self.url + ("/order_book/%s/" % symbol)
         params = {
-            'depth': 5
+            'depth': depth
         }
         resp = self._get(url=url, params=params)
         return resp
@@ -107,7 +109,7 @@ class PrivateClient(PublicClient):
         })
 
         try:
-            resp = requests.post(url=url, data=params, timeout=5)
+            resp = http_pool.post(url=url, data=params, timeout=5)
         except requests.RequestException as e:
             print("cex post %s failed: " % url + str(e))
         else:
@@ -5,6 +5,8 @@ import hmac
 import urllib
 
 import requests
+
+from . import http_pool
 import time
 
 BASE_URL = "http://data.gate.io/api2/1"
@@ -19,7 +21,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            response = requests.get(url, timeout=5, params=params)
+            response = http_pool.get(url, timeout=5, params=params)
         except requests.exceptions.RequestException as e:
             print('gateio get' + url + ' failed: ' + str(e))
         else:
@@ -57,7 +59,7 @@ class PrivateClient(PublicClient):
                    "Key": self._api_key,
                    "Sign": self.__signature(params)}
         try:
-            resp = requests.post(url, data=params, headers=headers)
+            resp = http_pool.post(url, data=params, headers=headers)
         except requests.exceptions.RequestException as e:
             print('gateio post' + ' failed: ' + str(e))
         else:
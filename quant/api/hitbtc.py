@@ -2,6 +2,8 @@
 # -*- coding: UTF-8 -*-
 import requests
 
+from . import http_pool
+
 BASE_URL = 'https://api.hitbtc.com/api/1'
 TIMEOUT = 5
 
@@ -39,7 +41,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            resp = requests.get(url, timeout=TIMEOUT, params=params)
+            resp = http_pool.get(url, timeout=TIMEOUT, params=params)
         except requests.exceptions.RequestException as e:
             raise e
         else:
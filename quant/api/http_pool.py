@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+所有交易所client共用的http连接池, 每个host一个keep-alive的requests.Session,
+轮询depth时复用已经建立的TCP/TLS连接, 不用每次请求都握手.
+
+    http_pool.get(url, params=params, timeout=5)
+    http_pool.post(url, data=params, headers=headers)
+    http_pool.get_stats()  # 每个host的请求数/新建连接数/复用次数
+
+    with http_pool.deadline(3):  # 这个线程里的请求3秒内必须结束, 每个请求的timeout不超过剩余时间
+        market.ask_update_depth()
+
+    with http_pool.raise_throttled():  # 这个线程里的请求遇到429/418/5xx时抛HttpStatusError
+        market.update_depth()
+"""
+
+import contextlib
+import logging
+import threading
+import time
+from urlparse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from quant import config
+
+_local = threading.local()
+
+# 被限频或者服务端出错, 调度器要比普通错误退避得更狠
+THROTTLE_STATUS_CODES = (418, 429)
+
+
+def is_throttled(status_code):
+    return status_code is not None and (status_code in THROTTLE_STATUS_CODES or status_code >= 500)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class HttpStatusError(Exception):
+    """
+    raise_throttled()里遇到429/418/5xx时抛出.
+    不是RequestException, 各交易所client里的except不会把它变成None, 能带着status_code传到Market.on_depth_failed
+    """
+
+    def __init__(self, response):
+        super(HttpStatusError, self).__init__('http status %s: %s' % (response.status_code, response.url))
+        self.response = response
+        self.status_code = response.status_code
+
+
+@contextlib.contextmanager
+def raise_throttled():
+    """拉取depth时使用, 大部分client对非200只返回None, 调度器看不到status code"""
+    old = getattr(_local, 'raise_throttled', False)
+    _local.raise_throttled = True
+    try:
+        yield
+    finally:
+        _local.raise_throttled = old
+
+
+@contextlib.contextmanager
+def deadline_at(timestamp):
+    """当前线程里的请求最晚在timestamp结束, 可以嵌套, 取更早的那个"""
+    old = get_deadline()
+    _local.deadline = timestamp if old is None else min(old, timestamp)
+    try:
+        yield
+    finally:
+        _local.deadline = old
+
+
+def deadline(seconds):
+    return deadline_at(time.time() + seconds)
+
+
+def get_deadline():
+    return getattr(_local, 'deadline', None)
+
+
+def clamp_timeout(timeout, remaining):
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if x is None else min(x, remaining) for x in timeout)
+    return min(timeout, remaining)
+
+
+class HttpPool(object):
+    def __init__(self, pool_maxsize=None, pool_block=None):
+        self.pool_maxsize = pool_maxsize if pool_maxsize else config.HTTP_POOL_MAXSIZE
+        self.pool_block = pool_block if pool_block is not None else config.HTTP_POOL_BLOCK
+        self.sessions = {}
+        self.adapters = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_host(cls, url):
+        parsed = urlparse(url)
+        return "%s://%s" % (parsed.scheme, parsed.netloc)
+
+    def get_session(self, url):
+        host = self.get_host(url)
+        session = self.sessions.get(host)
+        if session:
+            return session
+
+        with self.lock:
+            session = self.sessions.get(host)
+            if not session:
+                # 一个host一个session, 连接池大小是同时打到这个host的请求数
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                      pool_block=self.pool_block)
+                session = requests.Session()
+                session.mount(host, adapter)
+                self.adapters[host] = adapter
+                self.sessions[host] = session
+                logging.debug("http pool: new session for %s" % host)
+        return session
+
+    def request(self, method, url, **kwargs):
+        timestamp = get_deadline()
+        if timestamp is not None:
+            remaining = timestamp - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded("deadline exceeded before %s %s" % (method, url))
+            # requests的timeout是连接和每次读的超时, 不是总时间, 这里按剩余时间收紧
+            kwargs['timeout'] = clamp_timeout(kwargs.get('timeout'), remaining)
+        response = self.get_session(url).request(method, url, **kwargs)
+        if getattr(_local, 'raise_throttled', False) and is_throttled(response.status_code):
+            raise HttpStatusError(response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        """
+        {host: {'requests': 请求数, 'connections': 新建的连接数, 'reused': 复用连接的请求数}}
+        connections一直涨说明连接没有被复用, 每次请求都在握手
+        """
+        stats = {}
+        for host, adapter in list(self.adapters.items()):
+            requests_count = 0
+            connections = 0
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+            stats[host] = {'requests': requests_count,
+                           'connections': connections,
+                           'reused': max(requests_count - connections, 0)}
+        return stats
+
+    def log_stats(self):
+        for host, stat in sorted(self.get_stats().items()):
+            logging.debug("http pool %s: requests=%s connections=%s reused=%s" % (
+                host, stat['requests'], stat['connections'], stat['reused']))
+
+
+_pool = HttpPool()
+
+
+def request(method, url, **kwargs):
+    return _pool.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return _pool.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return _pool.post(url, **kwargs)
+
+
+def get_stats():
+    return _pool.get_stats()
+
+
+def log_stats():
+    _pool.log_stats()
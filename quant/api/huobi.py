@@ -7,6 +7,8 @@ import urllib
 import urlparse
 
 import requests
+
+from . import http_pool
 import json
 import datetime
 
@@ -79,7 +81,7 @@ class PublicClient(object):
             headers = EXTRA_PUBLIC_HEADERS
         data = urllib.urlencode(params)
         try:
-            resp = requests.get(url, data, headers=headers, timeout=TIMEOUT)
+            resp = http_pool.get(url, params=data, headers=headers, timeout=TIMEOUT)
         except Exception as e:
             raise e
         else:
@@ -101,7 +103,7 @@ class PrivateClient(PublicClient):
             headers = EXTRA_POST_HEADERS
         data = json.dumps(params)
         try:
-            resp = requests.post(url, data, headers=headers, timeout=TIMEOUT)
+            resp = http_pool.post(url, data=data, headers=headers, timeout=TIMEOUT)
         except Exception as e:
             raise e
         else:
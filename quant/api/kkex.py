@@ -4,6 +4,8 @@ from urllib import urlencode
 from urlparse import urljoin
 
 import requests
+
+from . import http_pool
 from hashlib import md5
 
 BASE_URL = 'https://kkex.com/api/v1'
@@ -43,7 +45,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            resp = requests.get(url, timeout=TIMEOUT, params=params)
+            resp = http_pool.get(url, timeout=TIMEOUT, params=params)
         except requests.exceptions.RequestException as e:
             raise e
         else:
@@ -81,7 +83,7 @@ class PrivateClient(PublicClient):
 
         url = urljoin(self.api_root, path)
         try:
-            resp = requests.post(url, data=params, timeout=5)
+            resp = http_pool.post(url, data=params, timeout=5)
         except requests.exceptions.RequestException as e:
             raise e
         else:
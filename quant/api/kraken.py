@@ -2,6 +2,8 @@
 # -*- coding: UTF-8 -*-
 import requests
 
+from . import http_pool
+
 
 class PublicClient(object):
     def __init__(self):
@@ -14,7 +16,7 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            response = requests.get(url, timeout=5, params=params)
+            response = http_pool.get(url, timeout=5, params=params)
         except requests.exceptions.RequestException as e:
             print('kraken get' + url + ' failed: ' + str(e))
         else:
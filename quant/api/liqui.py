@@ -7,6 +7,8 @@ from urllib import urlencode
 
 import requests
 
+from . import http_pool
+
 PROTOCOL = "https"
 HOST = "api.liqui.io/api"
 VERSION = "3"
@@ -27,17 +29,26 @@ class PublicClient(object):
     @classmethod
     def _get(cls, url, params=None):
         try:
-            response = requests.get(url, timeout=5, params=params)
+            response = http_pool.get(url, timeout=5, params=params)
         except requests.exceptions.RequestException as e:
             print('liqui get' + url + ' failed: ' + str(e))
         else:
             if response.status_code == requests.codes.ok:
                 return response.json()
 
-    def depth(self, symbol):
+    def depth(self, symbol, limit=5):
         path = 'depth/%s' % symbol
         params = {
-            'limit': 5
+            'limit': limit
+        }
+        return self._get(url_for(path), params)
+
+    def depths(self, symbols, limit=5):
+        """一次请求多个交易对, 返回{symbol: depth}, 无效的交易对忽略"""
+        path = 'depth/%s' % '-'.join(symbols)
+        params = {
+            'limit': limit,
+            'ignore_invalid': 1
         }
         return self._get(url_for(path), params)
     
@@ -70,7 +81,7 @@ class PrivateClient(PublicClient):
                    "Key": self._api_key,
                    "Sign": self.__sign(params)}
         try:
-            resp = requests.post('https://api.liqui.io/tapi', data=params, headers=headers)
+            resp = http_pool.post('https://api.liqui.io/tapi', data=params, headers=headers)
         except requests.exceptions.RequestException as e:
             print('liqui post' + ' failed: ' + str(e))
         else:
@@ -2,24 +2,137 @@
 # Copyright (C) 2017, Philsong <songbohr@gmail.com>
 from __future__ import division
 
+import threading
 import time
 
 import logging
 from quant import config
-from quant.common import constant
+from quant.common import constant, pair_registry
 from .broker import Broker
-from quant.api.binance import Client
+from .account_stream import AccountStream
+from quant.api import binance
 from quant.api.binance_enums import *
 
+# user data stream, 地址后面接listenKey
+STREAM_URL = 'wss://stream.binance.com:9443/ws/'
+# listenKey 60分钟不续期就失效
+KEEPALIVE_INTERVAL = 30 * 60
+
+
+class BinanceAccountStream(AccountStream):
+    """
+    user data stream: 用REST接口拿listenKey, 连接后不需要登录, 订单变化推送executionReport.
+    后台线程每30分钟续期一次listenKey. 续期失败, 断线(24小时后服务端会断开)或者收到listenKeyExpired时,
+    重新申请listenKey, 用新的地址重连
+    """
+
+    def __init__(self, broker):
+        super(BinanceAccountStream, self).__init__(broker)
+        self.listen_key = None
+        self.keepalive_thread = None
+        self.stopped = False
+        # 同一时间只有一个线程在换listenKey
+        self.renew_lock = threading.Lock()
+
+    def get_url(self):
+        if self.listen_key is None:
+            self.listen_key = self.client.stream_get_listen_key()
+        return STREAM_URL + self.listen_key
+
+    def start(self):
+        self.stopped = False
+        super(BinanceAccountStream, self).start()
+        if self.keepalive_thread is None:
+            self.keepalive_thread = threading.Thread(target=self.keepalive, name='keepalive-%s' % self.name)
+            self.keepalive_thread.daemon = True
+            self.keepalive_thread.start()
+
+    def stop(self):
+        self.stopped = True
+        super(BinanceAccountStream, self).stop()
+
+    def keepalive(self):
+        while not self.stopped:
+            time.sleep(KEEPALIVE_INTERVAL)
+            listen_key = self.listen_key
+            if listen_key is None:
+                continue
+            try:
+                self.client.stream_keepalive(listenKey=listen_key)
+            except Exception as e:
+                logging.warn("%s listen key keepalive failed: %s" % (self.name, e))
+                self.renew('keepalive failed')
+
+    def renew(self, reason):
+        """旧的listenKey不再可用, 断开旧连接, 重新申请listenKey后连接新的地址, 申请失败时退避重试"""
+        if not self.renew_lock.acquire(False):
+            return
+        try:
+            logging.warn("%s renew listen key: %s" % (self.name, reason))
+            self.ready = False
+            self.listen_key = None
+            super(BinanceAccountStream, self).stop()
+            delay = config.STREAM_RECONNECT_DELAY
+            while not self.stopped:
+                try:
+                    super(BinanceAccountStream, self).start()
+                    return
+                except Exception as e:
+                    logging.warn("%s get listen key failed: %s, retry in %ss" % (self.name, e, delay))
+                    time.sleep(delay)
+                    delay = min(delay * 2, config.STREAM_MAX_RECONNECT_DELAY)
+        finally:
+            self.renew_lock.release()
+
+    def renew_async(self, reason):
+        """在连接的收消息线程里触发, 换连接要在别的线程里做"""
+        thread = threading.Thread(target=self.renew, args=(reason,), name='renew-%s' % self.name)
+        thread.daemon = True
+        thread.start()
+
+    def on_connected(self, connection):
+        super(BinanceAccountStream, self).on_connected(connection)
+        self.set_ready()
+
+    def on_disconnected(self):
+        super(BinanceAccountStream, self).on_disconnected()
+        if not self.stopped:
+            self.renew_async('disconnected')
+
+    def handle_message(self, message):
+        if message.get('e') == 'listenKeyExpired':
+            self.renew_async('listen key expired')
+            return
+        if message.get('e') != 'executionReport':
+            return
+        order = Binance._order_status({
+            'orderId': message['i'],
+            'origQty': message['q'],
+            'price': message['p'],
+            'executedQty': message['z'],
+            'symbol': message['s'],
+            'side': message['S'],
+            'status': message['X'],
+        })
+        # 累计成交额(Z)有的时候用成交均价, 否则和REST一样用委托价
+        if 'Z' in message and order['deal_amount'] > 0:
+            order['avg_price'] = float(message['Z']) / order['deal_amount']
+        self.on_order(order)
+
 
 class Binance(Broker):
+    account_stream_class = BinanceAccountStream
+
     def __init__(self, pair_code, api_key=None, api_secret=None):
         base_currency, market_currency = self.get_available_pairs(pair_code)
         super(Binance, self).__init__(base_currency, market_currency, pair_code)
 
-        self.client = Client(
+        # 同一个api key的broker共用一个client
+        self.client = binance.get_shared_client(
             api_key if api_key else config.Binance_API_KEY,
-            api_secret if api_secret else config.Binance_SECRET_TOKEN)
+            api_secret if api_secret else config.Binance_SECRET_TOKEN,
+            products_cache_file=config.BINANCE_PRODUCTS_CACHE_FILE,
+            products_cache_ttl=config.BINANCE_PRODUCTS_CACHE_TTL)
 
     def _place_order(self, amount, price, side):
         order = self.client.create_order(
@@ -143,55 +256,4 @@ class Binance(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        """可交易的pair"""
-        if pair_code == 'BCCBTC':
-            base_currency = 'BTC'
-            market_currency = 'BCC'
-        elif pair_code == 'ETHBTC':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        elif pair_code == 'BNBBTC':
-            base_currency = 'BTC'
-            market_currency = 'BNB'
-        elif pair_code == 'BNBETH':
-            base_currency = 'ETH'
-            market_currency = 'BNB'
-        elif pair_code == 'MCOBTC':
-            base_currency = 'BTC'
-            market_currency = 'MCO'
-        elif pair_code == 'MCOETH':
-            base_currency = 'ETH'
-            market_currency = 'MCO'
-        elif pair_code == 'QTUMBTC':
-            base_currency = 'BTC'
-            market_currency = 'QTUM'
-        elif pair_code == 'QTUMETH':
-            base_currency = 'ETH'
-            market_currency = 'QTUM'
-        elif pair_code == 'WTCBTC':
-            base_currency = 'BTC'
-            market_currency = 'WTC'
-        elif pair_code == 'WTCETH':
-            base_currency = 'ETH'
-            market_currency = 'WTC'
-        elif pair_code == 'NEOBTC':
-            base_currency = 'BTC'
-            market_currency = 'NEO'
-        elif pair_code == 'NEOETH':
-            base_currency = 'ETH'
-            market_currency = 'NEO'
-        elif pair_code == 'IOTAETH':
-            base_currency = 'ETH'
-            market_currency = 'IOTA'
-        elif pair_code == 'IOTABTC':
-            base_currency = 'BTC'
-            market_currency = 'IOTA'
-        elif pair_code == 'ZRXBTC':
-            base_currency = 'BTC'
-            market_currency = 'ZRX'
-        elif pair_code == 'ZRXETH':
-            base_currency = 'ETH'
-            market_currency = 'ZRX'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_BINANCE, pair_code)
@@ -3,16 +3,83 @@
 
 from __future__ import division
 
+import hashlib
+import hmac
+import time
+
 from quant import config
 from .broker import Broker
+from .account_stream import AccountStream
 from quant.api.bitfinex import PrivateClient as BfxClient
-from quant.common import constant
+from quant.common import constant, pair_registry
 import logging
 
 
 # python -m quant.cli -m Bitfinex_BCH_BTC get-balance
 
+# v2 websocket, 和盘口推送是同一个地址, 共用连接
+STREAM_URL = 'wss://api.bitfinex.com/ws/2'
+
+
+class BitfinexAccountStream(AccountStream):
+    """
+    v2 authenticated channel(chanId 0), 只订阅trading:
+        os: 登录后推送当前所有未完成订单
+        on/ou/oc: 下单/更新/结束(成交或撤销), 每条是一个订单数组
+    """
+    url = STREAM_URL
+
+    def get_login_messages(self):
+        nonce = str(int(time.time() * 1000000))
+        payload = 'AUTH' + nonce
+        signature = hmac.new(self.client.SECRET.encode('utf8'), payload.encode('utf8'), hashlib.sha384).hexdigest()
+        return [{'event': 'auth', 'apiKey': self.client.KEY, 'authSig': signature, 'authPayload': payload,
+                 'authNonce': nonce, 'filter': ['trading']}]
+
+    def handle_message(self, message):
+        if isinstance(message, dict):
+            if message.get('event') == 'auth':
+                if message.get('status') == 'OK':
+                    self.set_ready()
+                else:
+                    logging.error("%s account stream auth failed: %s" % (self.name, message.get('msg')))
+            return
+
+        if message[0] != 0 or len(message) < 3:
+            return
+        event, data = message[1], message[2]
+        if event == 'os':
+            orders = [self.to_order_status(x, False) for x in data]
+            self.store.forget_pending([x['order_id'] for x in orders])
+            for order in orders:
+                self.on_order(order)
+        elif event in ('on', 'ou', 'oc'):
+            self.on_order(self.to_order_status(data, event == 'oc'))
+
+    @classmethod
+    def to_order_status(cls, data, is_closed):
+        """
+        v2订单数组转成和get_order一样的格式:
+        [ID, GID, CID, SYMBOL, MTS_CREATE, MTS_UPDATE, AMOUNT, AMOUNT_ORIG, TYPE, TYPE_PREV, _, _, FLAGS, STATUS,
+         _, _, PRICE, PRICE_AVG, ...]
+        AMOUNT是剩余数量, 卖单为负
+        """
+        amount = abs(data[7])
+        deal_amount = amount - abs(data[6])
+        return Bitfinex._order_status({
+            'id': data[0],
+            'original_amount': amount,
+            'price': data[16],
+            'executed_amount': deal_amount,
+            'avg_execution_price': data[17] or 0,
+            'symbol': data[3][1:].lower(),
+            'is_cancelled': is_closed and deal_amount < amount,
+        })
+
+
 class Bitfinex(Broker):
+    account_stream_class = BitfinexAccountStream
+
     def __init__(self, pair_code, api_key=None, api_secret=None):
         base_currency, market_currency = self.get_available_pairs(pair_code)
 
@@ -221,64 +288,7 @@ class Bitfinex(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        """可交易的pair"""
-        if pair_code == 'ethusd':
-            base_currency = 'USD'
-            market_currency = 'ETH'
-        elif pair_code == 'ethbtc':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        elif pair_code == 'btcusd':
-            base_currency = 'USD'
-            market_currency = 'BTC'
-        elif pair_code == 'bt1usd':
-            base_currency = 'USD'
-            market_currency = 'BT1'
-        elif pair_code == 'bt2usd':
-            base_currency = 'USD'
-            market_currency = 'BT2'
-        elif pair_code == 'bt1btc':
-            base_currency = 'BTC'
-            market_currency = 'BT1'
-        elif pair_code == 'bt2btc':
-            base_currency = 'BTC'
-            market_currency = 'BT2'
-        elif pair_code == 'bchusd':
-            base_currency = 'USD'
-            market_currency = 'BCH'
-        elif pair_code == 'bchbtc':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        elif pair_code == 'zecusd':
-            base_currency = 'USD'
-            market_currency = 'ZEC'
-        elif pair_code == 'neousd':
-            base_currency = 'USD'
-            market_currency = 'NEO'
-        elif pair_code == 'neobtc':
-            base_currency = 'BTC'
-            market_currency = 'NEO'
-        elif pair_code == 'neoeth':
-            base_currency = 'ETH'
-            market_currency = 'NEO'
-        elif pair_code == 'ioteth':
-            base_currency = 'ETH'
-            market_currency = 'IOT'
-        elif pair_code == 'iotbtc':
-            base_currency = 'BTC'
-            market_currency = 'IOT'
-        elif pair_code == 'iotusd':
-            base_currency = 'USD'
-            market_currency = 'IOT'
-        elif pair_code == 'zrxeth':
-            base_currency = 'ETH'
-            market_currency = 'ZRX'
-        elif pair_code == 'zrxbtc':
-            base_currency = 'BTC'
-            market_currency = 'ZRX'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_BFX, pair_code)
 
     def get_min_stock(self):
         resp = self.client.symbols_details()
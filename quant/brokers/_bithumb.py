@@ -6,10 +6,12 @@ from __future__ import division
 import logging
 
 from quant import config
-from quant.common import constant
+from quant.common import constant, pair_registry, rate_limiter
 from .broker import Broker
 from quant.api.bithumb import PrivateClient as BtbClient
 
+MESSAGE_TRY_AGAIN = 'Please try again'
+
 
 class Bithumb(Broker):
     """
@@ -238,6 +240,38 @@ class Bithumb(Broker):
         else:
             return None, error_obj
 
+    def poll_orders(self, orders):
+        """
+        get_order返回(order, error), 已成交的订单查询不到(error不是Please try again),
+        这时用order_detail的成交量当作已成交
+        """
+        results = {}
+        for order_id, order_type in orders:
+            res = self.get_order(order_id, order_type)
+            if not res:
+                continue
+            order, error = res
+            if order:
+                results[str(order_id)] = order
+                continue
+            if not error.get('message') or MESSAGE_TRY_AGAIN in error['message']:
+                continue
+            if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+                continue
+            try:
+                deal_amount, error = self.get_deal_amount(order_id, order_type)
+            except Exception as e:
+                logging.warn('%s get deal amount %s failed: %s' % (self.name, order_id, e))
+                continue
+            if deal_amount is None or MESSAGE_TRY_AGAIN in error.get('message', ''):
+                continue
+            results[str(order_id)] = {
+                'order_id': order_id,
+                'deal_amount': deal_amount,
+                'status': constant.ORDER_STATE_CLOSED
+            }
+        return results
+
     def _cancel_order(self, order_id, order_type=None):
         res = self.client.cancel_order(order_id, self.pair_code, order_type)
         # error_msg = ''
@@ -294,16 +328,4 @@ class Bithumb(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        """可交易的pair"""
-        if pair_code == 'eth':
-            base_currency = 'KRW'
-            market_currency = 'ETH'
-        elif pair_code == 'btc':
-            base_currency = 'KRW'
-            market_currency = 'btc'
-        elif pair_code == 'bch':
-            base_currency = 'KRW'
-            market_currency = 'BCH'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_BITHUMB, pair_code)
@@ -3,6 +3,7 @@ from quant import config
 from quant.api import bittrex
 from .broker import Broker
 import logging
+from quant.common import constant, pair_registry
 
 
 # python3 xrypto/cli.py -m Bittrex_BCH_BTC get-balance
@@ -21,15 +22,7 @@ class Bittrex(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'BTC-BCC':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        elif pair_code == 'BTC-ZEC':
-            base_currency = 'BTC'
-            market_currency = 'ZEC'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_BITTREX, pair_code)
 
     def _buy_limit(self, amount, price):
         """Create a buy limit order"""
@@ -4,6 +4,7 @@ from quant import config
 from .broker import Broker
 from quant.api.gate import PrivateClient as GateClient
 import logging
+from quant.common import constant, pair_registry
 
 
 # python -m quant.cli -m Bitfinex_BCH_BTC get-balance
@@ -22,16 +23,7 @@ class Gate(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        """可交易的pair"""
-        if pair_code == 'bcc_btc':
-            base_currency = 'btc'
-            market_currency = 'bcc'
-        elif pair_code == 'bcc_eth':
-            base_currency = 'eth'
-            market_currency = 'bcc'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_GATE, pair_code)
 
     def _buy_limit(self, amount, price):
         """
@@ -1,12 +1,14 @@
 # Copyright (C) 2017, Philsong <songbohr@gmail.com>
 from quant import config
-from quant.common import constant
+from quant.common import constant, pair_registry
 from .broker import Broker
 import logging
 from quant.api.kkex import PrivateClient
 
 
 class Kkex(Broker):
+    batch_orders = True
+
     def __init__(self, pair_code, api_key=None, api_secret=None):
 
         base_currency, market_currency = self.get_available_pairs(pair_code)
@@ -19,15 +21,7 @@ class Kkex(Broker):
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'BCHBTC':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        elif pair_code == 'ETHBTC':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_KKEX, pair_code)
 
     def _buy_limit(self, amount, price):
         """Create a buy limit order"""
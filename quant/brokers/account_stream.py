@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+账户的websocket推送, 订单状态一变化就写进交易所的OrderStore, 不用轮询get_order.
+config.ACCOUNT_STREAMS里的交易所在创建broker时启动, 同一个交易所只启动一个.
+连接复用markets.streaming_market的StreamConnection(断线重连), 同一个url和盘口推送共用连接.
+
+子类需要实现:
+    get_url(): 连接地址
+    get_login_messages(): 连接成功后发送的登录/订阅消息
+    handle_message(msg): 解析消息, 订单状态用on_order写进OrderStore, 登录成功后设置ready
+"""
+
+import logging
+import threading
+
+from quant.markets import streaming_market
+from . import order_store
+
+
+class AccountStream(object):
+    url = None
+
+    def __init__(self, broker):
+        self.name = broker.name
+        self.client = broker.client
+        self.store = order_store.get_store(broker.name)
+        self.connection = None
+        # 登录成功, 推送的订单状态可信
+        self.ready = False
+        self.stats = {'orders': 0, 'reconnects': 0}
+
+    def get_url(self):
+        return self.url
+
+    def get_login_messages(self):
+        return []
+
+    def handle_message(self, message):
+        raise NotImplementedError("%s.handle_message(self, message)" % self.__class__.__name__)
+
+    def start(self):
+        if self.connection is None:
+            self.connection = streaming_market.get_connection(self.get_url())
+            self.connection.subscribe(self)
+
+    def stop(self):
+        connection = self.connection
+        if connection:
+            self.connection = None
+            connection.unsubscribe(self)
+
+    def is_ready(self):
+        return self.ready and self.connection is not None and self.connection.ws is not None
+
+    def set_ready(self):
+        self.ready = True
+        logging.info("%s account stream ready" % self.name)
+
+    def on_connected(self, connection):
+        self.ready = False
+        # 断开期间的事件收不到, 未完成订单的状态不再可信
+        self.store.forget_pending()
+        for message in self.get_login_messages():
+            connection.send(message)
+
+    def on_disconnected(self):
+        self.ready = False
+        self.stats['reconnects'] += 1
+
+    def on_message(self, message):
+        try:
+            self.handle_message(message)
+        except Exception as e:
+            logging.warn("%s account stream handle message failed: %s" % (self.name, e))
+
+    def on_order(self, order):
+        self.stats['orders'] += 1
+        self.store.update(order)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['ready'] = self.is_ready()
+        return stats
+
+
+_streams = {}
+_lock = threading.Lock()
+
+
+def get_stream(broker):
+    """同一个交易所的broker共用一个账户推送, 第一次调用时启动"""
+    with _lock:
+        stream = _streams.get(broker.name)
+        if stream is None:
+            stream = broker.account_stream_class(broker)
+            _streams[broker.name] = stream
+    stream.start()
+    return stream
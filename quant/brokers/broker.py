@@ -1,3 +1,4 @@
+# -*- coding: UTF-8 -*-
 # Copyright (C) 2017, Philsong <songbohr@gmail.com>
 
 import logging
@@ -6,6 +7,9 @@ import inspect
 import time
 
 from quant import config
+from quant.common import rate_limiter, single_flight
+from quant.markets import streaming_market
+from . import account_stream, order_store
 
 
 def get_current_function_name():
@@ -17,6 +21,11 @@ class TradeException(Exception):
 
 
 class Broker(object):
+    # 账户推送(account_stream.py), 支持推送的交易所设置, config.ACCOUNT_STREAMS里打开
+    account_stream_class = None
+    # _get_orders一次请求能查多个订单, order_tracker批量查询
+    batch_orders = False
+
     def __init__(self, base_currency, market_currency, pair_code):
         self.name = self.__class__.__name__
         self.brief_name = self.name[6:]
@@ -47,6 +56,12 @@ class Broker(object):
         self.zrx_available = 0.
 
         self.max_volume_risk_protect = config.RISK_PROTECT_MAX_VOLUMN
+        # 和同一个交易所的market共用请求限额, 行情单独限额的交易所ticker用market的桶
+        self.rate_limiter = rate_limiter.get_limiter(self.name)
+        self.market_rate_limiter = rate_limiter.get_market_limiter(self.name)
+        # 同一个交易所的broker共用订单状态, 推送和REST查询的结果都写进去
+        self.order_store = order_store.get_store(self.name)
+        self.account_stream = None
 
     def __str__(self):
         return "%s: %s" % (self.brief_name, str({"cny_balance": self.cny_balance,
@@ -61,6 +76,20 @@ class Broker(object):
                                                  "usd_available": self.usd_available
                                                  }))
 
+    def acquire_rate_limit(self, priority):
+        """下单/撤单一直等到拿到令牌, 账户查询和行情等不到返回False, 请求不发出去"""
+        timeout = None
+        limiter = self.rate_limiter
+        if priority == rate_limiter.PRIORITY_ACCOUNT:
+            timeout = config.RATE_LIMIT_ACCOUNT_TIMEOUT
+        elif priority == rate_limiter.PRIORITY_MARKET:
+            timeout = config.RATE_LIMIT_MARKET_TIMEOUT
+            limiter = self.market_rate_limiter
+        if limiter.acquire(priority, timeout):
+            return True
+        logging.warn("%s rate limit timeout, skip %s request" % (self.name, rate_limiter.PRIORITY_NAMES[priority]))
+        return False
+
     def set_max_volume_risk_protect(self, count):
         self.max_volume_risk_protect = count
 
@@ -85,6 +114,8 @@ class Broker(object):
         logging.debug("BUY LIMIT %f %s at %f %s @%s" % (amount, self.market_currency,
                                                         price, self.base_currency, self.brief_name))
 
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             if client_id:
                 return self._buy_limit(amount, price, client_id)
@@ -115,6 +146,8 @@ class Broker(object):
         logging.debug("SELL LIMIT %f %s at %f %s @%s" % (amount, self.market_currency,
                                                          price, self.base_currency, self.brief_name))
 
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             if client_id:
                 return self._sell_limit(amount, price, client_id)
@@ -132,6 +165,8 @@ class Broker(object):
         logging.info("BUY MAKER %f %s at %f %s @%s" % (amount, self.market_currency,
                                                        price, self.base_currency, self.brief_name))
 
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             return self._buy_maker(amount, price)
         except Exception as e:
@@ -145,6 +180,8 @@ class Broker(object):
 
         logging.info("SELL MAKER %f %s at %f %s @%s" % (amount, self.market_currency,
                                                         price, self.base_currency, self.brief_name))
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             return self._sell_maker(amount, price)
         except Exception as e:
@@ -158,16 +195,51 @@ class Broker(object):
         if not order_id:
             return None
 
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+            return None
         try:
-            return self._get_order(order_id, order_type)
+            order = self._get_order(order_id, order_type)
         except Exception as e:
             logging.error('%s %s except: %s' % (self.name, get_current_function_name(), e))
             return None
+        # bithumb返回的是(order, error)
+        if isinstance(order, dict) and 'status' in order:
+            self.order_store.update(order)
+        return order
+
+    def start_account_stream(self):
+        """broker初始化后调用, config.ACCOUNT_STREAMS里的交易所启动账户推送"""
+        if self.account_stream_class and self.name in config.ACCOUNT_STREAMS:
+            self.account_stream = account_stream.get_stream(self)
+
+    def is_order_streamed(self):
+        return self.account_stream is not None and self.account_stream.is_ready()
+
+    def wait_order(self, order_id, timeout, order_type=None):
+        """
+        等订单结束(成交或撤销)最多timeout秒, 返回订单状态.
+        有账户推送时订单一结束就返回, 超时返回推送的最新状态; 没有推送或者推送里没有这个订单时,
+        sleep到timeout后用REST查一次, 查不到按INTERVAL_RETRY重试
+        """
+        if self.is_order_streamed():
+            order = self.order_store.wait_done(order_id, timeout)
+            if order:
+                return order
+        elif timeout > 0:
+            time.sleep(timeout)
+
+        while True:
+            order = self.get_order(order_id, order_type)
+            if order:
+                return order
+            time.sleep(config.INTERVAL_RETRY)
 
     def cancel_order(self, order_id, order_type=None):
         if not order_id:
             return None
 
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             return self._cancel_order(order_id, order_type)
         except Exception as e:
@@ -176,13 +248,34 @@ class Broker(object):
             return None
 
     def get_orders(self, order_ids):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+            return None
         try:
             return self._get_orders(order_ids)
         except Exception as e:
             logging.error('%s %s except: %s' % (self.name, get_current_function_name(), e))
             return None
 
+    def poll_orders(self, orders):
+        """
+        order_tracker调用, orders: [(order_id, order_type)], 返回{str(order_id): 订单}, 查询失败的订单不在结果里.
+        batch_orders时一次get_orders, 否则逐个get_order
+        """
+        results = {}
+        if self.batch_orders:
+            for order in self.get_orders([order_id for order_id, _ in orders]) or []:
+                results[str(order['order_id'])] = order
+            return results
+
+        for order_id, order_type in orders:
+            order = self.get_order(order_id, order_type)
+            if order:
+                results[str(order_id)] = order
+        return results
+
     def get_active_orders(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+            return None
         try:
             return self._get_active_orders()
         except Exception as e:
@@ -190,6 +283,8 @@ class Broker(object):
             return None
 
     def get_orders_history(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+            return None
         try:
             return self._get_orders_history()
         except Exception as e:
@@ -210,6 +305,8 @@ class Broker(object):
         return res
 
     def get_balances(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_ACCOUNT):
+            return None
         try:
             res = self._get_balances()
         except Exception as e:
@@ -219,6 +316,8 @@ class Broker(object):
 
     # cancel orders by symbol
     def cancel_orders(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             res = self._cancel_orders()
         except Exception as e:
@@ -227,6 +326,8 @@ class Broker(object):
         return res
 
     def cancel_all(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_TRADE):
+            return None
         try:
             res = self._cancel_all()
         except Exception as e:
@@ -243,13 +344,23 @@ class Broker(object):
         return res
 
     def get_ticker(self):
+        # 同一个交易对有websocket推送的market时直接用推送的盘口, 不发请求
+        res = streaming_market.get_ticker(self.name, self.pair_code)
+        if res:
+            return res
         try:
-            res = self._ticker()
+            # 同一个交易对同时查ticker的observer共用一个请求
+            res = single_flight.do(('ticker', self.name, self.pair_code), self.request_ticker)
         except Exception as e:
             logging.error('%s %s except: %s' % (self.name, get_current_function_name(), e))
             return None
         return res
 
+    def request_ticker(self):
+        if not self.acquire_rate_limit(rate_limiter.PRIORITY_MARKET):
+            return None
+        return self._ticker()
+
     def _buy_limit(self, amount, price):
         raise NotImplementedError("%s.buy(self, amount, price)" % self.name)
 
@@ -2,115 +2,69 @@
 # -*- coding: UTF-8 -*-
 
 
+from concurrent.futures import ThreadPoolExecutor
+
 from quant import config
-from ._bitfinex import Bitfinex
-from ._liqui import Liqui
-from ._bittrex import Bittrex
-from ._binance import Binance
-from ._gate import Gate
-from ._kkex import Kkex
-from ._bithumb import Bithumb
+from quant.common import constant, pair_registry, util
 import logging
 
 
+# 交易所 -> (broker类, config里的api key, secret), 创建broker时才导入对应模块
+BROKER_CLASSES = {
+    constant.EX_BFX: ('quant.brokers._bitfinex.Bitfinex', 'Bitfinex_API_KEY', 'Bitfinex_SECRET_TOKEN'),
+    constant.EX_LQ: ('quant.brokers._liqui.Liqui', 'Liqui_API_KEY', 'Liqui_SECRET_TOKEN'),
+    constant.EX_BITTREX: ('quant.brokers._bittrex.Bittrex', 'Bittrex_API_KEY', 'Bittrex_SECRET_TOKEN'),
+    constant.EX_BINANCE: ('quant.brokers._binance.Binance', 'Binance_API_KEY', 'Binance_SECRET_TOKEN'),
+    constant.EX_GATE: ('quant.brokers._gate.Gate', 'Gate_API_KEY', 'Gate_SECRET_TOKEN'),
+    constant.EX_KKEX: ('quant.brokers._kkex.Kkex', 'KKEX_API_KEY', 'KKEX_SECRET_TOKEN'),
+    constant.EX_BITHUMB: ('quant.brokers._bithumb.Bithumb', 'Bithumb_API_KEY', 'Bithumb_SECRET_TOKEN'),
+}
+
+
+def get_broker_class(exchange):
+    return util.load_object(BROKER_CLASSES[exchange][0])
+
+
+def get_broker_pair(name):
+    pair = pair_registry.get_pair(name)
+    if not pair or pair.exchange not in BROKER_CLASSES:
+        logging.warn('Exchange ' + name + ' not supported!')
+        assert False
+    return pair
+
+
 def create_brokers(exchange_names):
+    """交易对见common.pair_registry, 各broker并发创建"""
+    pairs = [(name, get_broker_pair(name)) for name in exchange_names]
+
     brokers = {}
-    for name in exchange_names:
-        if name == 'Bitfinex_BCH_USD':
-            chg = Bitfinex('bchusd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_ETH_USD':
-            chg = Bitfinex('ethusd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_ETH_BTC':
-            chg = Bitfinex('ethbtc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_ZEC_USD':
-            chg = Bitfinex('zecusd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BCH_BTC':
-            chg = Bitfinex('bchbtc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BTC_USD':
-            chg = Bitfinex('btcusd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BT1_USD':
-            chg = Bitfinex('bt1usd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BT2_USD':
-            chg = Bitfinex('bt2usd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BT1_BTC':
-            chg = Bitfinex('bt1btc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_BT2_BTC':
-            chg = Bitfinex('bt2btc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_NEO_USD':
-            chg = Bitfinex('neousd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_NEO_BTC':
-            chg = Bitfinex('neobtc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_NEO_ETH':
-            chg = Bitfinex('neoeth', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_IOT_ETH':
-            chg = Bitfinex('ioteth', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_IOT_BTC':
-            chg = Bitfinex('iotbtc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_IOT_USD':
-            chg = Bitfinex('iotusd', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_ZRX_ETH':
-            chg = Bitfinex('zrxeth', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Bitfinex_ZRX_BTC':
-            chg = Bitfinex('zrxbtc', config.Bitfinex_API_KEY, config.Bitfinex_SECRET_TOKEN)
-        elif name == 'Liqui_BCC_BTC':
-            chg = Liqui('bcc_btc', config.Liqui_API_KEY, config.Liqui_SECRET_TOKEN)
-        elif name == 'Liqui_BCC_ETH':
-            chg = Liqui('bcc_eth', config.Liqui_API_KEY, config.Liqui_SECRET_TOKEN)
-        elif name == 'Bittrex_ZEC_BTC':
-            chg = Bittrex('BTC-ZEC', config.Bittrex_API_KEY, config.Bittrex_SECRET_TOKEN)
-        elif name == 'Binance_ETH_BTC':
-            chg = Binance('ETHBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_BNB_BTC':
-            chg = Binance('BNBBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_BNB_ETH':
-            chg = Binance('BNBETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_MCO_BTC':
-            chg = Binance('MCOBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_MCO_ETH':
-            chg = Binance('MCOETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_QTUM_BTC':
-            chg = Binance('QTUMBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_QTUM_ETH':
-            chg = Binance('QTUMETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_WTC_BTC':
-            chg = Binance('WTCBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_WTC_ETH':
-            chg = Binance('WTCETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_BCC_BTC':
-            chg = Binance('BCCBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_NEO_BTC':
-            chg = Binance('NEOBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_NEO_ETH':
-            chg = Binance('NEOETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_IOTA_ETH':
-            chg = Binance('IOTAETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_IOTA_BTC':
-            chg = Binance('IOTABTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_ZRX_ETH':
-            chg = Binance('ZRXETH', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Binance_ZRX_BTC':
-            chg = Binance('ZRXBTC', config.Binance_API_KEY, config.Binance_SECRET_TOKEN)
-        elif name == 'Gate_BCC_BTC':
-            chg = Gate('bcc_btc', config.Gate_API_KEY, config.Gate_SECRET_TOKEN)
-        elif name == 'Kkex_BCH_BTC':
-            chg = Kkex('BCHBTC', config.KKEX_API_KEY, config.KKEX_SECRET_TOKEN)
-        elif name == 'Bithumb_BCH_KRW':
-            chg = Bithumb('bch', config.Bithumb_API_KEY, config.Bithumb_SECRET_TOKEN)
-        elif name == 'Bithumb_BTC_KRW':
-            chg = Bithumb('btc', config.Bithumb_API_KEY, config.Bithumb_SECRET_TOKEN)
-        else:
-            logging.warn('Exchange ' + name + ' not supported!')
-            assert False
-        logging.info('%s broker initialized' % chg.name)
-
-        brokers[name] = chg
+    if not pairs:
+        return brokers
+
+    # 模块在主线程里导入, 线程里只做client初始化
+    broker_classes = dict((pair.exchange, get_broker_class(pair.exchange)) for _, pair in pairs)
+    executor = ThreadPoolExecutor(max_workers=min(len(pairs), config.FACTORY_INIT_WORKERS))
+    try:
+        futures = []
+        for name, pair in pairs:
+            api_key, secret_token = BROKER_CLASSES[pair.exchange][1:]
+            futures.append((name, executor.submit(broker_classes[pair.exchange], pair.pair_code,
+                                                  getattr(config, api_key), getattr(config, secret_token))))
+        for name, future in futures:
+            chg = future.result()
+            chg.start_account_stream()
+            logging.info('%s broker initialized' % chg.name)
+
+            brokers[name] = chg
+    finally:
+        executor.shutdown(wait=False)
     return brokers
 
 
 def create_bfx_sub_broker(exchange_name):
-    if exchange_name == 'Bitfinex_BCH_BTC':
-        pair_code = 'bchbtc'
-    else:
+    pair = get_broker_pair(exchange_name)
+    if pair.exchange != constant.EX_BFX:
         logging.warn('Exchange ' + exchange_name + ' not supported!')
         assert False
-    return Bitfinex(pair_code, config.Bitfinex_SUB_API_KEY, config.Bitfinex_SUB_SECRET_TOKEN)
+    broker_class = get_broker_class(constant.EX_BFX)
+    return broker_class(pair.pair_code, config.Bitfinex_SUB_API_KEY, config.Bitfinex_SUB_SECRET_TOKEN)
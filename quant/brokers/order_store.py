@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+本地的订单状态, 每个交易所一个, 同一个交易所的broker共用.
+账户推送(account_stream.py)和REST查询(Broker.get_order)的结果都写到这里, 等订单结果的一方用wait_done等事件, 不再轮询.
+
+订单的格式和Broker.get_order一样: {'order_id', 'amount', 'price', 'deal_amount', 'avg_price', 'symbol', 'status', ...}
+"""
+
+import collections
+import threading
+import time
+import logging
+
+from quant import config
+from quant.common import constant
+
+
+def is_done(order):
+    return order['status'] != constant.ORDER_STATE_PENDING
+
+
+class OrderStore(object):
+    def __init__(self, name):
+        self.name = name
+        # order_id(str) -> 订单, 按更新顺序, 超过ORDER_STORE_SIZE时先删最早结束的
+        self.orders = collections.OrderedDict()
+        self.condition = threading.Condition()
+        self.listeners = []
+
+        self.updates = 0
+        # 比本地状态旧的结果(已结束的订单又收到未完成的状态), 丢弃
+        self.stale = 0
+
+    def add_listener(self, listener):
+        """订单状态变化时回调listener(order)"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def update(self, order):
+        order_id = str(order['order_id'])
+        with self.condition:
+            old = self.orders.get(order_id)
+            if old is not None and is_done(old) and not is_done(order):
+                self.stale += 1
+                return False
+            if old is not None:
+                del self.orders[order_id]
+            self.orders[order_id] = order
+            self.updates += 1
+            self.prune()
+            self.condition.notify_all()
+
+        for listener in list(self.listeners):
+            try:
+                listener(order)
+            except Exception as e:
+                logging.warn("%s order listener failed: %s" % (self.name, e))
+        return True
+
+    def prune(self):
+        if len(self.orders) <= config.ORDER_STORE_SIZE:
+            return
+        for order_id, order in list(self.orders.items()):
+            if is_done(order):
+                del self.orders[order_id]
+                if len(self.orders) <= config.ORDER_STORE_SIZE:
+                    return
+
+    def get(self, order_id):
+        return self.orders.get(str(order_id))
+
+    def forget_pending(self, keep=None):
+        """
+        推送断开期间可能漏掉事件, 重连后未完成的订单不再可信, 删掉后查询会走REST.
+        keep: 重连后推送的快照里还在的订单id
+        """
+        keep = set(str(x) for x in keep) if keep else set()
+        with self.condition:
+            for order_id, order in list(self.orders.items()):
+                if not is_done(order) and order_id not in keep:
+                    del self.orders[order_id]
+
+    def wait_done(self, order_id, timeout):
+        """
+        等订单结束(成交或撤销)最多timeout秒, 返回最新的状态, 没有这个订单时返回None
+        """
+        order_id = str(order_id)
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                order = self.orders.get(order_id)
+                if order is not None and is_done(order):
+                    return order
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return order
+                self.condition.wait(remaining)
+
+    def get_stats(self):
+        return {'orders': len(self.orders), 'updates': self.updates, 'stale': self.stale}
+
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store(name):
+    store = _stores.get(name)
+    if store is None:
+        with _lock:
+            store = _stores.setdefault(name, OrderStore(name))
+    return store
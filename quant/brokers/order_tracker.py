@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+没有账户推送的交易所(Kkex, Liqui, Bithumb, Gate), 所有策略的未完成订单由一个后台线程统一查询, 不再各自逐个轮询.
+
+    支持批量查询的broker(batch_orders), 一次请求查该broker跟踪的所有订单; 其他的只查到期的订单
+    每个订单的查询间隔自适应: 状态有变化(有成交)时回到ORDER_TRACKER_MIN_INTERVAL,
+    没变化或查询失败时翻倍, 最长不超过ORDER_TRACKER_MAX_INTERVAL, 没变化时也不超过订单存在时间的ORDER_TRACKER_AGE_RATIO,
+    新订单查得勤, 挂了很久没动的订单查得少
+    订单结束(成交或撤销)后不再跟踪
+
+状态变化时回调track时传入的callback(order), 查询结果同时写进broker的OrderStore.
+有账户推送的broker不轮询, 推送写进OrderStore后同样回调.
+
+    tracker = order_tracker.get_tracker()
+    tracker.track(broker, order_id, callback=self.on_order_update)
+    order = tracker.wait(broker, order_id, timeout)  # 等一次新的查询结果
+"""
+
+import logging
+import threading
+import time
+
+from quant import config
+from . import order_store
+
+
+class TrackedOrder(object):
+    __slots__ = ('broker', 'order_id', 'order_type', 'callbacks', 'created', 'interval', 'next_poll', 'order',
+                 'polls')
+
+    def __init__(self, broker, order_id, order_type, now):
+        self.broker = broker
+        self.order_id = order_id
+        self.order_type = order_type
+        self.callbacks = []
+        self.created = now
+        self.interval = config.ORDER_TRACKER_MIN_INTERVAL
+        self.next_poll = now
+        # 最近一次查到的状态
+        self.order = None
+        # 查到结果的次数, wait用来判断有没有新的结果
+        self.polls = 0
+
+
+def is_changed(old, new):
+    return old is None or old['status'] != new['status'] or old.get('deal_amount') != new.get('deal_amount')
+
+
+class OrderTracker(object):
+    def __init__(self):
+        # (broker, order_id) -> TrackedOrder
+        self.orders = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        # 已经注册过listener的OrderStore
+        self.stores = set()
+
+        self.stats = {'polls': 0, 'requests': 0, 'changes': 0, 'failures': 0}
+
+    def track(self, broker, order_id, order_type=None, callback=None):
+        """
+        开始跟踪订单, 状态变化时回调callback(order), 同一个订单可以有多个callback
+        bithumb查询订单需要order_type(bid/ask)
+        """
+        key = (broker, str(order_id))
+        with self.condition:
+            tracked = self.orders.get(key)
+            if tracked is None:
+                tracked = TrackedOrder(broker, order_id, order_type, time.time())
+                self.orders[key] = tracked
+            if callback and callback not in tracked.callbacks:
+                tracked.callbacks.append(callback)
+            if broker.order_store not in self.stores:
+                self.stores.add(broker.order_store)
+                broker.order_store.add_listener(lambda order, store=broker.order_store: self.on_pushed(store, order))
+            self.ensure_thread()
+            self.condition.notify_all()
+        return tracked
+
+    def untrack(self, broker, order_id):
+        with self.condition:
+            self.orders.pop((broker, str(order_id)), None)
+
+    def refresh(self, broker, order_id):
+        """下一轮就查询, 比如撤单之后"""
+        with self.condition:
+            tracked = self.orders.get((broker, str(order_id)))
+            if tracked:
+                tracked.interval = config.ORDER_TRACKER_MIN_INTERVAL
+                tracked.next_poll = time.time()
+                self.condition.notify_all()
+
+    def get(self, broker, order_id):
+        """最近一次查到的状态, 已经不跟踪的订单从OrderStore里取"""
+        tracked = self.orders.get((broker, str(order_id)))
+        if tracked and tracked.order:
+            return tracked.order
+        return broker.order_store.get(order_id)
+
+    def wait(self, broker, order_id, timeout, order_type=None):
+        """
+        等这个订单的一次新的查询结果, 超时返回None.
+        有账户推送时直接返回推送的最新状态
+        """
+        if broker.is_order_streamed():
+            order = broker.order_store.get(order_id)
+            if order:
+                return order
+
+        deadline = time.time() + timeout
+        tracked = self.track(broker, order_id, order_type)
+        with self.condition:
+            polls = tracked.polls
+            tracked.next_poll = time.time()
+            self.condition.notify_all()
+            while tracked.polls == polls:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            return tracked.order
+
+    def ensure_thread(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, name='order-tracker')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                self.poll_due()
+            except Exception as e:
+                logging.warn("order tracker poll failed: %s" % e)
+                time.sleep(config.ORDER_TRACKER_MIN_INTERVAL)
+
+    def poll_due(self):
+        with self.condition:
+            now = time.time()
+            due = {}
+            next_poll = now + config.ORDER_TRACKER_MAX_INTERVAL
+            for tracked in self.orders.values():
+                if tracked.broker.is_order_streamed():
+                    continue
+                if tracked.next_poll <= now:
+                    due.setdefault(tracked.broker, []).append(tracked)
+                else:
+                    next_poll = min(next_poll, tracked.next_poll)
+            if not due:
+                self.condition.wait(next_poll - now)
+                return
+            polls = {}
+            for broker, orders in due.items():
+                if broker.batch_orders:
+                    # 一次请求能查所有订单, 没到期的也一起查
+                    orders = [x for x in self.orders.values() if x.broker is broker]
+                polls[broker] = orders
+
+        for broker, orders in polls.items():
+            self.poll(broker, orders)
+
+    def poll(self, broker, orders):
+        self.stats['polls'] += 1
+        try:
+            results = broker.poll_orders([(x.order_id, x.order_type) for x in orders])
+        except Exception as e:
+            logging.warn("%s poll orders failed: %s" % (broker.name, e))
+            results = {}
+        self.stats['requests'] += 1 if broker.batch_orders else len(orders)
+
+        now = time.time()
+        for tracked in orders:
+            order = results.get(str(tracked.order_id))
+            if order is None:
+                self.stats['failures'] += 1
+                # 交易所出错时和没变化一样翻倍, 不要每秒都查, 令牌还要留给下单
+                with self.condition:
+                    tracked.interval = min(tracked.interval * 2, config.ORDER_TRACKER_MAX_INTERVAL)
+                    tracked.next_poll = now + tracked.interval
+                continue
+            # get_order已经写进OrderStore, listener里apply过; 批量查询和bithumb的结果在这里写
+            if broker.order_store.get(tracked.order_id) is not order:
+                broker.order_store.update(order)
+            # OrderStore丢弃的旧结果(已结束的订单又查到未完成)按OrderStore里的状态处理
+            self.apply(tracked, broker.order_store.get(tracked.order_id) or order, now)
+
+    def on_pushed(self, store, order):
+        """OrderStore的listener, 账户推送或者别的地方查到的新状态, 同一个交易所的broker共用OrderStore"""
+        order_id = str(order['order_id'])
+        with self.condition:
+            matched = [x for x in self.orders.values() if x.broker.order_store is store and str(x.order_id) == order_id]
+        for tracked in matched:
+            self.apply(tracked, order, time.time())
+
+    def apply(self, tracked, order, now):
+        """同一个结果只处理一次, 否则间隔会被连续翻倍, polls也会多算"""
+        with self.condition:
+            if order is tracked.order:
+                return
+            changed = is_changed(tracked.order, order)
+            tracked.order = order
+            tracked.polls += 1
+            if changed:
+                tracked.interval = config.ORDER_TRACKER_MIN_INTERVAL
+            else:
+                age_limit = max((now - tracked.created) * config.ORDER_TRACKER_AGE_RATIO,
+                                config.ORDER_TRACKER_MIN_INTERVAL)
+                tracked.interval = min(tracked.interval * 2, age_limit, config.ORDER_TRACKER_MAX_INTERVAL)
+            tracked.next_poll = now + tracked.interval
+            if order_store.is_done(order):
+                self.orders.pop((tracked.broker, str(tracked.order_id)), None)
+            self.condition.notify_all()
+
+        if not changed:
+            return
+        self.stats['changes'] += 1
+        for callback in list(tracked.callbacks):
+            try:
+                callback(order)
+            except Exception as e:
+                logging.warn("%s order %s callback failed: %s" % (tracked.broker.name, tracked.order_id, e))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['tracked'] = len(self.orders)
+        return stats
+
+
+_tracker = OrderTracker()
+
+
+def get_tracker():
+    return _tracker
@@ -9,19 +9,11 @@ import sys
 import time
 
 from quant.datafeed import DataFeed
-from quant.observers.t_bfx_lq_new import TriangleArbitrage as TriangleArbitrageBfxLq
-from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
-from quant.observers.t_lq_bn import TriangleArbitrage as TriangleArbitrageLqBn
-from quant.observers.t_gate import TriangleArbitrage as TriangleArbitrageGate
-from quant.observers.t_bitflyer import TriangleArbitrage as TriangleArbitrageBitflyer
-from quant.observers.t_kraken import TriangleArbitrage as TriangleArbitrageKraken
-
-from quant.observers.t_bfx_btc_usd import Arbitrage as ArbitrageBfxBtcUsd
-from quant.observers.t_bfx_btc import Arbitrage as ArbitrageBfxBtc
-
 from quant.brokers import broker_factory
 from quant.snapshot import Snapshot
 
+# observer在各个register_*里才导入, 启动时只加载这次运行用到的交易所模块
+
 
 class CLI(object):
     def __init__(self):
@@ -168,6 +160,7 @@ class CLI(object):
             time.sleep(60 * 10)
 
     def register_t_binance_wtc(self, args):
+        from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
         _observer = TriangleArbitrageBinance(base_pair='Binance_WTC_BTC',
                                              pair1='Binance_WTC_ETH',
                                              pair2='Binance_ETH_BTC',
@@ -175,6 +168,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_binance_bnb(self, args):
+        from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
         _observer = TriangleArbitrageBinance(base_pair='Binance_BNB_BTC',
                                              pair1='Binance_BNB_ETH',
                                              pair2='Binance_ETH_BTC',
@@ -182,6 +176,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_binance_mco(self, args):
+        from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
         _observer = TriangleArbitrageBinance(base_pair='Binance_MCO_BTC',
                                              pair1='Binance_MCO_ETH',
                                              pair2='Binance_ETH_BTC',
@@ -189,6 +184,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_binance_qtum(self, args):
+        from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
         _observer = TriangleArbitrageBinance(base_pair='Binance_QTUM_BTC',
                                              pair1='Binance_QTUM_ETH',
                                              pair2='Binance_ETH_BTC',
@@ -196,6 +192,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_binance_neo(self, args):
+        from quant.observers.t_binance import TriangleArbitrage as TriangleArbitrageBinance
         _observer = TriangleArbitrageBinance(base_pair='Binance_NEO_BTC',
                                              pair1='Binance_NEO_ETH',
                                              pair2='Binance_ETH_BTC',
@@ -203,6 +200,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_bitfinex_liqui(self, base_currency, market_currency, mid_currency):
+        from quant.observers.t_bfx_lq_new import TriangleArbitrage as TriangleArbitrageBfxLq
         base_pair = "Bitfinex_%s_%s" % (market_currency, base_currency)
         pair1 = "Liqui_%s_%s" % ('BCC' if market_currency == 'BCH' else market_currency, mid_currency)
         pair2 = "Bitfinex_%s_%s" % (mid_currency, base_currency)
@@ -226,6 +224,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_liqui_binance(self, base_currency, market_currency, mid_currency):
+        from quant.observers.t_lq_bn import TriangleArbitrage as TriangleArbitrageLqBn
         base_pair = "Liqui_%s_%s" % (market_currency, base_currency)
         pair1 = "Liqui_%s_%s" % (market_currency, mid_currency)
         pair2 = "Binance_%s_%s" % (mid_currency, base_currency)
@@ -247,14 +246,17 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_bitfinex_btc_usd(self, args):
+        from quant.observers.t_bfx_btc_usd import Arbitrage as ArbitrageBfxBtcUsd
         _observer = ArbitrageBfxBtcUsd(monitor_only=False)
         self.data_feed.register_observer(_observer)
 
     def register_t_bitfinex_btc(self, args):
+        from quant.observers.t_bfx_btc import Arbitrage as ArbitrageBfxBtc
         _observer = ArbitrageBfxBtc(monitor_only=False)
         self.data_feed.register_observer(_observer)
 
     def register_t_gate(self, args):
+        from quant.observers.t_gate import TriangleArbitrage as TriangleArbitrageGate
         base_pair = "Bitfinex_BCH_USD"
         pair1 = "Gate_BCC_BTC"
         pair2 = "Bitfinex_BTC_USD"
@@ -276,6 +278,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_bitflyer_bch(self, args):
+        from quant.observers.t_bitflyer import TriangleArbitrage as TriangleArbitrageBitflyer
         base_pair = "Bitfinex_BCH_USD"
         pair1 = "Bitflyer_BCH_BTC"
         pair2 = "Bitflyer_BTC_JPY"
@@ -297,6 +300,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_bitflyer_eth(self, args):
+        from quant.observers.t_bitflyer import TriangleArbitrage as TriangleArbitrageBitflyer
         base_pair = "Bitfinex_ETH_USD"
         pair1 = "Bitflyer_ETH_BTC"
         pair2 = "Bitflyer_BTC_JPY"
@@ -318,6 +322,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_kraken_bch(self, args):
+        from quant.observers.t_kraken import TriangleArbitrage as TriangleArbitrageKraken
         base_pair = "Kraken_BCH_USD"
         pair1 = "Bitfinex_BCH_BTC"
         pair2 = "Kraken_XBT_USD"
@@ -339,6 +344,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def register_t_kraken_eth(self, args):
+        from quant.observers.t_kraken import TriangleArbitrage as TriangleArbitrageKraken
         base_pair = "Kraken_ETH_USD"
         pair1 = "Bitfinex_ETH_BTC"
         pair2 = "Kraken_XBT_USD"
@@ -360,7 +366,7 @@ class CLI(object):
         self.data_feed.register_observer(_observer)
 
     def create_data_feed(self, args):
-        self.data_feed = DataFeed()
+        self.data_feed = DataFeed(fetch_mode=args.fetch_mode, event_driven=args.event_driven or None)
         self.init_observers_and_markets(args)
 
     def init_observers_and_markets(self, args):
@@ -382,6 +388,10 @@ class CLI(object):
         parser.add_argument("-m", "--markets", type=str,
                             help="markets, example: -mHaobtcCNY,Bitstamp")
         parser.add_argument("-s", "--status", help="status", action="store_true")
+        parser.add_argument("--fetch-mode", type=str, choices=["pool", "concurrent"],
+                            help="depth fetch mode, default is config.DATAFEED_FETCH_MODE")
+        parser.add_argument("--event-driven", help="tick observers as soon as their markets update",
+                            action="store_true")
         parser.add_argument("command", nargs='*', default="watch",
                             help='verb: "watch|replay-history|get-balance|list-public-markets|get-broker-balance"')
         args = parser.parse_args()
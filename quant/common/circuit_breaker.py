@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+熔断器, 交易所挂掉时不再每轮都去请求, 占着worker线程等超时.
+
+    closed: 正常请求, 连续失败failure_threshold次后熔断(open)
+    open: 不发请求, 到了试探时间进入half_open
+    half_open: 只放一个试探请求, 成功恢复closed, 失败回到open, 试探间隔翻倍, 最长max_probe_interval
+"""
+
+import logging
+import threading
+import time
+
+from quant import config
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """熔断中, 请求没有发出去"""
+    pass
+
+
+class CircuitBreaker(object):
+    def __init__(self, name, failure_threshold=None, probe_interval=None, max_probe_interval=None):
+        self.name = name
+        self.failure_threshold = failure_threshold if failure_threshold else config.BREAKER_FAILURE_THRESHOLD
+        self.min_probe_interval = probe_interval if probe_interval else config.BREAKER_PROBE_INTERVAL
+        self.max_probe_interval = max_probe_interval if max_probe_interval else config.BREAKER_MAX_PROBE_INTERVAL
+
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.probe_interval = self.min_probe_interval
+        self.open_until = 0
+        self.probing = False
+        self.last_error = None
+
+        # 统计
+        self.trips = 0
+        self.rejected = 0
+        self.opened_at = None
+
+        self.lock = threading.Lock()
+
+    def is_allowed(self, now=None):
+        """只看能不能发请求, 不改变状态"""
+        if now is None:
+            now = time.time()
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            return now >= self.open_until
+        return not self.probing
+
+    def next_attempt_time(self, now=None):
+        if now is None:
+            now = time.time()
+        if self.state == STATE_OPEN:
+            return max(self.open_until, now)
+        return now
+
+    def allow_request(self, now=None):
+        """发请求前调用, 熔断中返回False; open到期后放一个试探请求"""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN and now >= self.open_until:
+                self.state = STATE_HALF_OPEN
+                self.probing = False
+            if self.state == STATE_HALF_OPEN and not self.probing:
+                self.probing = True
+                logging.info("%s circuit half open, probing" % self.name)
+                return True
+            self.rejected += 1
+            return False
+
+    def on_cancel(self):
+        """请求没有发出去(比如等不到令牌), 不算成功也不算失败, 试探机会还回去"""
+        with self.lock:
+            self.probing = False
+
+    def on_success(self):
+        with self.lock:
+            if self.state != STATE_CLOSED:
+                logging.warn("%s circuit closed, down for %.1fs" % (self.name, time.time() - self.opened_at))
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self.probe_interval = self.min_probe_interval
+            self.probing = False
+            self.last_error = None
+
+    def on_failure(self, error=None, now=None):
+        if now is None:
+            now = time.time()
+        with self.lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == STATE_HALF_OPEN:
+                # 试探失败, 间隔翻倍
+                self.probe_interval = min(self.probe_interval * 2, self.max_probe_interval)
+                self._open(now)
+            elif self.state == STATE_CLOSED and self.failures >= self.failure_threshold:
+                self.trips += 1
+                self.opened_at = now
+                self._open(now)
+                logging.warn("%s circuit open after %s failures: %s" % (self.name, self.failures, error))
+
+    def _open(self, now):
+        self.state = STATE_OPEN
+        self.probing = False
+        self.open_until = now + self.probe_interval
+
+    def get_stats(self):
+        return {'state': self.state,
+                'failures': self.failures,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'probe_interval': self.probe_interval}
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+所有交易所支持的交易对, market和broker都从这里查pair_code和币种.
+新增交易对只需要在PAIRS里加一行.
+
+名字格式: 交易所_交易币_计价币, 如Bitfinex_BCH_BTC
+    quote: 交易币(market_currency), BCH
+    base: 计价币(base_currency), BTC
+"""
+
+from quant.common import constant
+
+# 每个交易所默认的手续费, 单个交易对可以覆盖
+EXCHANGE_FEE_RATE = {
+    constant.EX_BFX: 0.002,
+    constant.EX_LQ: 0.002,
+    constant.EX_BINANCE: 0.001,
+    constant.EX_CEX: 0.002,
+    constant.EX_KKEX: 0.0025,
+    constant.EX_HITBITC: 0.002,
+    constant.EX_BITTREX: 0.0025,
+    constant.EX_GATE: 0.002,
+    constant.EX_BITFLYER: 0.0025,
+    constant.EX_KRAKEN: 0.002,
+    constant.EX_COINEGG: 0.001,
+    constant.EX_BITHUMB: 0.0025,
+    constant.EX_HUOBI: 0.002,
+}
+
+
+class PairInfo(object):
+    """
+    一个交易所的一个交易对
+        pair_code: 交易所接口用的交易对代码
+        currencies: 交易所自己的(base_currency, market_currency), 和名字里的不一样时才需要
+        tick_size/min_size: 价格最小变动/最小下单量, None表示未知
+    """
+    __slots__ = ('exchange', 'quote', 'base', 'pair_code', 'currencies', 'fee_rate', 'tick_size', 'min_size')
+
+    def __init__(self, exchange, quote, base, pair_code, currencies=None, fee_rate=None, tick_size=None,
+                 min_size=None):
+        self.exchange = exchange
+        self.quote = quote
+        self.base = base
+        self.pair_code = pair_code
+        self.currencies = currencies
+        self.fee_rate = fee_rate if fee_rate is not None else EXCHANGE_FEE_RATE[exchange]
+        self.tick_size = tick_size
+        self.min_size = min_size
+
+    @property
+    def name(self):
+        return "%s_%s_%s" % (self.exchange, self.quote, self.base)
+
+    @property
+    def key(self):
+        return self.exchange, self.base, self.quote
+
+    @property
+    def base_currency(self):
+        return self.currencies[0] if self.currencies else self.base
+
+    @property
+    def market_currency(self):
+        return self.currencies[1] if self.currencies else self.quote
+
+    def __repr__(self):
+        return "PairInfo(%s, %s)" % (self.name, self.pair_code)
+
+
+PAIRS = (
+    PairInfo(constant.EX_BFX, 'ETH', 'USD', 'ethusd'),
+    PairInfo(constant.EX_BFX, 'ETH', 'BTC', 'ethbtc'),
+    PairInfo(constant.EX_BFX, 'ETC', 'BTC', 'etcbtc'),
+    PairInfo(constant.EX_BFX, 'ETC', 'USD', 'etcusd'),
+    PairInfo(constant.EX_BFX, 'BCH', 'USD', 'bchusd'),
+    PairInfo(constant.EX_BFX, 'BCH', 'BTC', 'bchbtc'),
+    PairInfo(constant.EX_BFX, 'BTC', 'USD', 'btcusd'),
+    PairInfo(constant.EX_BFX, 'BT1', 'USD', 'bt1usd'),
+    PairInfo(constant.EX_BFX, 'BT2', 'USD', 'bt2usd'),
+    PairInfo(constant.EX_BFX, 'BT1', 'BTC', 'bt1btc'),
+    PairInfo(constant.EX_BFX, 'BT2', 'BTC', 'bt2btc'),
+    PairInfo(constant.EX_BFX, 'ZEC', 'USD', 'zecusd'),
+    PairInfo(constant.EX_BFX, 'EOS', 'USD', 'eosusd'),
+    PairInfo(constant.EX_BFX, 'EOS', 'BTC', 'eosbtc'),
+    PairInfo(constant.EX_BFX, 'EOS', 'ETH', 'eoseth'),
+    PairInfo(constant.EX_BFX, 'NEO', 'USD', 'neousd'),
+    PairInfo(constant.EX_BFX, 'NEO', 'BTC', 'neobtc'),
+    PairInfo(constant.EX_BFX, 'NEO', 'ETH', 'neoeth'),
+    PairInfo(constant.EX_BFX, 'IOT', 'USD', 'iotusd'),
+    PairInfo(constant.EX_BFX, 'IOT', 'BTC', 'iotbtc'),
+    PairInfo(constant.EX_BFX, 'IOT', 'ETH', 'ioteth'),
+    PairInfo(constant.EX_BFX, 'ZRX', 'ETH', 'zrxeth'),
+    PairInfo(constant.EX_BFX, 'ZRX', 'BTC', 'zrxbtc'),
+
+    PairInfo(constant.EX_KKEX, 'BCH', 'BTC', 'BCHBTC'),
+    PairInfo(constant.EX_KKEX, 'ETH', 'BTC', 'ETHBTC'),
+
+    PairInfo(constant.EX_LQ, 'BCC', 'BTC', 'bcc_btc'),
+    PairInfo(constant.EX_LQ, 'BCC', 'ETH', 'bcc_eth'),
+    PairInfo(constant.EX_LQ, 'EOS', 'BTC', 'eos_btc'),
+
+    PairInfo(constant.EX_HITBITC, 'BCC', 'BTC', 'bccbtc'),
+
+    PairInfo(constant.EX_CEX, 'BCC', 'BTC', 'bccbtc', currencies=('BTC', 'BCH')),
+
+    PairInfo(constant.EX_BITTREX, 'BCC', 'BTC', 'BTC-BCC', currencies=('BTC', 'BCH')),
+    PairInfo(constant.EX_BITTREX, 'ZEC', 'BTC', 'BTC-ZEC'),
+
+    PairInfo(constant.EX_BINANCE, 'BTC', 'USDT', 'BTCUSDT'),
+    PairInfo(constant.EX_BINANCE, 'BCC', 'BTC', 'BCCBTC'),
+    PairInfo(constant.EX_BINANCE, 'ETH', 'BTC', 'ETHBTC'),
+    PairInfo(constant.EX_BINANCE, 'ETH', 'USDT', 'ETHUSDT'),
+    PairInfo(constant.EX_BINANCE, 'BNB', 'BTC', 'BNBBTC'),
+    PairInfo(constant.EX_BINANCE, 'BNB', 'ETH', 'BNBETH'),
+    PairInfo(constant.EX_BINANCE, 'MCO', 'BTC', 'MCOBTC'),
+    PairInfo(constant.EX_BINANCE, 'MCO', 'ETH', 'MCOETH'),
+    PairInfo(constant.EX_BINANCE, 'QTUM', 'BTC', 'QTUMBTC'),
+    PairInfo(constant.EX_BINANCE, 'QTUM', 'ETH', 'QTUMETH'),
+    PairInfo(constant.EX_BINANCE, 'WTC', 'BTC', 'WTCBTC'),
+    PairInfo(constant.EX_BINANCE, 'WTC', 'ETH', 'WTCETH'),
+    PairInfo(constant.EX_BINANCE, 'NEO', 'BTC', 'NEOBTC'),
+    PairInfo(constant.EX_BINANCE, 'NEO', 'ETH', 'NEOETH'),
+    PairInfo(constant.EX_BINANCE, 'IOTA', 'BTC', 'IOTABTC'),
+    PairInfo(constant.EX_BINANCE, 'IOTA', 'ETH', 'IOTAETH'),
+    PairInfo(constant.EX_BINANCE, 'ZRX', 'BTC', 'ZRXBTC'),
+    PairInfo(constant.EX_BINANCE, 'ZRX', 'ETH', 'ZRXETH'),
+
+    PairInfo(constant.EX_GATE, 'ETH', 'BTC', 'eth_btc'),
+    PairInfo(constant.EX_GATE, 'BCC', 'BTC', 'bcc_btc'),
+    PairInfo(constant.EX_GATE, 'BCC', 'ETH', 'bcc_eth'),
+
+    PairInfo(constant.EX_BITFLYER, 'BTC', 'JPY', 'btc_jpy'),
+    PairInfo(constant.EX_BITFLYER, 'ETH', 'BTC', 'eth_btc'),
+    PairInfo(constant.EX_BITFLYER, 'BCH', 'BTC', 'bch_btc'),
+
+    PairInfo(constant.EX_KRAKEN, 'XBT', 'EUR', 'xbteur'),
+    PairInfo(constant.EX_KRAKEN, 'XBT', 'USD', 'xbtusd'),
+    PairInfo(constant.EX_KRAKEN, 'ETH', 'EUR', 'etheur'),
+    PairInfo(constant.EX_KRAKEN, 'ETH', 'USD', 'ethusd'),
+    PairInfo(constant.EX_KRAKEN, 'BCH', 'EUR', 'bcheur'),
+    PairInfo(constant.EX_KRAKEN, 'BCH', 'USD', 'bchusd'),
+    PairInfo(constant.EX_KRAKEN, 'EOS', 'EUR', 'eoseur'),
+    PairInfo(constant.EX_KRAKEN, 'EOS', 'USD', 'eosusd'),
+
+    PairInfo(constant.EX_COINEGG, 'BCC', 'BTC', 'bcc'),
+    PairInfo(constant.EX_COINEGG, 'ETH', 'BTC', 'eth'),
+    PairInfo(constant.EX_COINEGG, 'NEO', 'BTC', 'neo'),
+    PairInfo(constant.EX_COINEGG, 'ETC', 'BTC', 'etc'),
+
+    PairInfo(constant.EX_BITHUMB, 'BTC', 'KRW', 'btc'),
+    PairInfo(constant.EX_BITHUMB, 'ETH', 'KRW', 'eth'),
+    PairInfo(constant.EX_BITHUMB, 'BCH', 'KRW', 'bch'),
+
+    PairInfo(constant.EX_HUOBI, 'ETH', 'USDT', 'ethusdt'),
+    PairInfo(constant.EX_HUOBI, 'BTC', 'USDT', 'btcusdt'),
+    PairInfo(constant.EX_HUOBI, 'ETH', 'BTC', 'ethbtc'),
+    PairInfo(constant.EX_HUOBI, 'ETC', 'BTC', 'etcbtc'),
+    PairInfo(constant.EX_HUOBI, 'ETC', 'USDT', 'etcusdt'),
+    PairInfo(constant.EX_HUOBI, 'BCH', 'BTC', 'bchbtc'),
+)
+
+_pairs_by_name = dict((pair.name, pair) for pair in PAIRS)
+_pairs_by_key = dict((pair.key, pair) for pair in PAIRS)
+_pairs_by_code = dict(((pair.exchange, pair.pair_code), pair) for pair in PAIRS)
+
+
+def get_pair(name):
+    """按名字查找, 如Bitfinex_BCH_BTC, 不支持返回None"""
+    return _pairs_by_name.get(name)
+
+
+def get_pair_by_key(exchange, base, quote):
+    return _pairs_by_key.get((exchange, base, quote))
+
+
+def get_pair_by_code(exchange, pair_code):
+    return _pairs_by_code.get((exchange, pair_code))
+
+
+def get_available_pairs(exchange, pair_code):
+    """兼容各market/broker的get_available_pairs, 返回(base_currency, market_currency)"""
+    pair = get_pair_by_code(exchange, pair_code)
+    assert pair, "%s pair %s not supported" % (exchange, pair_code)
+    return pair.base_currency, pair.market_currency
+
+
+def get_fee_rate(exchange, pair_code):
+    pair = get_pair_by_code(exchange, pair_code)
+    return pair.fee_rate if pair else EXCHANGE_FEE_RATE[exchange]
+
+
+def get_exchange_pairs(exchange):
+    return [pair for pair in PAIRS if pair.exchange == exchange]
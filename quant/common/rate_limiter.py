@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+进程内每个交易所一个令牌桶, market拉行情和broker的账户/交易请求共用同一个限额.
+行情接口单独限额的交易所(config.EXCHANGE_MARKET_RATE_LIMIT, 比如Bitfinex)行情另用一个桶, 不占下单和账户查询的令牌.
+
+优先级: 下单/撤单 > 账户查询 > 行情
+    1, 等待令牌时, 高优先级的请求先拿到令牌
+    2, 低优先级的请求不能用掉桶里最后的几个令牌(config.RATE_LIMIT_RESERVE), 行情轮询再密也不会挤掉下单
+
+    limiter = rate_limiter.get_market_limiter('Bitfinex')
+    if limiter.acquire(rate_limiter.PRIORITY_MARKET, timeout=1):
+        ...
+    rate_limiter.get_stats()  # 每个交易所每个优先级的请求数/排队时间/超时数
+"""
+
+import logging
+import threading
+import time
+
+from quant import config
+
+PRIORITY_TRADE = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_TRADE: 'trade',
+    PRIORITY_ACCOUNT: 'account',
+    PRIORITY_MARKET: 'market',
+}
+
+
+class RateLimitTimeout(Exception):
+    """等令牌超时, 请求没有发出去"""
+    pass
+
+
+class PriorityStats(object):
+    __slots__ = ('acquired', 'timeouts', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.
+        self.max_wait = 0.
+
+    def add(self, wait):
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self):
+        return {'acquired': self.acquired,
+                'timeouts': self.timeouts,
+                'avg_wait': self.total_wait / self.acquired if self.acquired else 0.,
+                'max_wait': self.max_wait}
+
+
+class RateLimiter(object):
+    """
+    令牌桶, 每分钟补充limit个令牌, 最多攒burst个
+    reserve: {优先级名字: 拿令牌后桶里至少要剩下的令牌数}
+    """
+
+    def __init__(self, exchange, limit, burst=None, reserve=None):
+        self.exchange = exchange
+        self.rate = limit / 60.
+        self.burst = max(burst if burst else config.RATE_LIMIT_BURST, 1)
+        self.reserve = reserve if reserve is not None else config.RATE_LIMIT_RESERVE
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        # 每个优先级正在等待的请求数
+        self.waiting = dict((x, 0) for x in PRIORITY_NAMES)
+        self.stats = dict((x, PriorityStats()) for x in PRIORITY_NAMES)
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _get_reserve(self, priority):
+        return self.reserve.get(PRIORITY_NAMES[priority], 0)
+
+    def _has_higher_waiting(self, priority):
+        for x in PRIORITY_NAMES:
+            if x < priority and self.waiting[x]:
+                return True
+        return False
+
+    def _try_take(self, priority, now):
+        self._refill(now)
+        if self._has_higher_waiting(priority):
+            return False
+        if self.tokens - 1 < self._get_reserve(priority):
+            return False
+        self.tokens -= 1
+        return True
+
+    def _wait_time(self, priority, now):
+        """令牌补到够用还要多久"""
+        need = self._get_reserve(priority) + 1 - self.tokens
+        if need <= 0:
+            return 0.
+        return need / self.rate
+
+    def available(self, priority, now=None):
+        """不等待能拿到的令牌数, 不扣令牌"""
+        if now is None:
+            now = time.time()
+        with self.condition:
+            self._refill(now)
+            if self._has_higher_waiting(priority):
+                return 0
+            return max(int(self.tokens - self._get_reserve(priority)), 0)
+
+    def next_available(self, priority, now=None):
+        """最早什么时候能拿到一个令牌"""
+        if now is None:
+            now = time.time()
+        with self.condition:
+            self._refill(now)
+            return now + self._wait_time(priority, now)
+
+    def try_acquire(self, priority, now=None):
+        if now is None:
+            now = time.time()
+        with self.condition:
+            if self._try_take(priority, now):
+                self.stats[priority].add(0.)
+                return True
+            return False
+
+    def acquire(self, priority, timeout=None):
+        """
+        拿一个令牌, 拿不到就排队等待, timeout为None时一直等
+        :return: 是否拿到令牌
+        """
+        started = time.time()
+        with self.condition:
+            if self._try_take(priority, started):
+                self.stats[priority].add(0.)
+                return True
+
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    now = time.time()
+                    wait = self._wait_time(priority, now)
+                    if timeout is not None:
+                        remaining = started + timeout - now
+                        if remaining <= 0:
+                            self.stats[priority].timeouts += 1
+                            return False
+                        wait = min(wait, remaining)
+                    # 高优先级的请求拿到令牌后会notify, 等待时间为0时也至少让出一下
+                    self.condition.wait(max(wait, 0.001))
+
+                    if self._try_take(priority, time.time()):
+                        self.stats[priority].add(time.time() - started)
+                        return True
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    def get_stats(self):
+        with self.condition:
+            return dict((PRIORITY_NAMES[x], stat.to_dict()) for x, stat in self.stats.items())
+
+
+_limiters = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(name, limit, reserve=None):
+    limiter = _limiters.get(name)
+    if limiter:
+        return limiter
+
+    with _lock:
+        limiter = _limiters.get(name)
+        if not limiter:
+            limiter = RateLimiter(name, limit, reserve=reserve)
+            _limiters[name] = limiter
+    return limiter
+
+
+def get_limiter(exchange):
+    """同一个交易所的market和broker拿到的是同一个limiter"""
+    return _get_or_create(exchange, config.EXCHANGE_RATE_LIMIT.get(exchange, config.DEFAULT_RATE_LIMIT))
+
+
+def get_market_limiter(exchange):
+    """
+    行情请求用的limiter. 行情接口单独限额的交易所返回单独的桶(名字是'交易所:market'),
+    桶里只有行情请求, 不用给下单留令牌; 其他交易所和get_limiter是同一个
+    """
+    limit = config.EXCHANGE_MARKET_RATE_LIMIT.get(exchange)
+    if not limit:
+        return get_limiter(exchange)
+    return _get_or_create('%s:market' % exchange, limit, reserve={})
+
+
+def get_stats():
+    """{exchange: {priority_name: {'acquired', 'timeouts', 'avg_wait', 'max_wait'}}}"""
+    return dict((exchange, limiter.get_stats()) for exchange, limiter in list(_limiters.items()))
+
+
+def log_stats():
+    for exchange, stats in sorted(get_stats().items()):
+        for priority_name, stat in sorted(stats.items()):
+            if not stat['acquired'] and not stat['timeouts']:
+                continue
+            logging.debug("rate limit %s %s: acquired=%s timeouts=%s avg_wait=%.3fs max_wait=%.3fs" % (
+                exchange, priority_name, stat['acquired'], stat['timeouts'], stat['avg_wait'], stat['max_wait']))
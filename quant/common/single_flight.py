@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+同一个key的并发请求合并成一个: 第一个调用方真正发请求, 同时到来的调用方等它的结果;
+请求结束后config.SINGLE_FLIGHT_FRESHNESS秒内再来的调用方直接用这个结果, 不再发请求.
+失败不缓存, 等待中的调用方拿到同一个异常.
+等待的调用方遵守自己线程的http_pool.deadline, 到期还没有结果就抛DeadlineExceeded, 请求本身不受影响.
+
+    depth = single_flight.do(('depth', market.name), market.fetch_depth)
+"""
+
+import threading
+import time
+
+from quant import config
+from quant.api import http_pool
+
+
+class Call(object):
+    __slots__ = ('event', 'result', 'error', 'finished')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = None
+
+
+class SingleFlight(object):
+    def __init__(self, freshness=None):
+        self.freshness = freshness if freshness is not None else config.SINGLE_FLIGHT_FRESHNESS
+        self.calls = {}
+        self.lock = threading.Lock()
+
+        # 真正发出的请求数, 合并掉的请求数(等别人的请求或者用了还新鲜的结果)
+        self.executed = 0
+        self.shared = 0
+        # 等别人的请求等到deadline的次数
+        self.timeouts = 0
+
+    def do(self, key, func, *args, **kwargs):
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None and (call.finished is None or
+                                     (call.error is None and time.time() - call.finished <= self.freshness)):
+                self.shared += 1
+                leader = False
+            else:
+                call = Call()
+                self.calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            deadline = http_pool.get_deadline()
+            if deadline is None:
+                call.event.wait()
+            elif not call.event.wait(max(deadline - time.time(), 0)):
+                with self.lock:
+                    self.timeouts += 1
+                raise http_pool.DeadlineExceeded("deadline exceeded waiting for %s" % (key,))
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                call.finished = time.time()
+                if call.error is not None and self.calls.get(key) is call:
+                    del self.calls[key]
+            call.event.set()
+        return call.result
+
+    def get_stats(self):
+        return {'executed': self.executed, 'shared': self.shared, 'timeouts': self.timeouts}
+
+
+_group = SingleFlight()
+
+
+def do(key, func, *args, **kwargs):
+    return _group.do(key, func, *args, **kwargs)
+
+
+def get_stats():
+    return _group.get_stats()
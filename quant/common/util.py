@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import importlib
+
 
 def convert_currency_bfx(currency):
     currency = currency.lower()
@@ -11,3 +13,13 @@ def convert_currency_bfx(currency):
     if currency == "iota":
         currency = 'iot'
     return currency.upper()
+
+
+def load_object(path):
+    """
+    按路径导入类或函数, 如'quant.markets._bitfinex.Bitfinex',
+    第一次用到时才import模块, 之后走sys.modules缓存
+    """
+    module_name, object_name = path.rsplit('.', 1)
+    module = importlib.import_module(module_name)
+    return getattr(module, object_name)
@@ -32,6 +32,100 @@ INTERVAL_MARKET = 5
 INTERVAL_API = 1
 INTERVAL_RETRY = 1
 
+# depth拉取方式, pool: 10个worker的线程池; concurrent: 每个market一个worker并发拉取
+DATAFEED_FETCH_MODE = 'pool'
+# 每次depth请求(包括重试和对冲)最长的时间(秒), 到时间http请求直接超时, 释放worker线程
+FETCH_DEADLINE = 3
+# 事件驱动模式, market的depth一到就通知依赖它的observer, 不再按INTERVAL_MARKET批量tick
+DATAFEED_EVENT_DRIVEN = False
+# market连续失败多少次后熔断, 熔断期间不再拉取, 不占worker线程
+BREAKER_FAILURE_THRESHOLD = 3
+# 熔断后第一次试探的间隔(秒), 试探失败翻倍, 最长BREAKER_MAX_PROBE_INTERVAL
+BREAKER_PROBE_INTERVAL = 5
+BREAKER_MAX_PROBE_INTERVAL = 300
+# 尾延迟对冲: 这些market的depth请求超过最近延迟的HEDGE_PERCENTILE分位还没返回, 再发一个相同的请求,
+# 先返回的有效结果胜出, 如['Bithumb_BTC_KRW', 'Bitflyer_BTC_JPY']
+HEDGE_MARKETS = []
+HEDGE_PERCENTILE = 90
+# 每个交易所最近60秒的对冲请求数最多占行情请求数的比例
+HEDGE_MAX_EXTRA_RATIO = 0.1
+# 计算分位数用的最近请求数, 样本不够HEDGE_MIN_SAMPLES时不对冲
+HEDGE_LATENCY_WINDOW = 100
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = 8
+# 同一个market的depth/同一个交易对的ticker并发请求合并成一个, 请求结束后这么久(秒)内再来的调用方直接用结果
+SINGLE_FLIGHT_FRESHNESS = 0.2
+# observer依赖的盘口都没变化时跳过tick, 但最多跳过这么久(秒)
+DATAFEED_MAX_SKIP_INTERVAL = 10
+# websocket推送的market(markets/streaming_market.py): 断线重连的初始/最长间隔(秒), 超过这么久没有消息算断线
+STREAM_RECONNECT_DELAY = 1
+STREAM_MAX_RECONNECT_DELAY = 60
+STREAM_IDLE_TIMEOUT = 30
+# 等待快照期间最多缓存的增量消息数
+STREAM_MAX_PENDING = 1000
+# 用websocket推送盘口的market, 没有列出的交易所(见market_factory.STREAMING_MARKET_CLASSES)仍然轮询
+# 例如T_Binance和C_USDT: ['Binance_ETH_BTC', 'Binance_BNB_BTC', 'Binance_BNB_ETH', 'Binance_ETH_USDT', 'Binance_BTC_USDT']
+# Bitfinex的三角套利(t_bfx_btc_usd, t_bfx_btc, t_bfx_lq_new): ['Bitfinex_BTC_USD', 'Bitfinex_BT1_USD', 'Bitfinex_BT2_USD', 'Bitfinex_BT1_BTC', 'Bitfinex_BT2_BTC']
+STREAMING_MARKETS = []
+# 用账户推送更新订单状态的交易所, 见brokers/account_stream.py, 例如['Bitfinex', 'Binance']
+ACCOUNT_STREAMS = []
+# 每个交易所本地最多保存的订单数, 超过时删掉最早结束的订单
+ORDER_STORE_SIZE = 1000
+# 统一查询未完成订单的间隔(秒), 见brokers/order_tracker.py, 有成交时回到最小值, 没变化时翻倍
+ORDER_TRACKER_MIN_INTERVAL = 1
+ORDER_TRACKER_MAX_INTERVAL = 30
+# 查询间隔不超过订单存在时间的比例, 新订单查得勤
+ORDER_TRACKER_AGE_RATIO = 0.1
+
+# 自适应拉取间隔(秒), 盘口变化时缩短, 不变或出错时拉长
+# 没到期的market沿用上次的盘口, 超过market_expiration_time的不再给observer, 见DataFeed.update_depths
+SCHEDULER_MIN_INTERVAL = 0.5
+SCHEDULER_MAX_INTERVAL = 10
+# 请求失败后最长的退避时间
+SCHEDULER_MAX_BACKOFF = 60
+# 每个交易所每分钟允许的请求数, 行情和broker的账户/交易请求共用, 见common/rate_limiter.py
+EXCHANGE_RATE_LIMIT = {
+    # 认证接口每分钟90次, 行情另见EXCHANGE_MARKET_RATE_LIMIT
+    'Bitfinex': 90,
+    'Binance': 600,
+    'Kraken': 60,
+    'Liqui': 120,
+    'Bithumb': 300,
+    'Bitflyer': 300,
+    'Huobi': 300,
+}
+DEFAULT_RATE_LIMIT = 60
+# 行情接口和认证接口分开限额的交易所, 行情(market轮询, broker的ticker)用单独的桶, 不占EXCHANGE_RATE_LIMIT
+EXCHANGE_MARKET_RATE_LIMIT = {
+    # 公开的book/ticker接口每分钟90次, 按IP计
+    'Bitfinex': 90,
+}
+# 令牌桶最多攒下的请求数, 空闲一段时间后允许的突发请求
+RATE_LIMIT_BURST = 10
+# 低优先级的请求拿令牌后桶里至少要剩下的令牌数, 留给下单/撤单
+RATE_LIMIT_RESERVE = {
+    'account': 1,
+    'market': 2,
+}
+# 行情/账户请求等令牌的最长时间(秒), 超时不发请求, 下单/撤单一直等
+RATE_LIMIT_MARKET_TIMEOUT = 1
+RATE_LIMIT_ACCOUNT_TIMEOUT = 5
+# binance用allBookTickers一次拉取所有交易对, 只有买一卖一, 需要多档depth的market仍然单独拉取
+BINANCE_BATCH_BOOK_TICKER = False
+# 默认拉取的depth档数, 每个market按依赖它的observer里required_depth_levels最大的拉取
+DEPTH_LEVELS = 5
+# 只监控不下单的bot只看买一卖一
+MONITOR_DEPTH_LEVELS = 1
+
+# 创建market/broker时的并发数, 各交易所client初始化的网络请求同时进行
+FACTORY_INIT_WORKERS = 8
+# 交易所http连接池, 每个host同时保持的keep-alive连接数, 超过时block=True排队等待, False临时新建连接
+HTTP_POOL_MAXSIZE = 10
+HTTP_POOL_BLOCK = False
+# binance products(下单校验用)的本地缓存文件和有效期(秒)
+BINANCE_PRODUCTS_CACHE_FILE = 'cache/binance_products.json'
+BINANCE_PRODUCTS_CACHE_TTL = 6 * 3600
+
 # market_expiration_time = 120  # in seconds: 2 minutes
 market_expiration_time = 2  # in seconds: 2 minutes
 
@@ -4,18 +4,33 @@
 import config
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor, wait
+import Queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 import traceback
 
 import sys
 import signal
 
+from quant.api import http_pool
+from quant.common import circuit_breaker, rate_limiter, single_flight
+from quant.markets import hedging
 from quant.tool import email_box
 
 from markets.market_factory import create_markets
+from markets.market import group_markets
+from markets.market_fetcher import MarketFetcher
+from markets.market_scheduler import MarketScheduler
+from markets.depth_snapshot import BookEntry, DepthSnapshot
+from markets.order_book import OrderBook
 
 is_sigint_up = False
 
+# 10个worker的线程池, 每个market一个任务, market多了要排队
+FETCH_MODE_POOL = 'pool'
+# 每个market一个worker, 所有market同时拉取
+FETCH_MODE_CONCURRENT = 'concurrent'
+
 
 def sigint_handler(signum, frame):
     global is_sigint_up
@@ -24,15 +39,37 @@ def sigint_handler(signum, frame):
 
 
 class DataFeed(object):
-    def __init__(self):
+    def __init__(self, fetch_mode=None, event_driven=None):
+        self.fetch_mode = fetch_mode if fetch_mode else config.DATAFEED_FETCH_MODE
+        self.event_driven = config.DATAFEED_EVENT_DRIVEN if event_driven is None else event_driven
         self.markets = []
         self.market_names = []
         self.observers = []
         self.observer_names = []
-        self.depths = {}
+        # 不可变的depth快照, 每次更新整体替换
+        self.depths = DepthSnapshot()
+        # market name -> 依赖它的observer, 只拉取被依赖的market
+        self.market_observers = {}
+        self.active_markets = []
+        # 比依赖market的拉取档数要求少的observer, tick时只给它看前几档
+        self.observer_depth_levels = {}
+        # observer上次tick时依赖market盘口的fingerprint和tick的时间, 盘口都没变就跳过tick
+        self.observer_versions = {}
+        self.skipped_ticks = 0
+        # observer -> [tick次数, 跳过次数], 见log_tick_stats
+        self.tick_stats = {}
+        # 熔断中的market, 状态变化时通知observer
+        self.tripped_markets = set()
+        # 已经启动推送的market, 见start_streams
+        self.streaming_markets = set()
+        # 推送线程放进events但主循环还没处理的market, 推送线程和主循环都会读写, 用stream_lock保护
+        self.stream_pending = set()
+        self.stream_lock = threading.Lock()
         self.init_markets(config.markets)
         self.init_observers(config.observers)
         self.thread_pool = ThreadPoolExecutor(max_workers=10)
+        self.market_fetcher = MarketFetcher(timeout=3)
+        self.market_scheduler = MarketScheduler()
 
     def init_markets(self, _markets):
         logging.debug("init_markets:%s" % _markets)
@@ -44,6 +81,8 @@ class DataFeed(object):
                 continue
             self.markets.append(market)
 
+        self.rebuild_market_index()
+
     def init_observers(self, _observers):
         logging.debug("init_observers:%s" % _observers)
 
@@ -58,9 +97,60 @@ class DataFeed(object):
                 print("%s observer name is invalid: Ignored (you should check your config file)" % observer_name)
                 print(e)
 
+        self.rebuild_market_index()
+
     def register_observer(self, _observer):
         logging.debug("register_observer:%s" % _observer)
         self.observers.append(_observer)
+        self.rebuild_market_index()
+
+    def add_markets(self, market_names):
+        """observer依赖但没有配置的market, 自动创建"""
+        for market_name in market_names:
+            try:
+                markets_dict = create_markets([market_name])
+            except AssertionError:
+                logging.warn("%s is required by observer but not supported" % market_name)
+                continue
+            self.markets.append(markets_dict[market_name])
+            self.market_names.append(market_name)
+
+    def rebuild_market_index(self):
+        self.market_observers = {}
+        for observer in self.observers:
+            for market_name in observer.required_markets():
+                self.market_observers.setdefault(market_name, []).append(observer)
+
+        self.add_markets([x for x in self.market_observers if not self.get_market(x)])
+
+        if self.market_observers:
+            self.active_markets = [x for x in self.markets if x.name in self.market_observers]
+        else:
+            # 没有observer声明依赖, 拉取所有market
+            self.active_markets = list(self.markets)
+        logging.debug("active markets:%s" % [x.name for x in self.active_markets])
+
+        self.rebuild_depth_levels()
+
+    def rebuild_depth_levels(self):
+        """每个market按依赖它的observer里要求最多的档数拉取"""
+        for market in self.markets:
+            levels = [x.required_depth_levels() for x in self.get_market_observers(market.name)]
+            market.depth_levels = max(levels) if levels else config.DEPTH_LEVELS
+            logging.debug("%s depth levels:%s" % (market.name, market.depth_levels))
+
+        self.observer_depth_levels = {}
+        for observer in self.observers:
+            levels = observer.required_depth_levels()
+            markets = [self.get_market(x) for x in observer.required_markets()] or self.markets
+            if any(x and x.depth_levels > levels for x in markets):
+                self.observer_depth_levels[observer] = levels
+
+    def get_observer_depths(self, observer):
+        levels = self.observer_depth_levels.get(observer)
+        if levels is None:
+            return self.depths
+        return self.depths.with_levels(levels)
 
     def get_market(self, market_name):
         for market in self.markets:
@@ -69,53 +159,195 @@ class DataFeed(object):
 
         return None
 
+    def set_depths(self, entries):
+        self.depths = DepthSnapshot(entries, self.depths.version + 1)
+
+    def set_depth(self, entry):
+        if self.depths.get_seq(entry.name) == entry.seq:
+            return False
+        self.depths = self.depths.replace(updated=[entry])
+        return True
+
+    def remove_depth(self, market_name):
+        if market_name in self.depths:
+            self.depths = self.depths.replace(removed=[market_name])
+
+    def remove_expired_depths(self, now=None):
+        """
+        事件驱动模式只有拉取失败才会remove_depth, 熔断中的market和断开的推送会一直留着旧盘口,
+        每次分发前按和轮询模式(update_depths)一样的规则去掉过期的
+        """
+        if now is None:
+            now = time.time()
+        expired = []
+        for market_name in self.depths:
+            market = self.get_market(market_name)
+            if market is None or market.is_entry_expired(self.depths.get_entry(market_name), now):
+                expired.append(market_name)
+        if expired:
+            logging.debug("remove expired depths: %s" % expired)
+            self.depths = self.depths.replace(removed=expired)
+        return expired
+
+    def is_inputs_changed(self, observer, depths):
+        """
+        observer依赖的market盘口和上次tick时是否不同, 按observer看到的档数比较fingerprint.
+        盘口不变时最多跳过DATAFEED_MAX_SKIP_INTERVAL秒, 让observer按新的时间做过期判断
+        """
+        required_markets = observer.required_markets()
+        if not required_markets:
+            return True
+
+        versions = []
+        for market_name in required_markets:
+            if market_name not in depths:
+                # 数据缺失也要tick, observer自己做风控
+                return True
+            versions.append(depths[market_name].fingerprint())
+
+        versions = tuple(versions)
+        now = time.time()
+        last = self.observer_versions.get(observer)
+        if last and last[0] == versions and now - last[1] < config.DATAFEED_MAX_SKIP_INTERVAL:
+            return False
+        self.observer_versions[observer] = (versions, now)
+        return True
+
+    def should_tick(self, observer, depths):
+        stats = self.tick_stats.setdefault(observer, [0, 0])
+        if self.is_inputs_changed(observer, depths):
+            stats[0] += 1
+            return True
+        stats[1] += 1
+        self.skipped_ticks += 1
+        return False
+
+    def log_tick_stats(self):
+        """盘口不变省掉的observer计算和拉取到的重复盘口"""
+        for observer, (ticked, skipped) in self.tick_stats.items():
+            logging.debug("observer %s: ticked=%s skipped=%s" % (observer.__class__.__name__, ticked, skipped))
+        for market in self.active_markets:
+            stats = market.breaker.get_stats()
+            logging.debug("market %s: fetched=%s unchanged=%s breaker=%s trips=%s rejected=%s" % (
+                market.name, market.depth_seq, market.unchanged_count, stats['state'], stats['trips'],
+                stats['rejected']))
+
+    def get_breaker_stats(self):
+        """{market_name: {'state', 'failures', 'trips', 'rejected', 'probe_interval'}}"""
+        return dict((x.name, x.breaker.get_stats()) for x in self.active_markets)
+
+    def check_breakers(self, markets):
+        """market熔断或恢复时通知依赖它的observer, 只在主线程里调用"""
+        for market in markets:
+            tripped = market.breaker.state != circuit_breaker.STATE_CLOSED
+            if tripped == (market.name in self.tripped_markets):
+                continue
+            if tripped:
+                self.tripped_markets.add(market.name)
+                for observer in self.get_market_observers(market.name):
+                    observer.on_market_tripped(market.name, market.breaker.last_error)
+            else:
+                self.tripped_markets.discard(market.name)
+                for observer in self.get_market_observers(market.name):
+                    observer.on_market_recovered(market.name)
+
     def observer_tick(self):
         for observer in self.observers:
-            observer.tick(self.depths)
+            depths = self.get_observer_depths(observer)
+            if not self.should_tick(observer, depths):
+                logging.debug("skip tick %s, depths not changed" % observer.__class__.__name__)
+                continue
+            observer.tick(depths)
+
+    def get_market_observers(self, market_name):
+        observers = list(self.market_observers.get(market_name, []))
+        for observer in self.observers:
+            if not observer.required_markets():
+                observers.append(observer)
+        return observers
+
+    def market_tick(self, market_name):
+        """只通知依赖该market的observer"""
+        for observer in self.get_market_observers(market_name):
+            depths = self.get_observer_depths(observer)
+            if not self.should_tick(observer, depths):
+                continue
+            observer.on_depth_update(market_name, depths)
 
     def tick(self):
         self.print_tickers()
 
         self.observer_tick()
 
-    @classmethod
-    def __get_market_depth(cls, market, depths):
-        depth = market.get_depth()
-        if depth:
-            depths[market.name] = depth
+    def fetch_depths(self, markets):
+        """
+        :return: {market_name: BookEntry}, 只收集timeout内完成的结果, 超时的任务不会再写入
+        """
+        if self.fetch_mode == FETCH_MODE_CONCURRENT:
+            return self.market_fetcher.fetch(markets)
 
-    def update_depths(self):
-        # depths = {}
-        depths = {}
-        futures = []
+        return self.market_fetcher.fetch_with(self.thread_pool, markets, 3)
 
-        for market in self.markets:
-            futures.append(self.thread_pool.submit(self.__get_market_depth, market, depths))
-        # wait(futures, timeout=20)
-        wait(futures, timeout=3)
-        return depths
+    def update_depths(self):
+        """只拉取到期的market, 没到期的沿用上次的depth, 超过market_expiration_time的不再沿用"""
+        due_markets = self.market_scheduler.due_markets(self.active_markets)
+        fetched = self.fetch_depths(due_markets)
+
+        now = time.time()
+        entries = {}
+        for market in self.active_markets:
+            if market not in due_markets and market.name in self.depths:
+                entry = self.depths.get_entry(market.name)
+                if not market.is_entry_expired(entry, now):
+                    entries[market.name] = entry
+
+        for market in due_markets:
+            entry = fetched.get(market.name)
+            if entry:
+                self.market_scheduler.on_success(market, not entry.unchanged)
+                entries[market.name] = entry
+            elif not self.market_fetcher.is_in_flight(market):
+                self.market_scheduler.on_failure(market, market.last_error)
+            # 请求还没结束的market, 等它结束后下一轮再按结果调度
+        self.check_breakers(due_markets)
+        return entries
 
     def print_tickers(self):
-        for market in self.markets:
-            logging.debug("ticker: " + market.name + " - " + str(market.get_ticker()))
+        """只读当前快照, 不触发拉取"""
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return
+        for market_name in self.depths:
+            logging.debug("ticker: " + market_name + " - " + str(self.depths.get_ticker(market_name)))
 
     def replay_history(self, directory):
         import os
         import json
         files = os.listdir(directory)
         files.sort()
-        for f in files:
+        for seq, f in enumerate(files):
             depths = json.load(open(directory + '/' + f, 'r'))
-            self.depths = {}
+            timestamp = os.path.getmtime(directory + '/' + f)
+            entries = {}
             for market in self.market_names:
                 if market in depths:
-                    self.depths[market] = depths[market]
+                    depth = OrderBook.from_levels(depths[market]['bids'], depths[market]['asks'], 'price', 'amount')
+                    entries[market] = BookEntry(market, depth, timestamp, timestamp, seq)
+            self.set_depths(entries)
             self.tick()
 
     def update_balance(self):
         for observer in self.observers:
             observer.update_balance()
 
+        # 和balance同一个节奏打印连接复用情况(确认depth轮询没有每次都重新握手)和跳过的tick数
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            http_pool.log_stats()
+            rate_limiter.log_stats()
+            hedging.log_stats()
+            self.market_fetcher.log_stats()
+            logging.debug("single flight: %s" % single_flight.get_stats())
+            self.log_tick_stats()
+
     def update_other(self):
         for observer in self.observers:
             observer.update_other()
@@ -127,8 +359,16 @@ class DataFeed(object):
         for market in self.markets:
             market.terminate()
 
+        self.market_fetcher.shutdown()
+
+    def handle_exception(self, ex):
+        logging.warn("datafeed exception:%s" % ex)
+        traceback.print_exc()
+        self.terminate()
+        email_box.send_mail("datafeed exception:%s" % ex)
+
     def run_loop(self):
-        if len(self.markets) == 0:
+        if len(self.active_markets) == 0:
             print('empty markets')
             return
 
@@ -141,20 +381,21 @@ class DataFeed(object):
         signal.signal(signal.SIGHUP, sigint_handler)
         signal.signal(signal.SIGTERM, sigint_handler)
 
+        if self.event_driven:
+            self.run_event_loop()
+            return
+
         while True:
             try:
                 self.update_balance()
                 self.update_other()
                 time.sleep(config.INTERVAL_API)
 
-                self.depths = self.update_depths()
+                self.set_depths(self.update_depths())
 
                 self.tick()
             except Exception as ex:
-                logging.warn("datafeed exception:%s" % ex)
-                traceback.print_exc()
-                self.terminate()
-                email_box.send_mail("datafeed exception:%s" % ex)
+                self.handle_exception(ex)
                 return
 
             if is_sigint_up:
@@ -165,3 +406,104 @@ class DataFeed(object):
             sys.stdout.write(".\n\n")
             sys.stdout.flush()
             time.sleep(config.INTERVAL_MARKET)
+
+    def start_streams(self, events):
+        """websocket推送的market不参与轮询, 盘口更新时把结果放进events, 和拉取完成的market一样处理"""
+        for market in self.active_markets:
+            if not market.is_streaming or market in self.streaming_markets:
+                continue
+            market.add_listener(lambda m: self.on_stream_depth(m, events))
+            market.start()
+            self.streaming_markets.add(market)
+
+    def on_stream_depth(self, market, events):
+        """
+        在推送线程里调用, 只通过events交给主循环, 不碰主循环的in_flight和depths.
+        主循环还没处理上一次更新时不再放入, 处理时读的是最新的book_entry
+        """
+        with self.stream_lock:
+            if market.name in self.stream_pending:
+                return
+            self.stream_pending.add(market.name)
+        future = Future()
+        future.set_result({market.name: True})
+        events.put(([market], future))
+
+    def on_stream_handled(self, market):
+        with self.stream_lock:
+            self.stream_pending.discard(market.name)
+
+    def run_event_loop(self):
+        """
+        事件驱动模式: 每个market独立拉取, 哪个market的depth先回来, 就先通知依赖它的observer,
+        不用等同一批次里最慢的请求, 也没有固定的INTERVAL_MARKET等待.
+        websocket推送的market不轮询, 盘口一变就通知
+        """
+        self.market_fetcher.ensure_workers(len(self.active_markets))
+        events = Queue.Queue()
+        in_flight = set()
+        last_balance = 0
+        balance_interval = config.INTERVAL_API + config.INTERVAL_MARKET
+
+        while True:
+            try:
+                now = time.time()
+                if now - last_balance >= balance_interval:
+                    self.update_balance()
+                    self.update_other()
+                    last_balance = time.time()
+
+                self.start_streams(events)
+                polled_markets = [x for x in self.active_markets if not x.is_streaming]
+                idle_markets = [x for x in polled_markets if x.name not in in_flight]
+                # 同一个交易所同时到期的market, 支持批量的合并成一个请求
+                for group in group_markets(self.market_scheduler.due_markets(idle_markets, now)):
+                    future = self.market_fetcher.submit(self.market_fetcher.executor, group[0].ask_update_depths, group)
+                    if not future:
+                        continue
+                    for market in group:
+                        in_flight.add(market.name)
+                    future.add_done_callback(lambda f, g=group: events.put((g, f)))
+
+                next_fetch = last_balance + balance_interval
+                idle_markets = [x for x in polled_markets if x.name not in in_flight]
+                if idle_markets:
+                    next_fetch = min(next_fetch, self.market_scheduler.next_due_time(idle_markets))
+
+                try:
+                    group, future = events.get(timeout=max(next_fetch - time.time(), 0.01))
+                except Queue.Empty:
+                    group = None
+
+                self.remove_expired_depths()
+                while group:
+                    results = future.result()
+                    for market in group:
+                        if market.is_streaming:
+                            # 先清掉, 读book_entry之后的推送会再放进events
+                            self.on_stream_handled(market)
+                        else:
+                            in_flight.discard(market.name)
+                        if results.get(market.name):
+                            entry = market.book_entry
+                            self.market_scheduler.on_success(market, not entry.unchanged)
+                            if self.set_depth(entry):
+                                logging.debug("event: %s depth updated" % market.name)
+                                self.market_tick(market.name)
+                        else:
+                            self.market_scheduler.on_failure(market, market.last_error)
+                            self.remove_depth(market.name)
+                    self.check_breakers(group)
+
+                    try:
+                        group, future = events.get_nowait()
+                    except Queue.Empty:
+                        group = None
+            except Exception as ex:
+                self.handle_exception(ex)
+                return
+
+            if is_sigint_up:
+                logging.info("APP Exit")
+                self.terminate()
+                break
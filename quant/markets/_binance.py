@@ -1,84 +1,128 @@
+# -*- coding: UTF-8 -*-
 # Copyright (C) 2017, Philsong <songbohr@gmail.com>
 
-from quant.api.binance import Client
-from quant.markets import market_util
+import itertools
+import logging
+
+from quant import config
+from quant.api import binance
+from quant.markets.order_book import OrderBook
+from quant.common import constant, pair_registry
 from .market import Market
+from .streaming_market import StreamingMarket
+
+# depth接口的limit只能是这几个值
+BOOK_LIMITS = (5, 10, 20, 50, 100)
+
+# 所有交易对共用一个combined stream连接, 连上后按交易对订阅
+STREAM_URL = 'wss://stream.binance.com:9443/stream'
+# 增量深度推送, 每100ms一次
+DEPTH_STREAM = '%s@depth@100ms'
+# 同步用的REST快照档数
+SNAPSHOT_LIMIT = 1000
 
 
 class Binance(Market):
+    # allBookTickers一次返回所有交易对, 但只有买一卖一, 需要在config里打开
+    batch_size = 200 if config.BINANCE_BATCH_BOOK_TICKER else 1
+
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Binance, self).__init__(base_currency, market_currency, pair_code, 0.001)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_BINANCE, pair_code)
+        super(Binance, self).__init__(base_currency, market_currency, pair_code, fee_rate)
+
+        # 所有Binance market共用一个client
+        self.client = binance.get_shared_client(products_cache_file=config.BINANCE_PRODUCTS_CACHE_FILE,
+                                                products_cache_ttl=config.BINANCE_PRODUCTS_CACHE_TTL)
 
-        self.client = Client(None, None)
+    def get_book_limit(self):
+        for limit in BOOK_LIMITS:
+            if limit >= self.depth_levels:
+                return limit
+        return BOOK_LIMITS[-1]
 
-    def update_depth(self):
-        raw_depth = self.client.get_order_book(symbol=self.pair_code, limit=5)
+    def fetch_depth(self):
+        raw_depth = self.client.get_order_book(symbol=self.pair_code, limit=self.get_book_limit())
         if raw_depth:
-            self.depth = self.format_depth(raw_depth)
+            return self.format_depth(raw_depth)
+
+    @classmethod
+    def fetch_depths(cls, markets):
+        tickers = markets[0].client.get_orderbook_tickers()
+        if not tickers:
+            return {}
+        tickers = dict((x['symbol'], x) for x in tickers)
+        depths = {}
+        for market in markets:
+            if market.depth_levels > 1:
+                # book ticker只有一档, 要多档的market还是单独拉取depth
+                try:
+                    market.acquire_rate_limit()
+                    depth = market.fetch_depth()
+                except Exception as e:
+                    logging.warn("%s fetch depth failed: %s" % (market.name, e))
+                    continue
+                if depth:
+                    depths[market.name] = depth
+                continue
+            ticker = tickers.get(market.pair_code)
+            if ticker:
+                depths[market.name] = OrderBook.from_levels([[ticker['bidPrice'], ticker['bidQty']]],
+                                                            [[ticker['askPrice'], ticker['askQty']]])
+        return depths
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'BCCBTC':
-            base_currency = 'BTC'
-            market_currency = 'BCC'
-        elif pair_code == 'BTCUSDT':
-            base_currency = 'USDT'
-            market_currency = 'BTC'
-        elif pair_code == 'ETHBTC':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        elif pair_code == 'ETHUSDT':
-            base_currency = 'USDT'
-            market_currency = 'ETH'
-        elif pair_code == 'BNBBTC':
-            base_currency = 'BTC'
-            market_currency = 'BNB'
-        elif pair_code == 'BNBETH':
-            base_currency = 'ETH'
-            market_currency = 'BNB'
-        elif pair_code == 'MCOBTC':
-            base_currency = 'BTC'
-            market_currency = 'MCO'
-        elif pair_code == 'MCOETH':
-            base_currency = 'ETH'
-            market_currency = 'MCO'
-        elif pair_code == 'QTUMBTC':
-            base_currency = 'BTC'
-            market_currency = 'QTUMBCH'
-        elif pair_code == 'QTUMETH':
-            base_currency = 'ETH'
-            market_currency = 'QTUM'
-        elif pair_code == 'WTCBTC':
-            base_currency = 'BTC'
-            market_currency = 'WTC'
-        elif pair_code == 'WTCETH':
-            base_currency = 'ETH'
-            market_currency = 'WTC'
-        elif pair_code == 'NEOBTC':
-            base_currency = 'BTC'
-            market_currency = 'NEO'
-        elif pair_code == 'NEOETH':
-            base_currency = 'ETH'
-            market_currency = 'NEO'
-        elif pair_code == 'IOTAETH':
-            base_currency = 'ETH'
-            market_currency = 'IOTA'
-        elif pair_code == 'IOTABTC':
-            base_currency = 'BTC'
-            market_currency = 'IOTA'
-        elif pair_code == 'ZRXBTC':
-            base_currency = 'BTC'
-            market_currency = 'ZRX'
-        elif pair_code == 'ZRXETH':
-            base_currency = 'ETH'
-            market_currency = 'ZRX'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_BINANCE, pair_code)
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_list(depth['bids'], True)
-        asks = market_util.sort_and_format_list(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'])
+
+
+class BinanceStream(StreamingMarket):
+    """
+    diff depth推送, config.STREAMING_MARKETS里的Binance market用这个类.
+    同步方式按Binance文档:
+        连接后先缓存推送的增量, 用REST拉快照(lastUpdateId)
+        丢弃u <= lastUpdateId的增量, 第一个增量满足U <= lastUpdateId + 1 <= u
+        之后每个增量的U等于上一个的u + 1, 否则重新拉快照
+    REST接口只在同步时用
+    """
+    snapshot_from_rest = True
+    ws_url = STREAM_URL
+
+    _request_ids = itertools.count(1)
+
+    def __init__(self, pair_code):
+        base_currency, market_currency = self.get_available_pairs(pair_code)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_BINANCE, pair_code)
+        super(BinanceStream, self).__init__(base_currency, market_currency, pair_code, fee_rate)
+
+        self.client = binance.get_shared_client(products_cache_file=config.BINANCE_PRODUCTS_CACHE_FILE,
+                                                products_cache_ttl=config.BINANCE_PRODUCTS_CACHE_TTL)
+        self.stream_name = DEPTH_STREAM % self.pair_code.lower()
+
+    def get_subscribe_messages(self):
+        return [{'method': 'SUBSCRIBE', 'params': [self.stream_name], 'id': next(self._request_ids)}]
+
+    def get_unsubscribe_messages(self):
+        return [{'method': 'UNSUBSCRIBE', 'params': [self.stream_name], 'id': next(self._request_ids)}]
+
+    def handle_message(self, message):
+        # 订阅的应答({"result": null, "id": 1})和其他交易对的推送都跳过
+        if message.get('stream') != self.stream_name:
+            return
+        data = message['data']
+        self.apply_diff(data['b'], data['a'], data['U'], data['u'])
+
+    def fetch_snapshot(self):
+        self.acquire_rate_limit()
+        raw_depth = self.client.get_order_book(symbol=self.pair_code, limit=SNAPSHOT_LIMIT)
+        if not raw_depth:
+            return None
+        return raw_depth['bids'], raw_depth['asks'], raw_depth['lastUpdateId']
+
+    @classmethod
+    def get_available_pairs(cls, pair_code):
+        return Binance.get_available_pairs(pair_code)
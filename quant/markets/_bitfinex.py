@@ -1,22 +1,37 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import logging
+import zlib
+from decimal import Decimal
+
 from .market import Market
 from quant.api.bitfinex import PublicClient as Client
-import market_util
+from quant.common import constant, pair_registry
+from .order_book import OrderBook
+from .streaming_market import StreamingMarket
+
+# v2 websocket, 所有交易对的book channel共用一个连接
+STREAM_URL = 'wss://api.bitfinex.com/ws/2'
+# conf的flag, 打开后每次更新后推送盘口前25档的checksum
+FLAG_CHECKSUM = 131072
+# 订阅的档数, checksum按前25档算
+BOOK_LENGTH = 25
+CHECKSUM_LEVELS = 25
 
 
 class Bitfinex(Market):
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Bitfinex, self).__init__(base_currency, market_currency, pair_code, 0.002)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_BFX, pair_code)
+        super(Bitfinex, self).__init__(base_currency, market_currency, pair_code, fee_rate)
         self.client = Client()
 
-    def update_depth(self):
+    def fetch_depth(self):
         try:
-            depth_raw = self.client.depth(self.pair_code)
+            depth_raw = self.client.depth(self.pair_code, limit=self.depth_levels)
             if depth_raw:
-                self.depth = self.format_depth(depth_raw)
+                return self.format_depth(depth_raw)
             else:
                 raise ValueError('response is None')
         except Exception as e:
@@ -24,75 +39,129 @@ class Bitfinex(Market):
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_dict(depth['bids'], True)
-        asks = market_util.sort_and_format_dict(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'], 'price', 'amount')
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'ethusd':
-            base_currency = 'USD'
-            market_currency = 'ETH'
-        elif pair_code == 'ethbtc':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        elif pair_code == 'etcbtc':
-            base_currency = 'BTC'
-            market_currency = 'ETC'
-        elif pair_code == 'etcusd':
-            base_currency = 'USD'
-            market_currency = 'ETC'
-        elif pair_code == 'bchbtc':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        elif pair_code == 'btcusd':
-            base_currency = 'USD'
-            market_currency = 'BTC'
-        elif pair_code == 'bt1usd':
-            base_currency = 'USD'
-            market_currency = 'BT1'
-        elif pair_code == 'bt2usd':
-            base_currency = 'USD'
-            market_currency = 'BT2'
-        elif pair_code == 'bt1btc':
-            base_currency = 'BTC'
-            market_currency = 'BT1'
-        elif pair_code == 'bt2btc':
-            base_currency = 'BTC'
-            market_currency = 'BT2'
-        elif pair_code == 'bchusd':
-            base_currency = 'USD'
-            market_currency = 'BCH'
-        elif pair_code == 'eosusd':
-            base_currency = 'USD'
-            market_currency = 'EOS'
-        elif pair_code == 'eoseth':
-            base_currency = 'ETH'
-            market_currency = 'EOS'
-        elif pair_code == 'zecusd':
-            base_currency = 'USD'
-            market_currency = 'ZEC'
-        elif pair_code == 'neousd':
-            base_currency = 'USD'
-            market_currency = 'NEO'
-        elif pair_code == 'neobtc':
-            base_currency = 'BTC'
-            market_currency = 'NEO'
-        elif pair_code == 'neoeth':
-            base_currency = 'ETH'
-            market_currency = 'NEO'
-        elif pair_code == 'iotusd':
-            base_currency = 'USD'
-            market_currency = 'IOT'
-        elif pair_code == 'iotbtc':
-            base_currency = 'BTC'
-            market_currency = 'IOT'
-        elif pair_code == 'zrxeth':
-            base_currency = 'ETH'
-            market_currency = 'ZRX'
-        elif pair_code == 'zrxbtc':
-            base_currency = 'BTC'
-            market_currency = 'ZRX'
+        return pair_registry.get_available_pairs(constant.EX_BFX, pair_code)
+
+
+def format_number(value):
+    """按javascript的Number.toString格式化, 和交易所算checksum时用的字符串一致"""
+    text = repr(float(value))
+    if 'e' in text:
+        mantissa, exponent = text.split('e')
+        exponent = int(exponent)
+        if -7 < exponent < 21:
+            text = format(Decimal(text), 'f')
         else:
-            assert False
-        return base_currency, market_currency
+            if mantissa.endswith('.0'):
+                mantissa = mantissa[:-2]
+            return '%se%s%d' % (mantissa, '+' if exponent > 0 else '-', abs(exponent))
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def book_checksum(bids, asks):
+    """
+    bids/asks: 按价格从优到劣的[(price, amount), ...], ask的amount为正.
+    前25档按 bid价:bid量:ask价:-ask量 交替拼接, 取有符号的crc32
+    """
+    values = []
+    for i in range(CHECKSUM_LEVELS):
+        if i < len(bids):
+            values.extend((format_number(bids[i][0]), format_number(bids[i][1])))
+        if i < len(asks):
+            values.extend((format_number(asks[i][0]), format_number(-asks[i][1])))
+    checksum = zlib.crc32(':'.join(values).encode('ascii')) & 0xffffffff
+    if checksum >= 0x80000000:
+        checksum -= 0x100000000
+    return checksum
+
+
+class BitfinexStream(StreamingMarket):
+    """
+    v2 book channel(P0, 按价格合并), config.STREAMING_MARKETS里的Bitfinex market用这个类.
+    订阅后先推送快照, 之后每条消息是一档的变化:
+        [chanId, [price, count, amount]]  amount > 0是bid, < 0是ask; count为0表示删除该价格
+    没有序号, 用交易所推送的checksum校验本地盘口, 不一致时退订再订阅, 重新拿快照
+    """
+    ws_url = STREAM_URL
+
+    def __init__(self, pair_code):
+        base_currency, market_currency = self.get_available_pairs(pair_code)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_BFX, pair_code)
+        super(BitfinexStream, self).__init__(base_currency, market_currency, pair_code, fee_rate)
+        self.symbol = 't' + pair_code.upper()
+        self.chan_id = None
+        self.stream_stats['checksum_errors'] = 0
+
+    def get_subscribe_messages(self):
+        return [{'event': 'conf', 'flags': FLAG_CHECKSUM},
+                {'event': 'subscribe', 'channel': 'book', 'symbol': self.symbol,
+                 'prec': 'P0', 'freq': 'F0', 'len': str(BOOK_LENGTH)}]
+
+    def get_unsubscribe_messages(self):
+        # 退订后旧channel还在路上的消息不再处理
+        chan_id, self.chan_id = self.chan_id, None
+        if chan_id is None:
+            return []
+        return [{'event': 'unsubscribe', 'chanId': chan_id}]
+
+    def on_disconnected(self):
+        self.chan_id = None
+        super(BitfinexStream, self).on_disconnected()
+
+    def handle_message(self, message):
+        if isinstance(message, dict):
+            if message.get('event') == 'subscribed' and message.get('channel') == 'book' and \
+                    message.get('symbol') == self.symbol:
+                self.chan_id = message['chanId']
+            elif message.get('event') == 'error' and message.get('symbol') == self.symbol:
+                logging.warn("%s subscribe failed: %s" % (self.name, message.get('msg')))
+            return
+
+        if self.chan_id is None or message[0] != self.chan_id:
+            return
+        payload = message[1]
+        if payload == 'hb':
+            return
+        if payload == 'cs':
+            self.verify_checksum(message[2])
+            return
+        if not payload or isinstance(payload[0], list):
+            bids, asks = self.split_levels(payload)
+            self.apply_snapshot(bids, asks)
+        elif self.synced:
+            bids, asks = self.split_levels([payload])
+            self.apply_diff(bids, asks)
+
+    @classmethod
+    def split_levels(cls, levels):
+        """[price, count, amount] -> bids/asks的[(price, amount)], count为0的数量记为0(删除)"""
+        bids = []
+        asks = []
+        for price, count, amount in levels:
+            if amount > 0:
+                bids.append((price, amount if count else 0))
+            else:
+                asks.append((price, -amount if count else 0))
+        return bids, asks
+
+    def verify_checksum(self, checksum):
+        with self.stream_lock:
+            if not self.synced:
+                return
+            book = self.book
+            bid_prices = book.bid_prices[:-CHECKSUM_LEVELS - 1:-1]
+            ask_prices = book.ask_prices[:CHECKSUM_LEVELS]
+            local = book_checksum([(x, book.bids[x]) for x in bid_prices], [(x, book.asks[x]) for x in ask_prices])
+            if local == checksum:
+                return
+            self.stream_stats['checksum_errors'] += 1
+            self.resync("checksum mismatch %s != %s" % (local, checksum))
+
+    @classmethod
+    def get_available_pairs(cls, pair_code):
+        return Bitfinex.get_available_pairs(pair_code)
@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 from quant.api.hitbtc import PublicClient
+from quant.common import constant, pair_registry
 
-import market_util
+from .order_book import OrderBook
 
 from .market import Market
 
@@ -10,28 +11,22 @@ from .market import Market
 class Hitbtc(Market):
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Hitbtc, self).__init__(base_currency, market_currency, pair_code, 0.002)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_HITBITC, pair_code)
+        super(Hitbtc, self).__init__(base_currency, market_currency, pair_code, fee_rate)
         self.client = PublicClient()
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'bccbtc':
-            base_currency = 'BTC'
-            market_currency = 'BCC'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_HITBITC, pair_code)
 
     def symbol(self):
         return "%s%s" % (self.market_currency.upper(), self.base_currency.upper())
 
-    def update_depth(self):
+    def fetch_depth(self):
         depth_raw = self.client.depth(self.symbol())
         if depth_raw:
-            self.depth = self.format_depth(depth_raw)
+            return self.format_depth(depth_raw)
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_list(depth['bids'], True)
-        asks = market_util.sort_and_format_list(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'])
@@ -3,16 +3,18 @@
 
 from .market import Market
 from quant.api.huobi import PublicClient as Client
-import market_util
+from quant.common import constant, pair_registry
+from .order_book import OrderBook
 
 
 class Huobi(Market):
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Huobi, self).__init__(base_currency, market_currency, pair_code, 0.002)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_HUOBI, pair_code)
+        super(Huobi, self).__init__(base_currency, market_currency, pair_code, fee_rate)
         self.client = Client()
 
-    def update_depth(self):
+    def fetch_depth(self):
         try:
             depth_raw = self.client.depth(self.pair_code)
             if depth_raw:
@@ -20,7 +22,7 @@ class Huobi(Market):
                     raise Exception('status not exist in raw response or is not ok')
                 if 'tick' not in depth_raw:
                     raise Exception('tick not exist in raw response')
-                self.depth = self.format_depth(depth_raw['tick'])
+                return self.format_depth(depth_raw['tick'])
             else:
                 raise Exception('response is None')
         except Exception as e:
@@ -28,30 +30,8 @@ class Huobi(Market):
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_list(depth['bids'], True)
-        asks = market_util.sort_and_format_list(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'])
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'ethusdt':
-            base_currency = 'USDT'
-            market_currency = 'ETH'
-        elif pair_code == 'ethbtc':
-            base_currency = 'BTC'
-            market_currency = 'ETH'
-        elif pair_code == 'etcbtc':
-            base_currency = 'BTC'
-            market_currency = 'ETC'
-        elif pair_code == 'etcusdt':
-            base_currency = 'USDT'
-            market_currency = 'ETC'
-        elif pair_code == 'bchbtc':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        elif pair_code == 'btcusdt':
-            base_currency = 'USDT'
-            market_currency = 'BTC'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_HUOBI, pair_code)
@@ -3,32 +3,27 @@
 
 from .market import Market
 from quant.api.kkex import PublicClient as Client
-import market_util
+from quant.common import constant, pair_registry
+from .order_book import OrderBook
 
 
 class Kkex(Market):
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Kkex, self).__init__(base_currency, market_currency, pair_code, 0.0025)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_KKEX, pair_code)
+        super(Kkex, self).__init__(base_currency, market_currency, pair_code, fee_rate)
         self.client = Client()
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'BCHBTC':
-            base_currency = 'BTC'
-            market_currency = 'BCH'
-        else:
-            assert False
-        return base_currency, market_currency
+        return pair_registry.get_available_pairs(constant.EX_KKEX, pair_code)
 
-    def update_depth(self):
+    def fetch_depth(self):
         depth_raw = self.client.depth(self.pair_code)
 
         if depth_raw:
-            self.depth = self.format_depth(depth_raw)
+            return self.format_depth(depth_raw)
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_list(depth['bids'], True)
-        asks = market_util.sort_and_format_list(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'])
@@ -1,40 +1,44 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 from quant.api.liqui import PublicClient
+from quant.common import constant, pair_registry
 
-import market_util
+from .order_book import OrderBook
 
 from .market import Market
 
 
 class Liqui(Market):
+    # depth接口支持'-'连接的多个交易对
+    batch_size = 10
+
     def __init__(self, pair_code):
         base_currency, market_currency = self.get_available_pairs(pair_code)
-        super(Liqui, self).__init__(base_currency, market_currency, pair_code, 0.002)
+        fee_rate = pair_registry.get_fee_rate(constant.EX_LQ, pair_code)
+        super(Liqui, self).__init__(base_currency, market_currency, pair_code, fee_rate)
         self.client = PublicClient()
 
     @classmethod
     def get_available_pairs(cls, pair_code):
-        if pair_code == 'bcc_btc':
-            base_currency = 'BTC'
-            market_currency = 'BCC'
-        elif pair_code == 'bcc_eth':
-            base_currency = 'ETH'
-            market_currency = 'BCC'
-        elif pair_code == 'eos_btc':
-            base_currency = 'BTC'
-            market_currency = 'EOS'
-        else:
-            assert False
-        return base_currency, market_currency
-
-    def update_depth(self):
-        depth_raw = self.client.depth(self.pair_code)
+        return pair_registry.get_available_pairs(constant.EX_LQ, pair_code)
+
+    def fetch_depth(self):
+        depth_raw = self.client.depth(self.pair_code, limit=self.depth_levels)
         if depth_raw and self.pair_code in depth_raw:
-            self.depth = self.format_depth(depth_raw[self.pair_code])
+            return self.format_depth(depth_raw[self.pair_code])
+
+    @classmethod
+    def fetch_depths(cls, markets):
+        # 一次请求只能指定一个limit, 取最多的, 多出来的档在Market.ask_update_depths里截掉
+        limit = max(x.depth_levels for x in markets)
+        depth_raw = markets[0].client.depths([x.pair_code for x in markets], limit=limit)
+        depths = {}
+        if depth_raw:
+            for market in markets:
+                if market.pair_code in depth_raw:
+                    depths[market.name] = cls.format_depth(depth_raw[market.pair_code])
+        return depths
 
     @classmethod
     def format_depth(cls, depth):
-        bids = market_util.sort_and_format_list(depth['bids'], True)
-        asks = market_util.sort_and_format_list(depth['asks'], False)
-        return {'asks': asks, 'bids': bids}
+        return OrderBook.from_levels(depth['bids'], depth['asks'])
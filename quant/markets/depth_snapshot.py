@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import collections
+import time
+
+from . import market_util
+
+
+class BookEntry(object):
+    """
+    一次成功拉取的depth
+        fetch_started: 发起请求的时间
+        fetch_ended: 收到并解析完的时间
+        seq: market每成功更新一次加1
+        unchanged: 和上一次拉取的盘口完全一样
+    """
+    __slots__ = ('name', 'depth', 'fetch_started', 'fetch_ended', 'seq', 'unchanged')
+
+    def __init__(self, name, depth, fetch_started, fetch_ended, seq, unchanged=False):
+        self.name = name
+        self.depth = depth
+        self.fetch_started = fetch_started
+        self.fetch_ended = fetch_ended
+        self.seq = seq
+        self.unchanged = unchanged
+
+    @property
+    def latency(self):
+        return self.fetch_ended - self.fetch_started
+
+    def age(self, now=None):
+        if now is None:
+            now = time.time()
+        return now - self.fetch_ended
+
+    def __repr__(self):
+        return "BookEntry(%s, seq=%s, fetch=[%.3f, %.3f]%s)" % (self.name, self.seq, self.fetch_started,
+                                                                self.fetch_ended,
+                                                                ', unchanged' if self.unchanged else '')
+
+
+class DepthSnapshot(collections.Mapping):
+    """
+    某一时刻所有market的depth, 创建后不再修改, 一次tick里observer看到的是同一个一致的视图.
+    兼容原来的depths dict, depths[market_name]['asks'][0]['price']的用法不变.
+    levels不为None时, depths[market_name]只返回前levels档, 见with_levels
+    """
+    __slots__ = ('_entries', 'version', 'created', 'levels')
+
+    def __init__(self, entries=None, version=0):
+        self._entries = dict(entries) if entries else {}
+        self.version = version
+        self.created = time.time()
+        self.levels = None
+
+    def __getitem__(self, market_name):
+        depth = self._entries[market_name].depth
+        if self.levels is None:
+            return depth
+        return depth.truncate(self.levels)
+
+    def __contains__(self, market_name):
+        return market_name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "DepthSnapshot(version=%s, %s)" % (self.version, sorted(self._entries.keys()))
+
+    def get_entry(self, market_name):
+        return self._entries.get(market_name)
+
+    def entries(self):
+        return self._entries.values()
+
+    def get_seq(self, market_name):
+        entry = self._entries.get(market_name)
+        return entry.seq if entry else None
+
+    def get_ticker(self, market_name):
+        """买一卖一, 只读快照"""
+        entry = self._entries.get(market_name)
+        return market_util.depth_to_ticker(entry.depth) if entry else None
+
+    def get_age(self, market_name, now=None):
+        entry = self._entries.get(market_name)
+        return entry.age(now) if entry else None
+
+    def max_skew(self, market_names=None):
+        """market之间depth的最大时间差(秒), 以收到depth的时间计算"""
+        if market_names is None:
+            market_names = self._entries.keys()
+
+        fetch_ended = [self._entries[x].fetch_ended for x in market_names if x in self._entries]
+        if len(fetch_ended) < 2:
+            return 0.
+        return max(fetch_ended) - min(fetch_ended)
+
+    def with_levels(self, levels):
+        """
+        同一个快照只看前levels档的视图, 和原快照共用entries, 不复制depth.
+        get_entry()返回的BookEntry里还是完整的depth
+        """
+        if levels == self.levels:
+            return self
+        view = DepthSnapshot(version=self.version)
+        view._entries = self._entries
+        view.created = self.created
+        view.levels = levels
+        return view
+
+    def replace(self, updated=None, removed=None):
+        """返回新的snapshot, 自身不变"""
+        entries = dict(self._entries)
+        if removed:
+            for market_name in removed:
+                entries.pop(market_name, None)
+        if updated:
+            for entry in updated:
+                entries[entry.name] = entry
+        return DepthSnapshot(entries, self.version + 1)
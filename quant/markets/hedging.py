@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+depth请求的尾延迟对冲, 只对config.HEDGE_MARKETS里的market生效:
+第一个请求超过该market最近请求延迟的p90(HEDGE_PERCENTILE)还没返回, 再发一个相同的请求,
+先返回有效depth的那个胜出.
+
+对冲请求会多占交易所的限额, 每个交易所最近60秒的对冲请求数不超过行情请求数的HEDGE_MAX_EXTRA_RATIO,
+并且要能立刻拿到rate_limiter的令牌, 否则只等第一个请求
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from quant import config
+from quant.api import http_pool
+from quant.common import rate_limiter
+
+# 统计对冲额度的时间窗口(秒)
+HEDGE_WINDOW = 60
+
+
+class LatencyTracker(object):
+    """最近HEDGE_LATENCY_WINDOW次成功请求的延迟"""
+
+    def __init__(self, size=None):
+        self.latencies = collections.deque(maxlen=size if size else config.HEDGE_LATENCY_WINDOW)
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+
+    def percentile(self, percent):
+        """样本不够HEDGE_MIN_SAMPLES时返回None"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if len(latencies) < config.HEDGE_MIN_SAMPLES:
+            return None
+        index = min(int(len(latencies) * percent / 100.), len(latencies) - 1)
+        return latencies[index]
+
+
+class ExchangeHedger(object):
+    """一个交易所的对冲额度和统计"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.requests = collections.deque()
+        self.hedges = collections.deque()
+        self.lock = threading.Lock()
+
+        self.stats = {
+            'requests': 0,
+            # 发出了对冲请求
+            'hedged': 0,
+            # 对冲请求先返回, 省下了等待时间
+            'hedge_won': 0,
+            # 发了对冲, 还是第一个请求先返回
+            'primary_won': 0,
+            # 超过阈值但额度或令牌不够, 没有对冲
+            'capped': 0,
+            # 对冲胜出时, 第一个请求后来返回的时间减去对冲返回的时间, 累计
+            'saved_seconds': 0.,
+        }
+
+    def _expire(self, now):
+        for requests in (self.requests, self.hedges):
+            while requests and now - requests[0] >= HEDGE_WINDOW:
+                requests.popleft()
+
+    def on_request(self, now):
+        with self.lock:
+            self._expire(now)
+            self.requests.append(now)
+            self.stats['requests'] += 1
+
+    def try_hedge(self, now):
+        with self.lock:
+            self._expire(now)
+            allowed = max(int(len(self.requests) * config.HEDGE_MAX_EXTRA_RATIO), 1)
+            if len(self.hedges) >= allowed or \
+                    not rate_limiter.get_market_limiter(self.exchange).try_acquire(rate_limiter.PRIORITY_MARKET, now):
+                self.stats['capped'] += 1
+                return False
+            self.hedges.append(now)
+            self.stats['hedged'] += 1
+            return True
+
+    def on_result(self, hedge_won):
+        with self.lock:
+            if hedge_won:
+                self.stats['hedge_won'] += 1
+            else:
+                self.stats['primary_won'] += 1
+
+    def add_saved(self, saved):
+        with self.lock:
+            self.stats['saved_seconds'] += saved
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+_hedgers = {}
+_trackers = {}
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.HEDGE_WORKERS)
+    return _executor
+
+
+def get_hedger(exchange):
+    hedger = _hedgers.get(exchange)
+    if hedger is None:
+        with _lock:
+            hedger = _hedgers.setdefault(exchange, ExchangeHedger(exchange))
+    return hedger
+
+
+def get_tracker(market_name):
+    tracker = _trackers.get(market_name)
+    if tracker is None:
+        with _lock:
+            tracker = _trackers.setdefault(market_name, LatencyTracker())
+    return tracker
+
+
+def fetch_depth_before(market, timestamp):
+    if timestamp is None:
+        return market.fetch_depth()
+    with http_pool.deadline_at(timestamp):
+        return market.fetch_depth()
+
+
+def submit_fetch(market, tracker):
+    started = time.time()
+    # 请求在另一个线程里发, 带上调用方的deadline
+    future = get_executor().submit(fetch_depth_before, market, http_pool.get_deadline())
+
+    def record(f):
+        if not f.exception() and f.result():
+            tracker.add(time.time() - started)
+
+    future.add_done_callback(record)
+    return future
+
+
+def get_valid_depth(future):
+    if future.exception():
+        return None
+    return future.result()
+
+
+def fetch_depth_hedged(market):
+    """
+    和market.fetch_depth()一样返回depth, 两个请求都失败时抛第一个请求的异常.
+    调用前已经拿过第一个请求的令牌
+    """
+    tracker = get_tracker(market.name)
+    hedger = get_hedger(market.exchange)
+    started = time.time()
+    hedger.on_request(started)
+
+    primary = submit_fetch(market, tracker)
+    threshold = tracker.percentile(config.HEDGE_PERCENTILE)
+    if threshold is None:
+        # 样本不够, 不对冲
+        return primary.result()
+
+    done, _ = wait([primary], timeout=threshold)
+    if done or not hedger.try_hedge(time.time()):
+        return primary.result()
+
+    logging.debug("%s depth not returned in %.3fs, hedge" % (market.name, threshold))
+    hedge = submit_fetch(market, tracker)
+
+    pending = set([primary, hedge])
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            depth = get_valid_depth(future)
+            if not depth:
+                continue
+            hedge_won = future is hedge
+            hedger.on_result(hedge_won)
+            if hedge_won:
+                won_at = time.time()
+                # 第一个请求还在路上, 等它返回时再算省了多少时间
+                primary.add_done_callback(lambda f: hedger.add_saved(max(time.time() - won_at, 0.)))
+            return depth
+
+    hedger.on_result(False)
+    return primary.result()
+
+
+def get_stats():
+    """{exchange: {'requests', 'hedged', 'hedge_won', 'primary_won', 'capped', 'saved_seconds'}}"""
+    return dict((exchange, hedger.get_stats()) for exchange, hedger in list(_hedgers.items()))
+
+
+def log_stats():
+    for exchange, stat in sorted(get_stats().items()):
+        logging.debug("hedge %s: requests=%s hedged=%s hedge_won=%s primary_won=%s capped=%s saved=%.3fs" % (
+            exchange, stat['requests'], stat['hedged'], stat['hedge_won'], stat['primary_won'], stat['capped'],
+            stat['saved_seconds']))
@@ -4,6 +4,12 @@
 import logging
 import time
 from quant import config
+from quant.api import http_pool
+from quant.common import circuit_breaker, rate_limiter, single_flight
+from .depth_snapshot import BookEntry
+from .order_book import OrderBook
+from . import hedging
+from . import market_util
 
 
 class Market(object):
@@ -12,6 +18,10 @@ class Market(object):
         base_currency :btc
         quote_currency:eth
     """
+    # 一次请求最多拉取的交易对数, 1表示不支持批量, 见fetch_depths
+    batch_size = 1
+    # websocket推送盘口, 不需要轮询, 见streaming_market.py
+    is_streaming = False
 
     def __init__(self, base_currency, market_currency, pair_code, fee_rate):
         self._name = None
@@ -21,11 +31,23 @@ class Market(object):
         self.fee_rate = fee_rate
 
         self.depth_updated = 0
+        self.depth_fetch_started = 0
+        # 拉取的档数, DataFeed按依赖该market的observer里要求最多的设置
+        self.depth_levels = config.DEPTH_LEVELS
+        # 当前缓存的depth是按多少档拉取的
+        self.fetched_depth_levels = 0
+        self.depth_seq = 0
+        self.book_entry = None
+        # 拉取成功但盘口和上一次一样的次数
+        self.unchanged_count = 0
         self.update_rate = 1
+        self.last_error = None
+
+        self.breaker = circuit_breaker.CircuitBreaker(self.__class__.__name__)
 
         self.is_terminated = False
         self.request_timeout = 5  # 5s
-        self.depth = {'asks': [{'price': 0, 'amount': 0}], 'bids': [{'price': 0, 'amount': 0}]}
+        self.depth = OrderBook.from_levels([(0, 0)], [(0, 0)])
 
     @property
     def name(self):
@@ -34,14 +56,31 @@ class Market(object):
     @name.setter
     def name(self, value):
         self._name = value
+        self.breaker.name = value
+
+    @property
+    def exchange(self):
+        return self._name.split('_')[0] if self._name else self.__class__.__name__
+
+    def acquire_rate_limit(self):
+        """每次请求前拿交易所的行情令牌, 没有单独行情限额的交易所和broker共用, 等不到抛RateLimitTimeout"""
+        limiter = rate_limiter.get_market_limiter(self.exchange)
+        if not limiter.acquire(rate_limiter.PRIORITY_MARKET, config.RATE_LIMIT_MARKET_TIMEOUT):
+            raise rate_limiter.RateLimitTimeout('%s rate limit timeout' % self.exchange)
 
     def terminate(self):
         self.is_terminated = True
 
+    def is_depth_stale(self, now=None):
+        """超过update_rate, 或者缓存的档数少于现在要求的档数, 都需要重新拉取"""
+        if now is None:
+            now = time.time()
+        return now - self.depth_updated > self.update_rate or self.fetched_depth_levels < self.depth_levels
+
     def get_depth(self):
-        time_diff = time.time() - self.depth_updated
+        """拉取路径: 缓存过期先拉取, 再返回depth"""
         # logging.warn('Market: %s order book1:(%s>%s)', self.name, time_diff, self.depth_updated)
-        if time_diff > self.update_rate:
+        if self.is_depth_stale():
             logging.debug('%s should update...', self.name)
             if not self.ask_update_depth():
                 return None
@@ -55,31 +94,217 @@ class Market(object):
             return None
         return self.depth
 
+    def get_book_entry(self):
+        """同get_depth, 返回带拉取时间和序号的BookEntry"""
+        if self.get_depth() is None:
+            return None
+        return self.book_entry
+
     def ask_update_depth(self):
+        if not self.breaker.allow_request():
+            self.last_error = circuit_breaker.CircuitOpenError('%s circuit open' % self.name)
+            return False
+
+        fetch_started = time.time()
+        depth_levels = self.depth_levels
         try:
-            self.update_depth()
+            # 429/5xx抛HttpStatusError, 调度器按status code退避
+            with http_pool.raise_throttled():
+                self.update_depth()
             # self.convert_to_usd()
-            self.depth_updated = time.time()
+            self.on_depth_updated(fetch_started, depth_levels)
             return True
         except Exception as e:
-            logging.error("Can't update market: %s - err:%s" % (self.name, str(e)))
+            self.on_depth_failed(e)
             # log_exception(logging.DEBUG)
             return False
             # traceback.print_exc()
 
+    def on_depth_updated(self, fetch_started, depth_levels=None):
+        self.depth_fetch_started = fetch_started
+        self.fetched_depth_levels = depth_levels if depth_levels is not None else self.depth_levels
+        self.depth_updated = time.time()
+        self.depth_seq += 1
+        unchanged = self.is_depth_unchanged()
+        if unchanged:
+            # 沿用上一次的depth对象, 已经算好的fingerprint和截断结果都可以复用
+            self.depth = self.book_entry.depth
+            self.unchanged_count += 1
+        # 整体替换, 读的一方拿到的depth/时间/序号总是同一次拉取的
+        self.book_entry = BookEntry(self.name, self.depth, fetch_started, self.depth_updated, self.depth_seq,
+                                    unchanged)
+        self.last_error = None
+        self.breaker.on_success()
+
+    def is_depth_unchanged(self):
+        """新拉取的self.depth和上一次的盘口是否一样, 先比fingerprint, 相同再逐档确认"""
+        entry = self.book_entry
+        if entry is None or not isinstance(self.depth, OrderBook) or not isinstance(entry.depth, OrderBook):
+            return False
+        if entry.depth is self.depth:
+            return True
+        return entry.depth.fingerprint() == self.depth.fingerprint() and entry.depth == self.depth
+
+    def on_depth_failed(self, error):
+        self.last_error = error
+        if isinstance(error, rate_limiter.RateLimitTimeout):
+            # 请求没发出去, 不是交易所的问题
+            self.breaker.on_cancel()
+        else:
+            self.breaker.on_failure(error)
+        logging.error("Can't update market: %s - err:%s" % (self.name, str(error)))
+
+    @classmethod
+    def ask_update_depths(cls, markets):
+        """
+        ask_update_depth的批量版本, 支持批量的交易所合并成一次请求
+        :return: {market_name: 是否更新成功}
+        """
+        if len(markets) == 1 or cls.batch_size <= 1:
+            return dict((market.name, market.ask_update_depth()) for market in markets)
+
+        results = {}
+        allowed = []
+        for market in markets:
+            if market.breaker.allow_request():
+                allowed.append(market)
+            else:
+                market.last_error = circuit_breaker.CircuitOpenError('%s circuit open' % market.name)
+                results[market.name] = False
+        if not allowed:
+            return results
+        markets = allowed
+
+        fetch_started = time.time()
+        depth_levels = [market.depth_levels for market in markets]
+        try:
+            # 合并成一个请求, 只拿一个令牌
+            markets[0].acquire_rate_limit()
+            with http_pool.raise_throttled():
+                depths = cls.fetch_depths(markets)
+        except Exception as e:
+            for market in markets:
+                market.on_depth_failed(e)
+                results[market.name] = False
+            return results
+
+        for market, levels in zip(markets, depth_levels):
+            depth = depths.get(market.name)
+            if depth:
+                market.depth = depth.truncate(levels)
+                market.on_depth_updated(fetch_started, levels)
+                results[market.name] = True
+            else:
+                market.on_depth_failed(ValueError('depth response is empty'))
+                results[market.name] = False
+        return results
+
+    @classmethod
+    def get_book_entries(cls, markets):
+        """
+        get_book_entry的批量版本, 缓存过期的market合并成一次请求拉取
+        :return: {market_name: BookEntry}, 拉取失败或过期的market不在结果里
+        """
+        now = time.time()
+        stale = [x for x in markets if x.is_depth_stale(now)]
+        results = cls.ask_update_depths(stale) if stale else {}
+
+        entries = {}
+        for market in markets:
+            if results.get(market.name) is False:
+                continue
+            if market.get_latest_depth() is not None:
+                entries[market.name] = market.book_entry
+        return entries
+
+    @classmethod
+    def get_book_entries_async(cls, executor, markets):
+        return executor.submit(cls.get_book_entries, markets)
+
+    @classmethod
+    def update_depths_async(cls, executor, markets):
+        return executor.submit(cls.ask_update_depths, markets)
+
+    def get_depth_async(self, executor):
+        """get_depth的非阻塞版本, 返回Future, result为depth或None"""
+        return executor.submit(self.get_depth)
+
+    def get_book_entry_async(self, executor):
+        """get_book_entry的非阻塞版本, 返回Future, result为BookEntry或None"""
+        return executor.submit(self.get_book_entry)
+
+    def update_depth_async(self, executor):
+        """update_depth的非阻塞版本, 返回Future, result为是否更新成功"""
+        return executor.submit(self.ask_update_depth)
+
+    def get_latest_depth(self):
+        """读路径: 只读最近一次拉取的depth, 不发请求, 过期返回None"""
+        entry = self.book_entry
+        if not entry:
+            return None
+        if time.time() - entry.fetch_ended > config.market_expiration_time:
+            return None
+        return entry.depth
+
+    def is_entry_expired(self, entry, now=None):
+        """DataFeed里沿用的BookEntry是否已经过期, 过期的不再给observer"""
+        return entry.age(now) > config.market_expiration_time
+
     def get_ticker(self):
-        depth = self.get_depth()
+        """读路径: 最近一次depth的买一卖一, 不会触发拉取"""
+        depth = self.get_latest_depth()
         if not depth:
             return None
+        return market_util.depth_to_ticker(depth)
 
-        res = {'ask': {'price': 0, 'amount': 0}, 'bid': {'price': 0, 'amount': 0}}
+    def update_depth(self):
+        """写路径: 拉取depth并替换self.depth, 失败抛异常"""
+        # 同时拉取同一个market的调用方(observer的get_depth和DataFeed)共用一个请求
+        depth = single_flight.do(('depth', self.name, self.depth_levels), self.request_depth)
+        if not depth:
+            raise ValueError('depth response is empty')
+        # 接口不支持指定档数的交易所会返回整个盘口, 只保留需要的档数
+        self.depth = depth.truncate(self.depth_levels)
 
-        if len(depth['asks']) > 0:
-            res['ask'] = depth['asks'][0]
-        if len(depth['bids']) > 0:
-            res['bid'] = depth['bids'][0]
-        return res
+    def request_depth(self):
+        """发一次depth请求: 拿令牌, 需要对冲的market走hedging"""
+        self.acquire_rate_limit()
+        if self.name in config.HEDGE_MARKETS:
+            return hedging.fetch_depth_hedged(self)
+        return self.fetch_depth()
 
-    def update_depth(self):
-        """子类重写该方法，每个market的数据不一样"""
-        pass
+    def fetch_depth(self):
+        """
+        子类重写该方法，每个market的数据不一样, 返回格式化后的depth, 不修改market的状态.
+        接口支持指定档数的, 按self.depth_levels请求
+        """
+        raise NotImplementedError("%s.fetch_depth(self)" % self.__class__.__name__)
+
+    @classmethod
+    def fetch_depths(cls, markets):
+        """
+        接口支持一次请求多个交易对的交易所重写该方法, 同时把batch_size设为单次请求最多的交易对数
+        :return: {market_name: depth}, 没返回的market算拉取失败
+        """
+        raise NotImplementedError("%s.fetch_depths(cls, markets)" % cls.__name__)
+
+
+def group_markets(markets):
+    """
+    同一个交易所支持批量拉取的market按batch_size分组, 其他的market一个一组
+    :return: [[market, ...], ...]
+    """
+    groups = []
+    batches = {}
+    for market in markets:
+        batch_size = market.batch_size
+        if batch_size <= 1:
+            groups.append([market])
+            continue
+        batch = batches.get(market.__class__)
+        if batch is None or len(batch) >= batch_size:
+            batch = []
+            batches[market.__class__] = batch
+            groups.append(batch)
+        batch.append(market)
+    return groups
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from quant import config
+from quant.api import http_pool
+from .market import group_markets
+
+
+class MarketFetcher(object):
+    """
+    并发拉取所有market的depth, 每个market一个worker, 一轮的耗时等于最慢的一个请求,
+    而不是 len(markets) / max_workers 轮请求.
+
+    每个market同时最多一个请求, 上一个请求还没结束的market这一轮不再提交, 交易所卡住时不会把线程池堆满;
+    每个请求都有deadline(FETCH_DEADLINE), 通过http_pool收紧请求的timeout, 超时的请求最晚在deadline时释放线程
+    """
+
+    def __init__(self, timeout=3, deadline=None):
+        self.timeout = timeout
+        self.deadline = deadline if deadline else config.FETCH_DEADLINE
+        self.executor = None
+        self.max_workers = 0
+
+        # market name -> 还没结束的future
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        # 等待超时被放弃的请求数(请求本身还会跑到deadline)
+        self.abandoned = 0
+        # 上一个请求没结束, 没有提交的次数
+        self.skipped = 0
+
+    def ensure_workers(self, count):
+        if count <= self.max_workers:
+            return
+
+        logging.debug("MarketFetcher resize workers %s -> %s" % (self.max_workers, count))
+        old_executor = self.executor
+        self.executor = ThreadPoolExecutor(max_workers=count)
+        self.max_workers = count
+        if old_executor:
+            old_executor.shutdown(wait=False)
+
+    def fetch(self, markets):
+        """
+        :param markets: list of Market
+        :return: {market_name: BookEntry}, markets not answered within timeout are left out
+        """
+        self.ensure_workers(len(markets))
+        return self.fetch_with(self.executor, markets, self.timeout)
+
+    def is_in_flight(self, market):
+        return market.name in self.in_flight
+
+    def run_with_deadline(self, func, markets):
+        with http_pool.deadline(self.deadline):
+            return func(markets)
+
+    def submit(self, executor, func, markets):
+        """
+        提交一组market的拉取任务, 组里有market的上一个请求还没结束就不提交, 返回None
+        :param func: Market.get_book_entries或Market.ask_update_depths
+        """
+        with self.lock:
+            if any(x.name in self.in_flight for x in markets):
+                self.skipped += len(markets)
+                logging.debug("MarketFetcher skip %s, previous request in flight" % [x.name for x in markets])
+                return None
+            future = executor.submit(self.run_with_deadline, func, markets)
+            for market in markets:
+                self.in_flight[market.name] = future
+        future.add_done_callback(lambda f, names=[x.name for x in markets]: self.on_done(f, names))
+        return future
+
+    def on_done(self, future, names):
+        with self.lock:
+            for name in names:
+                if self.in_flight.get(name) is future:
+                    del self.in_flight[name]
+
+    def fetch_with(self, executor, markets, timeout):
+        """同一个交易所支持批量的market合并成一个请求, 其他的每个market一个请求"""
+        futures = {}
+        for group in group_markets(markets):
+            future = self.submit(executor, group[0].get_book_entries, group)
+            if future:
+                futures[future] = group
+
+        done, not_done = wait(futures.keys(), timeout=timeout)
+        if not_done:
+            abandoned = [x.name for f in not_done for x in futures[f]]
+            self.abandoned += len(abandoned)
+            logging.debug("MarketFetcher timeout: %s" % abandoned)
+
+        entries = {}
+        for future in done:
+            entries.update(future.result())
+        return entries
+
+    def get_stats(self):
+        return {'in_flight': len(self.in_flight),
+                'abandoned': self.abandoned,
+                'skipped': self.skipped}
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logging.debug("MarketFetcher: in_flight=%s abandoned=%s skipped=%s" % (
+            stats['in_flight'], stats['abandoned'], stats['skipped']))
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+            self.max_workers = 0
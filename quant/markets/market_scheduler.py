@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import logging
+import time
+
+from quant import config
+from quant.api import http_pool
+from quant.common import rate_limiter
+
+
+def get_status_code(error):
+    """从异常里取出http status code, 取不到返回None"""
+    if error is None:
+        return None
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        response = getattr(error, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+    return status_code
+
+
+class ScheduleState(object):
+    def __init__(self, market, interval):
+        self.market = market
+        self.interval = interval
+        self.next_time = 0
+        self.error_count = 0
+
+
+class MarketScheduler(object):
+    """
+    每个market独立的拉取节奏, 初始间隔为market.update_rate:
+    1, 盘口有变化, 间隔缩短, 最小SCHEDULER_MIN_INTERVAL
+    2, 盘口没变化, 间隔拉长, 最大SCHEDULER_MAX_INTERVAL
+    3, 请求失败, 间隔翻倍, 429/418/5xx翻4倍, 最大SCHEDULER_MAX_BACKOFF
+    同一个交易所的market和broker共用一个rate_limiter, 令牌不够的market推迟到有令牌时再拉取,
+    合并成一个请求的market只算一次
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, max_backoff=None):
+        self.min_interval = min_interval if min_interval else config.SCHEDULER_MIN_INTERVAL
+        self.max_interval = max_interval if max_interval else config.SCHEDULER_MAX_INTERVAL
+        self.max_backoff = max_backoff if max_backoff else config.SCHEDULER_MAX_BACKOFF
+        self.states = {}
+
+    def get_state(self, market):
+        state = self.states.get(market.name)
+        if not state:
+            interval = min(max(market.update_rate, self.min_interval), self.max_interval)
+            state = ScheduleState(market, interval)
+            self.states[market.name] = state
+        return state
+
+    def due_markets(self, markets, now=None):
+        """
+        返回到期并且交易所还有令牌的market, 令牌在真正发请求时(Market.acquire_rate_limit)才扣.
+        支持批量拉取的market(batch_size > 1), 同一批只算一次请求
+        """
+        if now is None:
+            now = time.time()
+
+        due = []
+        batched = {}
+        # 每个交易所这一轮已经安排的请求数
+        planned = {}
+        for market in markets:
+            state = self.get_state(market)
+            if state.next_time > now:
+                continue
+            if not market.breaker.is_allowed(now):
+                # 熔断中, 到试探时间再拉取
+                state.next_time = market.breaker.next_attempt_time(now)
+                continue
+            if market.is_streaming:
+                # 只读本地盘口, 不占令牌
+                due.append(market)
+                continue
+            batch_size = market.batch_size
+            if batch_size > 1 and batched.get(market.__class__, 0) % batch_size:
+                batched[market.__class__] += 1
+                due.append(market)
+                continue
+            exchange = market.exchange
+            limiter = rate_limiter.get_market_limiter(exchange)
+            if planned.get(exchange, 0) >= limiter.available(rate_limiter.PRIORITY_MARKET, now):
+                # 至少等补充一个令牌, 避免令牌被这一轮的请求用完后空转
+                state.next_time = max(limiter.next_available(rate_limiter.PRIORITY_MARKET, now),
+                                      now + 1. / limiter.rate)
+                logging.debug("%s rate limit exhausted, delay to %s" % (market.name, state.next_time))
+                continue
+            planned[exchange] = planned.get(exchange, 0) + 1
+            if batch_size > 1:
+                batched[market.__class__] = batched.get(market.__class__, 0) + 1
+            due.append(market)
+        return due
+
+    def next_due_time(self, markets):
+        next_time = None
+        for market in markets:
+            state = self.get_state(market)
+            if next_time is None or state.next_time < next_time:
+                next_time = state.next_time
+        return next_time
+
+    def on_success(self, market, changed, now=None):
+        if now is None:
+            now = time.time()
+        state = self.get_state(market)
+        state.error_count = 0
+        if changed:
+            state.interval = max(self.min_interval, state.interval * 0.5)
+        else:
+            state.interval = min(self.max_interval, state.interval * 1.5)
+        state.next_time = now + state.interval
+
+    def on_failure(self, market, error=None, now=None):
+        if now is None:
+            now = time.time()
+        state = self.get_state(market)
+        state.error_count += 1
+        status_code = get_status_code(error)
+        factor = 4 if http_pool.is_throttled(status_code) else 2
+        state.interval = min(self.max_backoff, max(state.interval, self.min_interval) * factor)
+        state.next_time = now + state.interval
+        logging.debug("%s fetch failed(status:%s), back off %.2fs" % (market.name, status_code, state.interval))
+
+    def get_interval(self, market):
+        return self.get_state(market).interval
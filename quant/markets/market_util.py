@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+from array import array
 
+
+# sort_and_format_list/sort_and_format_dict: 旧的格式化, market已改用normalize_levels,
+# 保留给tool/bench_depth_format对比
 def sort_and_format_list(l, reverse=False):
     """
     {
@@ -48,3 +52,42 @@ def sort_and_format_dict(l, reverse=False):
     for i in l:
         r.append({'price': float(i['price']), 'amount': float(i['amount'])})
     return r
+
+
+def is_ordered(prices, reverse=False):
+    """线性扫描一遍, 判断价格是否已经按顺序排好, reverse=True为从高到低"""
+    if not prices:
+        return True
+    prev = prices[0]
+    for price in prices:
+        if (price > prev) if reverse else (price < prev):
+            return False
+        prev = price
+    return True
+
+
+def normalize_levels(levels, reverse=False, price_key=0, amount_key=1):
+    """
+    所有交易所depth的统一格式化: 每档可以是list([price, amount, ...])或dict,
+    用price_key/amount_key取值, 字符串只解析一次.
+    交易所返回的档位一般已经排好序, 只有顺序不对时才排序
+    :return: (prices, amounts), 两个array('d')
+    """
+    prices = [float(x[price_key]) for x in levels]
+    amounts = [float(x[amount_key]) for x in levels]
+    if not is_ordered(prices, reverse):
+        order = sorted(range(len(prices)), key=prices.__getitem__, reverse=reverse)
+        prices = [prices[i] for i in order]
+        amounts = [amounts[i] for i in order]
+    return array('d', prices), array('d', amounts)
+
+
+def depth_to_ticker(depth):
+    """depth的买一卖一"""
+    res = {'ask': {'price': 0, 'amount': 0}, 'bid': {'price': 0, 'amount': 0}}
+
+    if len(depth['asks']) > 0:
+        res['ask'] = depth['asks'][0]
+    if len(depth['bids']) > 0:
+        res['bid'] = depth['bids'][0]
+    return res
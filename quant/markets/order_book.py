@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+from array import array
+
+from . import market_util
+
+ASKS = 'asks'
+BIDS = 'bids'
+
+
+class OrderBookSide(object):
+    """
+    一边的盘口, price/amount两个平行的float64数组, 按从优到劣排好序.
+    兼容原来的list用法: len(side), side[0]['price'], for level in side
+    """
+    __slots__ = ('prices', 'amounts')
+
+    def __init__(self, prices, amounts):
+        self.prices = prices
+        self.amounts = amounts
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __nonzero__(self):
+        return len(self.prices) > 0
+
+    __bool__ = __nonzero__
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.prices)))]
+        # 只有被访问到的档位才生成dict
+        return {'price': self.prices[index], 'amount': self.amounts[index]}
+
+    def __iter__(self):
+        for i in range(len(self.prices)):
+            yield {'price': self.prices[i], 'amount': self.amounts[i]}
+
+    def __eq__(self, other):
+        if isinstance(other, OrderBookSide):
+            return self.prices == other.prices and self.amounts == other.amounts
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def best_price(self):
+        return self.prices[0] if self.prices else 0.
+
+    def best_amount(self):
+        return self.amounts[0] if self.amounts else 0.
+
+    def truncate(self, levels):
+        """前levels档, 档数不超过levels时返回自身"""
+        if len(self.prices) <= levels:
+            return self
+        return OrderBookSide(self.prices[:levels], self.amounts[:levels])
+
+
+class OrderBook(object):
+    """
+    数组存储的depth, 替代每档一个{'price', 'amount'} dict的list.
+    兼容原来的dict用法: depth['asks'][0]['price'], 'asks' in depth, depth.get('bids')
+    热路径上用best_ask_price()/best_bid_price()等直接读数组, 不生成dict
+    """
+    __slots__ = ('asks', 'bids', '_truncated', '_fingerprint')
+
+    def __init__(self, asks=None, bids=None):
+        self.asks = asks if asks is not None else OrderBookSide(array('d'), array('d'))
+        self.bids = bids if bids is not None else OrderBookSide(array('d'), array('d'))
+        # levels -> 截断后的OrderBook, 同一个depth被多个observer按相同档数读取时只截断一次
+        self._truncated = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_levels(cls, bids, asks, price_key=0, amount_key=1):
+        """
+        交易所返回的原始档位, 每档可以是list([price, amount, ...])或dict({'price': .., 'size': ..}),
+        用price_key/amount_key取值, 价格和数量可以是字符串
+        """
+        return cls(asks=cls._format_side(asks, False, price_key, amount_key),
+                   bids=cls._format_side(bids, True, price_key, amount_key))
+
+    @classmethod
+    def _format_side(cls, levels, reverse, price_key, amount_key):
+        prices, amounts = market_util.normalize_levels(levels, reverse, price_key, amount_key)
+        return OrderBookSide(prices, amounts)
+
+    def __getitem__(self, key):
+        if key == ASKS:
+            return self.asks
+        if key == BIDS:
+            return self.bids
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key == ASKS or key == BIDS
+
+    def get(self, key, default=None):
+        if key == ASKS or key == BIDS:
+            return self[key]
+        return default
+
+    def keys(self):
+        return [ASKS, BIDS]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        if isinstance(other, OrderBook):
+            return self.asks == other.asks and self.bids == other.bids
+        return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "OrderBook(asks=%r, bids=%r)" % (self.asks, self.bids)
+
+    def best_ask_price(self):
+        return self.asks.best_price()
+
+    def best_ask_amount(self):
+        return self.asks.best_amount()
+
+    def best_bid_price(self):
+        return self.bids.best_price()
+
+    def best_bid_amount(self):
+        return self.bids.best_amount()
+
+    def fingerprint(self):
+        """
+        盘口内容的hash, 价格数量都一样的两个depth相同, 用于判断两次拉取之间盘口有没有变化.
+        直接对数组的字节做hash, 不生成dict
+        """
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            fingerprint = self._fingerprint = hash((self.asks.prices.tostring(), self.asks.amounts.tostring(),
+                                                    self.bids.prices.tostring(), self.bids.amounts.tostring()))
+        return fingerprint
+
+    def truncate(self, levels):
+        """
+        只保留前levels档的depth, 两边都不超过levels时返回自身.
+        depth创建后不再修改, 结果按levels缓存
+        """
+        if levels is None or (len(self.asks) <= levels and len(self.bids) <= levels):
+            return self
+        truncated = self._truncated
+        if truncated is None:
+            truncated = self._truncated = {}
+        depth = truncated.get(levels)
+        if depth is None:
+            depth = truncated[levels] = OrderBook(self.asks.truncate(levels), self.bids.truncate(levels))
+        return depth
+
+    def to_dict(self):
+        """转成原来的list of dict格式, 用于序列化"""
+        return {ASKS: list(self.asks), BIDS: list(self.bids)}
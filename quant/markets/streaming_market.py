@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+websocket推送的market, 本地维护盘口, 不再每次轮询REST接口.
+
+    快照 + 增量: 收到快照(推送的或者REST拉取的)后按增量消息更新本地盘口
+    序号检查: 增量的序号不连续说明丢了消息, 重新同步
+    断线重连: 连接断开后按指数退避重连, 重连后重新订阅并同步快照
+    同一个url的market共用一个连接, 见get_connection
+
+和轮询的Market一样通过get_depth/get_latest_depth/book_entry读取depth, 每次盘口变化会回调add_listener注册的函数,
+事件驱动模式下DataFeed用它代替轮询.
+
+需要websocket-client(pip install websocket-client), 没有安装时创建连接会抛ImportError
+
+子类需要实现:
+    ws_url / get_ws_url(): 连接地址
+    get_subscribe_messages(): 连接成功后发送的订阅消息
+    handle_message(msg): 解析消息, 调用apply_snapshot/apply_diff
+    fetch_snapshot(): 推送里没有快照的交易所, 设置snapshot_from_rest, 从REST接口拉取(bids, asks, seq)
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from array import array
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+from quant import config
+from .market import Market
+from .order_book import OrderBook, OrderBookSide
+
+
+class LocalOrderBook(object):
+    """
+    price -> amount, 另外按价格升序保存每一边的价格, 取前几档时不用排序.
+    增量更新时数量为0表示删除该档
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.bids = {}
+        self.asks = {}
+        self.bid_prices = []
+        self.ask_prices = []
+
+    def set_snapshot(self, bids, asks):
+        self.clear()
+        self.update(bids, asks)
+
+    @classmethod
+    def update_side(cls, side, prices, levels):
+        # 有的交易所每档后面还带着别的字段, 只取前两个
+        for level in levels:
+            price = float(level[0])
+            amount = float(level[1])
+            if amount == 0:
+                if side.pop(price, None) is not None:
+                    del prices[bisect.bisect_left(prices, price)]
+            else:
+                if price not in side:
+                    bisect.insort(prices, price)
+                side[price] = amount
+
+    def update(self, bids, asks):
+        """bids/asks: [(price, amount), ...]"""
+        self.update_side(self.bids, self.bid_prices, bids)
+        self.update_side(self.asks, self.ask_prices, asks)
+
+    def to_order_book(self, levels):
+        bid_prices = self.bid_prices[:-levels - 1:-1]
+        ask_prices = self.ask_prices[:levels]
+        return OrderBook(asks=OrderBookSide(array('d', ask_prices), array('d', [self.asks[x] for x in ask_prices])),
+                         bids=OrderBookSide(array('d', bid_prices), array('d', [self.bids[x] for x in bid_prices])))
+
+
+class StreamConnection(object):
+    """
+    一个websocket连接, 在后台线程里收消息, 分发给所有订阅的market.
+    断线后按STREAM_RECONNECT_DELAY指数退避重连
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.markets = []
+        self.ws = None
+        self.thread = None
+        self.is_closed = False
+        self.lock = threading.RLock()
+
+        self.connects = 0
+        self.messages = 0
+
+    def subscribe(self, market):
+        with self.lock:
+            if market in self.markets:
+                return
+            self.markets.append(market)
+            if self.ws:
+                market.on_connected(self)
+            self.ensure_thread()
+
+    def unsubscribe(self, market):
+        with self.lock:
+            if market in self.markets:
+                self.markets.remove(market)
+            if not self.markets:
+                self.close()
+
+    def ensure_thread(self):
+        if self.thread and self.thread.is_alive():
+            return
+        if websocket is None:
+            raise ImportError("websocket-client is required by %s" % self.url)
+        self.is_closed = False
+        self.thread = threading.Thread(target=self.run, name='stream-%s' % self.url)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, message):
+        if not isinstance(message, basestring):
+            message = json.dumps(message)
+        ws = self.ws
+        if ws:
+            ws.send(message)
+
+    def reconnect(self):
+        """断开当前连接, 后台线程会重新连接"""
+        ws = self.ws
+        if ws:
+            try:
+                ws.close()
+            except Exception as e:
+                logging.debug("%s close failed: %s" % (self.url, e))
+
+    def close(self):
+        self.is_closed = True
+        self.reconnect()
+
+    def run(self):
+        delay = config.STREAM_RECONNECT_DELAY
+        while not self.is_closed:
+            try:
+                ws = websocket.create_connection(self.url, timeout=config.STREAM_IDLE_TIMEOUT)
+            except Exception as e:
+                logging.warn("%s connect failed: %s, retry in %ss" % (self.url, e, delay))
+                time.sleep(delay)
+                delay = min(delay * 2, config.STREAM_MAX_RECONNECT_DELAY)
+                continue
+
+            delay = config.STREAM_RECONNECT_DELAY
+            self.connects += 1
+            logging.info("%s connected" % self.url)
+            with self.lock:
+                self.ws = ws
+                markets = list(self.markets)
+            for market in markets:
+                market.on_connected(self)
+
+            try:
+                self.receive(ws)
+            except Exception as e:
+                if not self.is_closed:
+                    logging.warn("%s disconnected: %s" % (self.url, e))
+            finally:
+                with self.lock:
+                    self.ws = None
+                    markets = list(self.markets)
+                try:
+                    ws.close()
+                except Exception:
+                    pass
+                for market in markets:
+                    market.on_disconnected()
+
+            if not self.is_closed:
+                time.sleep(delay)
+
+    def receive(self, ws):
+        while not self.is_closed:
+            data = ws.recv()
+            if not data:
+                raise IOError('connection closed by server')
+            self.messages += 1
+            message = json.loads(data)
+            for market in list(self.markets):
+                market.on_message(message)
+
+
+_connections = {}
+_lock = threading.Lock()
+
+
+def get_connection(url):
+    """同一个url的market共用一个连接"""
+    with _lock:
+        connection = _connections.get(url)
+        if connection is None or connection.is_closed:
+            connection = StreamConnection(url)
+            _connections[url] = connection
+    return connection
+
+
+# (exchange, pair_code) -> 已经启动的StreamingMarket, broker查ticker时先看这里
+_markets = {}
+
+
+def get_ticker(exchange, pair_code):
+    """推送的盘口已同步时返回{'bid': price, 'ask': price}, 否则返回None"""
+    market = _markets.get((exchange, pair_code))
+    if market is None:
+        return None
+    return market.get_top_of_book()
+
+
+class StreamingMarket(Market):
+    is_streaming = True
+    # 推送里没有快照, 连接后和重新同步时用fetch_snapshot从REST接口拉取
+    snapshot_from_rest = False
+    # 同一个连接上所有market的消息都会收到, handle_message里按自己的channel/symbol过滤
+    ws_url = None
+
+    def __init__(self, base_currency, market_currency, pair_code, fee_rate):
+        super(StreamingMarket, self).__init__(base_currency, market_currency, pair_code, fee_rate)
+        self.book = LocalOrderBook()
+        self.synced = False
+        self.last_seq = None
+        # 同步快照期间收到的增量
+        self.pending = []
+        self.connection = None
+        self.listeners = []
+        self.last_message = 0
+        self.stream_lock = threading.RLock()
+        self.stream_stats = {'messages': 0, 'snapshots': 0, 'gaps': 0, 'resyncs': 0, 'disconnects': 0}
+
+    # 子类实现
+    def get_ws_url(self):
+        return self.ws_url
+
+    def get_subscribe_messages(self):
+        return []
+
+    def get_unsubscribe_messages(self):
+        return []
+
+    def handle_message(self, message):
+        raise NotImplementedError("%s.handle_message(self, message)" % self.__class__.__name__)
+
+    def fetch_snapshot(self):
+        """snapshot_from_rest的交易所重写, 返回(bids, asks, seq)"""
+        raise NotImplementedError("%s.fetch_snapshot(self)" % self.__class__.__name__)
+
+    # 连接管理
+    def start(self):
+        if self.connection is None:
+            self.connection = get_connection(self.get_ws_url())
+            _markets[(self.exchange, self.pair_code)] = self
+            self.connection.subscribe(self)
+
+    def stop(self):
+        connection = self.connection
+        if connection:
+            self.connection = None
+            if _markets.get((self.exchange, self.pair_code)) is self:
+                del _markets[(self.exchange, self.pair_code)]
+            connection.unsubscribe(self)
+
+    def terminate(self):
+        super(StreamingMarket, self).terminate()
+        self.stop()
+
+    def add_listener(self, listener):
+        """盘口更新时在连接线程里回调listener(market)"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def on_connected(self, connection):
+        with self.stream_lock:
+            self.reset_book()
+        for message in self.get_subscribe_messages():
+            connection.send(message)
+        if self.snapshot_from_rest:
+            self.request_snapshot()
+
+    def on_disconnected(self):
+        with self.stream_lock:
+            self.stream_stats['disconnects'] += 1
+            self.reset_book()
+
+    def on_message(self, message):
+        self.last_message = time.time()
+        try:
+            self.handle_message(message)
+        except Exception as e:
+            logging.warn("%s handle message failed: %s" % (self.name, e))
+
+    def reset_book(self):
+        self.synced = False
+        self.last_seq = None
+        self.pending = []
+        self.book.clear()
+
+    # 盘口维护, 子类在handle_message里调用
+    def apply_snapshot(self, bids, asks, seq=None):
+        with self.stream_lock:
+            self.book.set_snapshot(bids, asks)
+            self.last_seq = seq
+            self.synced = True
+            self.stream_stats['snapshots'] += 1
+            pending, self.pending = self.pending, []
+            for diff in pending:
+                if not self.synced:
+                    break
+                self._apply_diff(*diff)
+            if self.synced:
+                self.publish()
+
+    def apply_diff(self, bids, asks, first_seq=None, last_seq=None):
+        """
+        first_seq/last_seq: 这条增量包含的第一个和最后一个序号, 交易所没有序号时不传.
+        last_seq不超过本地序号的是旧消息, 丢弃; first_seq比本地序号+1大说明中间丢了消息, 重新同步
+        """
+        with self.stream_lock:
+            self.stream_stats['messages'] += 1
+            if not self.synced:
+                if len(self.pending) >= config.STREAM_MAX_PENDING:
+                    self.pending.pop(0)
+                self.pending.append((bids, asks, first_seq, last_seq))
+                return
+            if self._apply_diff(bids, asks, first_seq, last_seq):
+                self.publish()
+
+    def _apply_diff(self, bids, asks, first_seq, last_seq):
+        if last_seq is not None and self.last_seq is not None:
+            if last_seq <= self.last_seq:
+                return False
+            if first_seq is not None and first_seq > self.last_seq + 1:
+                self.stream_stats['gaps'] += 1
+                self.resync("sequence gap %s -> %s" % (self.last_seq, first_seq))
+                return False
+        self.book.update(bids, asks)
+        if last_seq is not None:
+            self.last_seq = last_seq
+        return True
+
+    def resync(self, reason):
+        """丢弃本地盘口, 重新拿快照"""
+        logging.warn("%s resync: %s" % (self.name, reason))
+        with self.stream_lock:
+            self.stream_stats['resyncs'] += 1
+            self.reset_book()
+        if self.snapshot_from_rest:
+            self.request_snapshot()
+        elif self.connection:
+            # 推送快照的交易所, 重新订阅会收到新的快照
+            for message in self.get_unsubscribe_messages() + self.get_subscribe_messages():
+                self.connection.send(message)
+
+    def request_snapshot(self):
+        """在单独的线程里拉取REST快照, 期间的增量先缓存在pending里"""
+        thread = threading.Thread(target=self.load_snapshot, name='snapshot-%s' % self.name)
+        thread.daemon = True
+        thread.start()
+
+    def load_snapshot(self):
+        try:
+            snapshot = self.fetch_snapshot()
+        except Exception as e:
+            snapshot = None
+            logging.warn("%s fetch snapshot failed: %s" % (self.name, e))
+        if not snapshot:
+            if self.connection:
+                time.sleep(config.STREAM_RECONNECT_DELAY)
+                self.request_snapshot()
+            return
+        bids, asks, seq = snapshot
+        self.apply_snapshot(bids, asks, seq)
+
+    def publish(self):
+        self.depth = self.book.to_order_book(self.depth_levels)
+        self.on_depth_updated(self.last_message, self.depth_levels)
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception as e:
+                logging.warn("%s depth listener failed: %s" % (self.name, e))
+
+    def ask_update_depth(self):
+        """
+        轮询模式的入口. publish在推送线程里持有stream_lock写depth/depth_seq/book_entry,
+        这里也要在锁里完成update_depth和on_depth_updated, 否则两边交错会发布不一致的BookEntry
+        """
+        self.start()
+        with self.stream_lock:
+            return super(StreamingMarket, self).ask_update_depth()
+
+    # 和轮询的Market一样的读取方式, 不发请求
+    def update_depth(self):
+        self.start()
+        with self.stream_lock:
+            if not self.synced:
+                raise ValueError('%s order book not synced' % self.name)
+            if time.time() - self.last_message > config.STREAM_IDLE_TIMEOUT:
+                raise ValueError('%s stream idle' % self.name)
+            # 档数要求可能变了, 按现在的depth_levels重新取
+            self.depth = self.book.to_order_book(self.depth_levels)
+
+    def is_entry_expired(self, entry, now=None):
+        """推送的盘口只在有变化时更新, 和update_depth一样: 没同步或者超过STREAM_IDLE_TIMEOUT没有消息才算过期"""
+        if now is None:
+            now = time.time()
+        return not self.synced or now - self.last_message > config.STREAM_IDLE_TIMEOUT
+
+    def fetch_depth(self):
+        with self.stream_lock:
+            if not self.synced:
+                return None
+            return self.book.to_order_book(self.depth_levels)
+
+    def get_top_of_book(self):
+        with self.stream_lock:
+            if not self.synced or time.time() - self.last_message > config.STREAM_IDLE_TIMEOUT:
+                return None
+            if not self.book.bid_prices or not self.book.ask_prices:
+                return None
+            return {'bid': self.book.bid_prices[-1], 'ask': self.book.ask_prices[0]}
+
+    def get_stream_stats(self):
+        stats = dict(self.stream_stats)
+        stats['synced'] = self.synced
+        stats['last_seq'] = self.last_seq
+        return stats
@@ -19,6 +19,12 @@ class BasicBot(Observer):
 
         logging.info('BasicBot Setup complete')
 
+    def required_depth_levels(self):
+        # 只监控不下单时只用到买一卖一
+        if getattr(self, 'monitor_only', False):
+            return config.MONITOR_DEPTH_LEVELS
+        return super(BasicBot, self).required_depth_levels()
+
     def new_order(self, market, order_type, maker_only=False, amount=None, price=None):
         if order_type == 'buy' or order_type == 'sell':
             if not price or not amount:
@@ -128,23 +134,17 @@ class BasicBot(Observer):
     def update_other(self):
         pass
 
-    def get_deal_amount(self, market, order_id):
+    def get_deal_amount(self, market, order_id, wait=0):
         """
         平均成交价还是要有的
+        wait: 最多等订单成交这么久(秒), 有账户推送时一成交就返回; 到时间还没完全成交就撤单, 返回撤单后的成交量
         """
-        while True:
-            order_status = self.brokers[market].get_order(order_id)
-            if not order_status:
-                time.sleep(config.INTERVAL_RETRY)
-                continue
-            break
-
-        if order_status['status'] == constant.ORDER_STATE_PENDING:
-            self.brokers[market].cancel_order(order_id)
-            time.sleep(config.INTERVAL_API)
-            return self.get_deal_amount(market, order_id)
-        else:
-            return order_status['deal_amount'], order_status['avg_price']
+        broker = self.brokers[market]
+        order_status = broker.wait_order(order_id, wait)
+        while order_status['status'] == constant.ORDER_STATE_PENDING:
+            broker.cancel_order(order_id)
+            order_status = broker.wait_order(order_id, config.INTERVAL_API)
+        return order_status['deal_amount'], order_status['avg_price']
 
     def get_latest_ticker(self, market):
         return self.brokers[market].get_ticker_c()
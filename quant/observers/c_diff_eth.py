@@ -22,6 +22,9 @@ class C_Diff_ETH(BasicBot):
 
         logging.info('C_Diff_ETH Setup complete')
 
+    def required_markets(self):
+        return [self.market_bfx, self.market_bn]
+
     def is_depths_available(self, depths):
         if not depths:
             return False
@@ -25,6 +25,9 @@ class C_ETH_USDT(BasicBot):
 
         logging.info('C_Diff_ETH Setup complete')
 
+    def required_markets(self):
+        return [self.market_bn, self.market_hb]
+
     def is_depths_available(self, depths):
         if not depths:
             return False
@@ -27,6 +27,9 @@ class C_USDT(BasicBot):
 
         logging.info('C_USDT Setup complete')
 
+    def required_markets(self):
+        return [self.market_eth_bn, self.market_eth_hb, self.market_btc_bn, self.market_btc_hb]
+
     def is_depths_available(self, depths):
         if not depths:
             return False
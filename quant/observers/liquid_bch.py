@@ -8,7 +8,7 @@ import random
 import time
 
 from quant import config
-from quant.brokers import broker_factory
+from quant.brokers import broker_factory, order_tracker
 from quant.common import constant
 from quant.tool import email_box
 from .basicbot import BasicBot
@@ -33,6 +33,9 @@ class Liquid_BCH(BasicBot):
         self.brokers = broker_factory.create_brokers([self.mm_market, self.hedge_market])
         self.mm_broker = self.brokers[self.mm_market]
         self.hedge_broker = self.brokers[self.hedge_market]
+        # mm_market的挂单由order_tracker统一查询, 状态变化时回调on_order_update
+        self.order_tracker = order_tracker.get_tracker()
+        self.remote_orders = {}
 
         self.hedge_bid_price = 0.0
         self.hedge_ask_price = 0.0
@@ -77,6 +80,11 @@ class Liquid_BCH(BasicBot):
             self.cancel_all_orders(self.mm_market)
             self.data_lost_count = 0
 
+    def required_markets(self):
+        markets = [self.mm_market, self.hedge_market]
+        markets.extend([m for m in self.refer_markets if m not in markets])
+        return markets
+
     def tick(self, depths):
         logging.info("Liquid_BCH======>tick:%s begin" % self.tick_count)
         refer_market = None
@@ -134,7 +142,7 @@ class Liquid_BCH(BasicBot):
             return
         logging.info("Liquid_BCH======>local orders ids %s" % order_ids)
 
-        orders = self.mm_broker.get_orders(order_ids)
+        orders = [self.remote_orders[str(x)] for x in order_ids if str(x) in self.remote_orders]
         if orders:
             for order in orders:
                 local_order = self.get_order(order['order_id'])
@@ -144,6 +152,7 @@ class Liquid_BCH(BasicBot):
 
                 if order['status'] == constant.ORDER_STATE_CLOSED or order['status'] == constant.ORDER_STATE_CANCELED:
                     self.remove_order(order['order_id'])
+                    self.remote_orders.pop(str(order['order_id']), None)
                     logging.info("Liquid_BCH======>local orders remove %s, because closed or canceled, order=%s" %
                                  (order['order_id'], order))
                     return
@@ -160,6 +169,7 @@ class Liquid_BCH(BasicBot):
                             timeout_adjust))
 
                         self.cancel_order(self.mm_market, 'buy', order['order_id'])
+                        self.order_tracker.refresh(self.mm_broker, order['order_id'])
                 elif order['type'] == 'sell':
                     if order['price'] < min_sell_price or time_diff > timeout_adjust:
                         logging.info("Liquid_BCH======>\
@@ -168,6 +178,17 @@ class Liquid_BCH(BasicBot):
                             timeout_adjust))
 
                         self.cancel_order(self.mm_market, 'sell', order['order_id'])
+                        self.order_tracker.refresh(self.mm_broker, order['order_id'])
+
+    def new_order(self, market, order_type, maker_only=False, amount=None, price=None):
+        order = super(Liquid_BCH, self).new_order(market, order_type, maker_only, amount, price)
+        if order and market == self.mm_market:
+            self.order_tracker.track(self.mm_broker, order['order_id'], callback=self.on_order_update)
+        return order
+
+    def on_order_update(self, order):
+        """order_tracker线程回调, 只记录最新状态, 对冲和撤单仍在tick里处理"""
+        self.remote_orders[str(order['order_id'])] = order
 
     def hedge_order(self, order, remote_order):
         if remote_order['deal_amount'] <= self.LIQUID_HEDGE_MIN_AMOUNT:
@@ -230,8 +251,7 @@ class Liquid_BCH(BasicBot):
                 logging.error('Liquid_BCH======>hedge sell order failed when sell_limit_c, error=%s' % e)
                 raise Exception('hedge sell order failed when sell_limit_c, error=%s' % e)
 
-            time.sleep(config.INTERVAL_API)
-            deal_amount, avg_price = self.get_deal_amount(self.hedge_market, order_id)
+            deal_amount, avg_price = self.get_deal_amount(self.hedge_market, order_id, config.INTERVAL_API)
             hedge_total_amount += deal_amount
             logging.info("Liquid_BCH======>hedge sell %s, order_id=%s, amount=%s, price=%s, deal_amount=%s" %
                          (hedge_index, order_id, sell_amount, avg_price, deal_amount))
@@ -274,8 +294,7 @@ class Liquid_BCH(BasicBot):
                 logging.error('Liquid_BCH======>hedge buy order failed when buy_limit_c, error=%s' % e)
                 raise Exception('hedge buy order failed when buy_limit_c, error=%s' % e)
 
-            time.sleep(config.INTERVAL_API)
-            deal_amount, avg_price = self.get_deal_amount(self.hedge_market, order_id)
+            deal_amount, avg_price = self.get_deal_amount(self.hedge_market, order_id, config.INTERVAL_API)
             hedge_total_amount += deal_amount
             logging.info("Liquid_BCH======>hedge buy %s, order_id=%s, amount=%s, price=%s, deal_amount=%s" %
                          (hedge_index, order_id, buy_amount, avg_price, deal_amount))
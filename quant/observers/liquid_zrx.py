@@ -90,6 +90,11 @@ class Liquid_ZRX(BasicBot):
             self.cancel_orders(self.mm_market)
             self.data_lost_count = 0
 
+    def required_markets(self):
+        markets = [self.mm_market, self.hedge_market]
+        markets.extend([m for m in self.refer_markets if m not in markets])
+        return markets
+
     def tick(self, depths):
         logging.info("Liquid_ZRX======>tick:%s begin" % self.tick_count)
         refer_market = None
@@ -7,7 +7,7 @@ import logging
 import time
 
 from quant import config
-from quant.brokers import broker_factory
+from quant.brokers import broker_factory, order_tracker
 from quant.common import constant
 from quant.tool import email_box
 from .basicbot import BasicBot
@@ -28,6 +28,8 @@ class Maker_ZRX(BasicBot):
         self.hedge_broker = self.brokers[self.hedge_market]
 
         self.local_order = {}
+        # 挂单状态由order_tracker查询(或者账户推送), 变化时回调on_order_update
+        self.order_tracker = order_tracker.get_tracker()
 
         self.data_lost_count = 0
         self.risk_protect_count = 10
@@ -89,6 +91,9 @@ class Maker_ZRX(BasicBot):
     def update_other(self):
         self.update_min_stock()
 
+    def required_markets(self):
+        return [self.mm_market, self.hedge_market]
+
     def tick(self, depths):
         try:
             mm_bid_price, mm_ask_price = self.get_ticker(depths, self.mm_market)
@@ -141,6 +146,7 @@ class Maker_ZRX(BasicBot):
             return
 
         logging.info('liquid_zrx======>cancel order: %s success' % order_id)
+        self.order_tracker.untrack(self.mm_broker, order_id)
         # delete local order
         self.local_order = {}
         # place new order
@@ -149,19 +155,21 @@ class Maker_ZRX(BasicBot):
     def update_order(self):
         # update local order
         order_id = self.local_order['order_id']
-        error_count = 0
-        while True:
-            resp = self.mm_broker.get_order(order_id=order_id)
-            if resp:
-                self.local_order['deal_amount'] = resp['deal_amount']
-                self.local_order['avg_price'] = resp['avg_price']
-                self.local_order['status'] = resp['status']
-                break
-            error_count += 1
-            if error_count >= 10:
-                logging.error("liquid_zrx======>update_order failed more than 10 times")
-                raise Exception("liquid_zrx======>update_order failed more than 10 times")
-            time.sleep(config.INTERVAL_RETRY)
+        resp = self.order_tracker.get(self.mm_broker, order_id)
+        if not resp:
+            # 还没查到过, 等tracker的第一次结果
+            resp = self.order_tracker.wait(self.mm_broker, order_id, 10 * config.INTERVAL_RETRY)
+        if not resp:
+            logging.error("liquid_zrx======>update_order failed more than 10 times")
+            raise Exception("liquid_zrx======>update_order failed more than 10 times")
+        self.on_order_update(resp)
+
+    def on_order_update(self, order):
+        if not self.local_order or str(self.local_order['order_id']) != str(order['order_id']):
+            return
+        self.local_order['deal_amount'] = order['deal_amount']
+        self.local_order['avg_price'] = order['avg_price']
+        self.local_order['status'] = order['status']
 
     def place_order(self, buy_price, buy_amount):
         eth_num = self.mm_broker.eth_available
@@ -194,6 +202,7 @@ class Maker_ZRX(BasicBot):
             'status': constant.ORDER_STATE_PENDING,
             'time': time.time()
         }
+        self.order_tracker.track(self.mm_broker, order_id, callback=self.on_order_update)
         logging.info('liquid_zrx======>place_order success, order_id: %s' % order_id)
 
     def hedge_order(self, hedge_amount, hedge_price):
@@ -1,5 +1,7 @@
 import abc
 
+from quant import config
+
 
 class Observer(object):
     __metaclass__ = abc.ABCMeta
@@ -16,9 +18,34 @@ class Observer(object):
     def update_other(self):
         pass
 
+    def required_markets(self):
+        """names of the markets this observer reads, empty means all markets"""
+        return []
+
+    def required_depth_levels(self):
+        """number of depth levels this observer reads from each required market"""
+        return config.DEPTH_LEVELS
+
     def tick(self, depths):
         pass
 
+    def get_depths_skew(self, depths):
+        """max time skew in seconds between the books of the required markets"""
+        return depths.max_skew(self.required_markets() or None)
+
+    def on_depth_update(self, market_name, depths):
+        """called in event driven mode when one of the required markets has a new depth"""
+        self.tick(depths)
+
+    def on_market_tripped(self, market_name, error):
+        """one of the required markets kept failing and its circuit breaker opened, it will not be fetched
+        until a probe succeeds"""
+        pass
+
+    def on_market_recovered(self, market_name):
+        """a tripped market answered a probe and is fetched again"""
+        pass
+
     def begin_opportunity_finder(self, depths):
         pass
 
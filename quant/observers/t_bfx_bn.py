@@ -76,6 +76,9 @@ class TriangleArbitrage(BasicBot):
 
         logging.debug('t_bfx_bn params: ' + str(kwargs))
 
+    def required_markets(self):
+        return [self.base_pair, self.pair_1, self.pair_2]
+
     def is_depths_available(self, depths):
         return self.base_pair in depths and self.pair_1 in depths and self.pair_2 in depths
 
@@ -49,6 +49,9 @@ class Arbitrage(BasicBot):
 
         self.error_count = 0
 
+    def required_markets(self):
+        return [self.base_pair, self.pair_1, self.pair_2]
+
     def is_depths_available(self, depths):
         res = self.base_pair in depths and self.pair_1 in depths and self.pair_2 in depths
         if not res:
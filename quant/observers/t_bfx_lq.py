@@ -41,6 +41,9 @@ class TriangleArbitrage(BasicBot):
         self.fee_pair1 = 0.0025
         self.fee_pair2 = 0.002
 
+    def required_markets(self):
+        return [self.base_pair, self.pair_1, self.pair_2]
+
     def is_depths_available(self, depths):
         return self.base_pair in depths and self.pair_1 in depths and self.pair_2 in depths
 
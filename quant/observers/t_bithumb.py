@@ -6,9 +6,9 @@ import logging
 import time
 
 from quant import config
-from quant.brokers import broker_factory
+from quant.brokers import broker_factory, order_tracker
 from .basicbot import BasicBot
-from quant.common import log
+from quant.common import constant, log
 
 MESSAGE_TRY_AGAIN = 'Please try again'
 
@@ -65,9 +65,14 @@ class T_Bithumb(BasicBot):
             self.update_min_stock()
             self.update_balance()
 
+        # bithumb没有账户推送, 订单状态由order_tracker查询
+        self.order_tracker = order_tracker.get_tracker()
         self.logger_other = log.get_logger('log/bithumb_other.log')
         logging.debug("T_Bithumb params: " + str(kwargs))
 
+    def required_markets(self):
+        return [self.base_pair, self.pair_1, self.pair_2]
+
     def is_depths_available(self, depths):
         if not depths:
             return False
@@ -582,56 +587,43 @@ class T_Bithumb(BasicBot):
         if order and 'deal_amount' in order:
             return order['deal_amount']
         else:
-            # 未完成的订单才能查询到
+            # order_tracker查询, 网络错误和Please try again由tracker重试, 和原来一样一直等到有结果;
+            # 只有查询不到的订单(已成交)才是CLOSED, deal_amount是order_detail的成交量
+            broker = self.brokers[market]
             while True:
-                resp, resp_error = self.brokers[market].get_order(order_id=order_id, order_type=order_type)
-                # 两种情况需要continue
-                # 1,resp 和error_msg都为空表示网络问题无response
-                # 2,error_msg如果是try again, 如果是非try again表示该订单已成交所以查询不到
-
-                # resp 可能为空，因为订单可能成交了,所以会有2个种情况break
-                # 1, resp不为空 error为空，订单未成交且查询成功
-                # 2, resp为空，error不为空且不是Please try again, 则订单已成交
-                if not resp and not resp_error:
+                resp = self.order_tracker.wait(broker, order_id, 10 * config.INTERVAL_RETRY, order_type)
+                if resp:
+                    break
+                logging.warn("%s get %s order %s timeout, try again" % (market, order_type, order_id))
+            if resp['status'] != constant.ORDER_STATE_PENDING:
+                logging.info("%s %s order %s filled: %s" % (market, order_type, order_id, resp))
+                return resp['deal_amount']
+            self.order_tracker.untrack(broker, order_id)
+
+            while True:
+                cancel_done, error_cancel = self.brokers[market].cancel_order(order_id=order_id,
+                                                                              order_type=order_type)
+                if not cancel_done and not error_cancel:
+                    # network invalid, try again
                     time.sleep(config.INTERVAL_RETRY)
                     continue
-                if resp_error and 'message' in resp_error:
-                    if self.is_needed_try_again(resp_error['message']):
+                if error_cancel and 'message' in error_cancel:
+                    if self.is_needed_try_again(error_cancel['message']):
                         time.sleep(config.INTERVAL_RETRY)
                         continue
                     else:
-                        logging.info("%s get order %s failed: %s" % (market, order_id, resp_error))
+                        logging.info("%s cancel %s order %s failed: %s" % (market, order_type, order_id,
+                                                                           error_cancel))
                 break
-            if resp:
-                while True:
-                    cancel_done, error_cancel = self.brokers[market].cancel_order(order_id=order_id,
-                                                                                  order_type=order_type)
-                    if not cancel_done and not error_cancel:
-                        # network invalid, try again
-                        time.sleep(config.INTERVAL_RETRY)
-                        continue
-                    if error_cancel and 'message' in error_cancel:
-                        if self.is_needed_try_again(error_cancel['message']):
-                            time.sleep(config.INTERVAL_RETRY)
-                            continue
-                        else:
-                            logging.info("%s cancel %s order %s failed: %s" % (market, order_type, order_id,
-                                                                               error_cancel))
-                    break
 
-                if cancel_done:
-                    # 大部分是这种场景, cancel未完成的部分
-                    logging.info("%s cancel %s order %s success" % (market, order_type, order_id))
-                    return resp['deal_amount']
-                else:
-                    # get_order成功，但是两次cancel失败了，当作已成功处理
-                    # time.sleep(config.INTERVAL_RETRY)
-                    logging.info("%s cancel %s order %s failed, maybe has filled" % (market, order_type, order_id))
-                    return self.get_filled_deal_amount_c(market, order_id, order_type)
+            if cancel_done:
+                # 大部分是这种场景, cancel未完成的部分
+                logging.info("%s cancel %s order %s success" % (market, order_type, order_id))
+                return resp['deal_amount']
             else:
-                # get_order两次失败，当作已成交处理
+                # get_order成功，但是两次cancel失败了，当作已成功处理
                 # time.sleep(config.INTERVAL_RETRY)
-                logging.info("%s get %s order %s failed, maybe has filled" % (market, order_type, order_id))
+                logging.info("%s cancel %s order %s failed, maybe has filled" % (market, order_type, order_id))
                 return self.get_filled_deal_amount_c(market, order_id, order_type)
 
     def get_filled_deal_amount_c(self, market, order_id, order_type):
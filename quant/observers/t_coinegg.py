@@ -52,6 +52,9 @@ class T_CoinEgg(BasicBot):
         if not self.monitor_only:
             self.brokers = broker_factory.create_brokers([self.base_pair, self.pair_1, self.pair_2])
 
+    def required_markets(self):
+        return [self.base_pair, self.pair_1, self.pair_2]
+
     def is_depths_available(self, depths):
         res = self.base_pair in depths and self.pair_1 in depths and self.pair_2 in depths
         if not res:
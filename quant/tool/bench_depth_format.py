@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+depth格式化的benchmark, 对比market_util.sort_and_format_list/sort_and_format_dict
+和market_util.normalize_levels
+
+python -m quant.tool.bench_depth_format
+"""
+
+import random
+import timeit
+
+from quant.markets import market_util
+
+LEVELS = (5, 20, 100)
+NUMBER = 2000
+
+
+def make_levels(count, reverse, as_dict, shuffle):
+    price = 100.0
+    levels = []
+    for i in range(count):
+        price = price - 0.01 if reverse else price + 0.01
+        amount = random.uniform(0.01, 10)
+        if as_dict:
+            levels.append({'price': '%.8f' % price, 'amount': '%.8f' % amount, 'timestamp': '1500000000.0'})
+        else:
+            levels.append(['%.8f' % price, '%.8f' % amount])
+    if shuffle:
+        random.shuffle(levels)
+    return levels
+
+
+def bench(func):
+    # 旧的函数会原地排序, 每次都用新的list, 两边一样
+    return min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER * 1e6
+
+
+def run():
+    print("%-6s %-6s %-10s %12s %12s %8s" % ('format', 'levels', 'order', 'old(us)', 'new(us)', 'speedup'))
+    for as_dict in (False, True):
+        old_format = market_util.sort_and_format_dict if as_dict else market_util.sort_and_format_list
+        price_key, amount_key = ('price', 'amount') if as_dict else (0, 1)
+        for count in LEVELS:
+            for shuffle in (False, True):
+                bids = make_levels(count, True, as_dict, shuffle)
+                asks = make_levels(count, False, as_dict, shuffle)
+
+                def old():
+                    old_format(list(bids), True)
+                    old_format(list(asks), False)
+
+                def new():
+                    market_util.normalize_levels(list(bids), True, price_key, amount_key)
+                    market_util.normalize_levels(list(asks), False, price_key, amount_key)
+
+                old_us = bench(old)
+                new_us = bench(new)
+                print("%-6s %-6s %-10s %12.2f %12.2f %7.2fx" % ('dict' if as_dict else 'list', count,
+                                                                  'shuffled' if shuffle else 'sorted',
+                                                                  old_us, new_us, old_us / new_us))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+启动耗时和内存的benchmark, 每次在新的python进程里:
+    lazy: import quant.cli, 只加载两个Bitfinex交易对用到的模块
+    eager: import quant.cli, 再加载所有交易所的market/broker和cli里的observer, 相当于原来的启动方式
+
+python -m quant.tool.bench_startup
+"""
+
+import json
+import subprocess
+import sys
+
+RUNS = 5
+
+CHILD = r'''
+import json, resource, sys, time
+started = time.time()
+import quant.cli
+from quant.common import util
+from quant.markets import market_factory
+from quant.brokers import broker_factory
+
+failed = []
+if sys.argv[1] == 'lazy':
+    paths = [market_factory.MARKET_CLASSES['Bitfinex'], broker_factory.BROKER_CLASSES['Bitfinex'][0]]
+else:
+    paths = list(market_factory.MARKET_CLASSES.values())
+    paths += [x[0] for x in broker_factory.BROKER_CLASSES.values()]
+    paths += ['quant.observers.%s' % x for x in ('t_bfx_lq_new', 't_binance', 't_lq_bn', 't_gate', 't_bitflyer',
+                                                 't_kraken', 't_bfx_btc_usd', 't_bfx_btc')]
+for path in paths:
+    try:
+        if path.startswith('quant.observers.'):
+            __import__(path)
+        else:
+            util.load_object(path)
+    except ImportError as e:
+        failed.append('%s(%s)' % (path, e))
+
+print(json.dumps({
+    'seconds': time.time() - started,
+    'modules': len(sys.modules),
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'failed': failed,
+}))
+'''
+
+
+def run_once(mode):
+    output = subprocess.check_output([sys.executable, '-c', CHILD, mode])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run():
+    print("%-6s %10s %8s %12s" % ('mode', 'time(ms)', 'modules', 'maxrss(KB)'))
+    for mode in ('lazy', 'eager'):
+        results = [run_once(mode) for _ in range(RUNS)]
+        print("%-6s %10.1f %8d %12d" % (mode, median([x['seconds'] for x in results]) * 1000,
+                                        median([x['modules'] for x in results]),
+                                        median([x['maxrss_kb'] for x in results])))
+        for failed in results[0]['failed']:
+            print("    not loaded: %s" % failed)
+
+
+if __name__ == '__main__':
+    run()
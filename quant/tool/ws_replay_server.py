@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+本地的websocket服务, 按录制的消息回放, 用来在不连交易所的情况下调试StreamingMarket:
+快照/增量/序号跳跃/断线重连都可以写在回放文件里.
+
+回放文件每行一个json:
+    {"delay": 0.1, "data": {...}}   等delay秒后发送data(dict/list会转成json)
+    {"close": true}                 断开连接, 客户端重连后从头回放
+
+python -m quant.tool.ws_replay_server frames.jsonl --port 8765
+
+StreamingMarket.ws_url改成ws://127.0.0.1:8765即可. 代码里使用:
+
+    server = ReplayServer(frames, port=0)
+    server.start()
+    ... ws://127.0.0.1:%s % server.port ...
+    server.stop()
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import socket
+import SocketServer
+import struct
+import threading
+import time
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def load_frames(path):
+    frames = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                frames.append(json.loads(line))
+    return frames
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    """服务端发给客户端的帧不加掩码"""
+    if isinstance(payload, unicode):
+        payload = payload.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def recv_exactly(sock, size):
+    data = ''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise IOError('connection closed')
+        data += chunk
+    return data
+
+
+def read_frame(sock):
+    """读一个客户端帧(带掩码), 返回(opcode, payload)"""
+    first, second = struct.unpack('!BB', recv_exactly(sock, 2))
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', recv_exactly(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', recv_exactly(sock, 8))[0]
+    mask = recv_exactly(sock, 4) if second & 0x80 else None
+    payload = recv_exactly(sock, length)
+    if mask:
+        payload = ''.join(chr(ord(c) ^ ord(mask[i % 4])) for i, c in enumerate(payload))
+    return opcode, payload
+
+
+class ReplayHandler(SocketServer.BaseRequestHandler):
+    def handshake(self):
+        data = ''
+        while '\r\n\r\n' not in data:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                raise IOError('connection closed during handshake')
+            data += chunk
+        headers = {}
+        for line in data.split('\r\n')[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(headers['sec-websocket-key'] + GUID).digest())
+        self.request.sendall('HTTP/1.1 101 Switching Protocols\r\n'
+                             'Upgrade: websocket\r\n'
+                             'Connection: Upgrade\r\n'
+                             'Sec-WebSocket-Accept: %s\r\n\r\n' % accept)
+
+    def read_loop(self, closed):
+        """收客户端的订阅消息, 回应ping, 收到close或者断开时设置closed"""
+        try:
+            while not closed.is_set():
+                opcode, payload = read_frame(self.request)
+                if opcode == OP_CLOSE:
+                    break
+                if opcode == OP_PING:
+                    self.send(payload, OP_PONG)
+                elif opcode == OP_TEXT:
+                    self.server.on_received(payload)
+        except Exception as e:
+            logging.debug("replay server read: %s" % e)
+        closed.set()
+
+    def send(self, payload, opcode=OP_TEXT):
+        with self.send_lock:
+            self.request.sendall(encode_frame(payload, opcode))
+
+    def handle(self):
+        self.send_lock = threading.Lock()
+        self.handshake()
+        self.server.on_connected()
+
+        closed = threading.Event()
+        reader = threading.Thread(target=self.read_loop, args=(closed,))
+        reader.daemon = True
+        reader.start()
+
+        try:
+            for frame in self.server.frames:
+                if closed.wait(frame.get('delay', 0)) or self.server.is_stopped:
+                    return
+                if frame.get('close'):
+                    return
+                data = frame.get('data')
+                if not isinstance(data, basestring):
+                    data = json.dumps(data)
+                self.send(data)
+            # 消息发完后保持连接, 直到客户端断开或者服务停止
+            while not closed.wait(0.1) and not self.server.is_stopped:
+                pass
+        except socket.error as e:
+            logging.debug("replay server send: %s" % e)
+        finally:
+            closed.set()
+            try:
+                self.send('', OP_CLOSE)
+            except socket.error:
+                pass
+
+
+class ReplayServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, frames, host='127.0.0.1', port=0):
+        SocketServer.TCPServer.__init__(self, (host, port), ReplayHandler)
+        self.frames = frames
+        self.port = self.server_address[1]
+        self.is_stopped = False
+        self.thread = None
+        # 连接次数和收到的客户端消息, 用来检查重连和订阅
+        self.connections = 0
+        self.received = []
+
+    @property
+    def url(self):
+        return 'ws://%s:%s' % self.server_address
+
+    def on_connected(self):
+        self.connections += 1
+
+    def on_received(self, payload):
+        self.received.append(payload)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.1})
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.is_stopped = True
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='replay recorded websocket frames')
+    parser.add_argument('frames', help='json lines file, {"delay": seconds, "data": message} per line')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    server = ReplayServer(load_frames(args.frames), args.host, args.port)
+    print('replaying %s frames on %s' % (len(server.frames), server.url))
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
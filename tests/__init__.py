@@ -0,0 +1,15 @@
+# -*- coding: UTF-8 -*-
+
+"""
+python -m unittest discover -s tests -t .
+
+quant.config用decouple读交易所的key, 测试不连交易所, 没有设置时给空值
+"""
+
+import os
+
+for _key in ('KKEX_API_KEY', 'KKEX_API_SECRET', 'BFX_API_KEY', 'BFX_API_SECRET', 'BFX_SUB_API_KEY',
+             'BFX_SUB_API_SECRET', 'BITTREX_API_KEY', 'BITTREX_API_SECRET', 'LIQUI_API_KEY', 'LIQUI_API_SECRET',
+             'GATE_API_KEY', 'GATE_API_SECRET', 'BINANCE_API_KEY', 'BINANCE_API_SECRET', 'BITHUMB_API_KEY',
+             'BITHUMB_API_SECRET', 'EMAIL_PASSWORD_163'):
+    os.environ.setdefault(_key, '')
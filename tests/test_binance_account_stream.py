@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+
+import time
+import unittest
+
+from quant import config
+from quant.brokers import _binance
+from quant.markets import streaming_market
+from quant.tool.ws_replay_server import ReplayServer
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.listen_keys = []
+
+    def stream_get_listen_key(self):
+        self.listen_keys.append('key%s' % len(self.listen_keys))
+        return self.listen_keys[-1]
+
+    def stream_keepalive(self, listenKey):
+        pass
+
+
+class FakeBroker(object):
+    name = 'Binance'
+
+    def __init__(self):
+        self.client = FakeClient()
+
+
+def execution_report(order_id, status, executed):
+    return {'e': 'executionReport', 'i': order_id, 'q': '1.0', 'p': '0.1', 'z': executed, 's': 'BCCBTC',
+            'S': 'BUY', 'X': status, 'Z': str(float(executed) * 0.1)}
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+@unittest.skipIf(streaming_market.websocket is None, 'websocket-client is not installed')
+class BinanceAccountStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.reconnect_delay = config.STREAM_RECONNECT_DELAY
+        config.STREAM_RECONNECT_DELAY = 0.1
+        self.stream_url = _binance.STREAM_URL
+        self.server = None
+        self.stream = None
+
+    def tearDown(self):
+        if self.stream:
+            self.stream.stop()
+        if self.server:
+            self.server.stop()
+        config.STREAM_RECONNECT_DELAY = self.reconnect_delay
+        _binance.STREAM_URL = self.stream_url
+
+    def start(self, frames):
+        self.server = ReplayServer(frames)
+        self.server.start()
+        _binance.STREAM_URL = self.server.url + '/'
+        broker = FakeBroker()
+        self.stream = _binance.BinanceAccountStream(broker)
+        self.stream.start()
+        return broker.client
+
+    def test_listen_key_expired_renews(self):
+        client = self.start([
+            {'delay': 0.05, 'data': execution_report(1, 'NEW', '0.0')},
+            {'delay': 0.05, 'data': {'e': 'listenKeyExpired', 'E': 1}},
+        ])
+        self.assertTrue(wait_until(lambda: self.server.connections >= 2))
+        self.assertTrue(wait_until(lambda: self.stream.is_ready()))
+        self.assertGreaterEqual(len(client.listen_keys), 2)
+        self.assertTrue(self.stream.connection.url.endswith(self.stream.listen_key))
+        self.assertNotEqual(self.stream.listen_key, 'key0')
+
+    def test_disconnect_renews(self):
+        client = self.start([
+            {'delay': 0.05, 'data': execution_report(2, 'NEW', '0.0')},
+            {'delay': 0.05, 'close': True},
+        ])
+        self.assertTrue(wait_until(lambda: len(client.listen_keys) >= 2 and self.server.connections >= 2))
+        # 重连后未完成的订单先被清掉, 等新连接重新推送
+        self.assertTrue(wait_until(lambda: self.stream.store.get(2) is not None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: UTF-8 -*-
+
+import unittest
+
+from quant.markets._bitfinex import BitfinexStream, book_checksum, format_number
+
+# 盘口和交易所推送的checksum, 对应的字符串是
+# 6461.5:0.5:6462.3:-0.1:6461.4:1.2:6462.4:-2:6461:1.5e-7
+BIDS = [(6461.5, 0.5), (6461.4, 1.2), (6461, 0.00000015)]
+ASKS = [(6462.3, 0.1), (6462.4, 2.0)]
+CHECKSUM = 1128523422
+
+
+class FormatNumberTest(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(format_number(6461.5), '6461.5')
+        self.assertEqual(format_number(-0.1), '-0.1')
+        self.assertEqual(format_number(0.01), '0.01')
+
+    def test_trailing_zero(self):
+        self.assertEqual(format_number(6461.0), '6461')
+        self.assertEqual(format_number(-2.0), '-2')
+        self.assertEqual(format_number(0), '0')
+
+    def test_exponent(self):
+        # Number.toString在1e-7以下和1e21以上用指数
+        self.assertEqual(format_number(0.000001), '0.000001')
+        self.assertEqual(format_number(0.00000015), '1.5e-7')
+        self.assertEqual(format_number(-0.0000001), '-1e-7')
+        self.assertEqual(format_number(1e20), '100000000000000000000')
+        self.assertEqual(format_number(1e21), '1e+21')
+
+
+class BookChecksumTest(unittest.TestCase):
+    def test_known_book(self):
+        self.assertEqual(book_checksum(BIDS, ASKS), CHECKSUM)
+
+    def test_only_first_levels(self):
+        bids = [(100 - i, 1) for i in range(30)]
+        asks = [(101 + i, 1) for i in range(30)]
+        self.assertEqual(book_checksum(bids, asks), 386775164)
+        self.assertEqual(book_checksum(bids[:25], asks[:25]), 386775164)
+
+
+class VerifyChecksumTest(unittest.TestCase):
+    def setUp(self):
+        self.market = BitfinexStream('btcusd')
+        self.market.chan_id = 7
+        levels = [[price, 1, amount] for price, amount in BIDS] + [[price, 1, -amount] for price, amount in ASKS]
+        self.market.handle_message([7, levels])
+
+    def test_matching_checksum(self):
+        self.market.handle_message([7, 'cs', CHECKSUM])
+        self.assertTrue(self.market.synced)
+        self.assertEqual(self.market.stream_stats['checksum_errors'], 0)
+
+    def test_mismatch_resyncs(self):
+        # 删掉一档后checksum对不上
+        self.market.handle_message([7, [6461.4, 0, 1]])
+        self.market.handle_message([7, 'cs', CHECKSUM])
+        self.assertFalse(self.market.synced)
+        self.assertEqual(self.market.stream_stats['checksum_errors'], 1)
+        self.assertEqual(self.market.stream_stats['resyncs'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
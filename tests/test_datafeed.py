@@ -0,0 +1,40 @@
+# -*- coding: UTF-8 -*-
+
+import time
+import unittest
+
+from quant import config
+from quant.datafeed import DataFeed
+from quant.markets.depth_snapshot import BookEntry, DepthSnapshot
+from quant.markets.market_factory import create_markets
+from quant.markets.order_book import OrderBook
+
+
+def make_entry(name, age, seq=1):
+    now = time.time()
+    depth = OrderBook.from_levels([(1, 1)], [(2, 1)])
+    return BookEntry(name, depth, now - age, now - age, seq)
+
+
+class ExpiredDepthsTest(unittest.TestCase):
+    def setUp(self):
+        # 不读config.markets/observers, 只用到markets和depths
+        self.feed = DataFeed.__new__(DataFeed)
+        markets = create_markets(['Liqui_BCC_BTC', 'Liqui_BCC_ETH'])
+        self.feed.markets = list(markets.values())
+
+    def test_remove_expired_depths(self):
+        stale = make_entry('Liqui_BCC_BTC', config.market_expiration_time + 1)
+        fresh = make_entry('Liqui_BCC_ETH', 0)
+        self.feed.depths = DepthSnapshot({stale.name: stale, fresh.name: fresh})
+        self.assertEqual(self.feed.remove_expired_depths(), ['Liqui_BCC_BTC'])
+        self.assertEqual(list(self.feed.depths), ['Liqui_BCC_ETH'])
+
+    def test_unknown_market_removed(self):
+        entry = make_entry('Kraken_C_D', 0)
+        self.feed.depths = DepthSnapshot({entry.name: entry})
+        self.assertEqual(self.feed.remove_expired_depths(), ['Kraken_C_D'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: UTF-8 -*-
+
+import unittest
+
+import requests
+
+from quant.api import http_pool
+from quant.common import single_flight
+from quant.markets.market_factory import create_markets
+from quant.markets.market_scheduler import MarketScheduler
+
+
+class FakeMarket(object):
+    def __init__(self, name):
+        self.name = name
+        self.update_rate = 1
+
+
+class MarketSchedulerTest(unittest.TestCase):
+    def test_unchanged_backs_off_to_max_interval(self):
+        # 盘口不变时间隔一直拉长到max_interval, 过期的盘口由DataFeed丢掉, 不靠调度器
+        scheduler = MarketScheduler(min_interval=0.5, max_interval=10)
+        market = FakeMarket('Liqui_BCC_BTC')
+        intervals = []
+        for _ in range(20):
+            scheduler.on_success(market, False, now=0)
+            intervals.append(scheduler.get_interval(market))
+        self.assertEqual(intervals, sorted(intervals))
+        self.assertEqual(intervals[-1], 10)
+
+    def test_changed_shrinks_to_min_interval(self):
+        scheduler = MarketScheduler(min_interval=0.5, max_interval=10)
+        market = FakeMarket('Liqui_BCC_BTC')
+        for _ in range(20):
+            scheduler.on_success(market, True, now=0)
+        self.assertEqual(scheduler.get_interval(market), 0.5)
+
+
+
+class StatusSession(object):
+    """所有请求都返回status_code"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = url
+        return response
+
+
+class ThrottleBackoffTest(unittest.TestCase):
+    def setUp(self):
+        self.get_session = http_pool._pool.get_session
+        # 上一个测试的结果还在SINGLE_FLIGHT_FRESHNESS内, 会被直接复用
+        single_flight._group.calls.clear()
+
+    def tearDown(self):
+        http_pool._pool.get_session = self.get_session
+
+    def fail_with(self, status_code):
+        http_pool._pool.get_session = lambda url: StatusSession(status_code)
+        market = create_markets(['Liqui_BCC_BTC'])['Liqui_BCC_BTC']
+        scheduler = MarketScheduler(min_interval=0.5, max_backoff=60)
+        interval = scheduler.get_interval(market)
+        self.assertFalse(market.ask_update_depth())
+        scheduler.on_failure(market, market.last_error, now=0)
+        return market, scheduler.get_interval(market) / interval
+
+    def test_429_backs_off_harder(self):
+        # liqui的client对非200只返回None, status code要靠http_pool带出来
+        market, factor = self.fail_with(429)
+        self.assertEqual(market.last_error.status_code, 429)
+        self.assertEqual(factor, 4)
+
+    def test_503_backs_off_harder(self):
+        market, factor = self.fail_with(503)
+        self.assertEqual(factor, 4)
+
+    def test_404_normal_backoff(self):
+        market, factor = self.fail_with(404)
+        self.assertIsInstance(market.last_error, ValueError)
+        self.assertEqual(factor, 2)
+
+    def test_client_outside_fetch_returns_none(self):
+        # 不在拉取depth的路径上(比如broker), client的行为不变
+        http_pool._pool.get_session = lambda url: StatusSession(429)
+        market = create_markets(['Liqui_BCC_BTC'])['Liqui_BCC_BTC']
+        self.assertIsNone(market.client.depth(market.pair_code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+
+import time
+import unittest
+
+from quant import config
+from quant.common import constant
+from quant.brokers import order_store, order_tracker
+from quant.brokers.broker import Broker
+
+
+class FakeBroker(Broker):
+    def __init__(self, batch=False):
+        super(FakeBroker, self).__init__('btc', 'bch', 'bchbtc')
+        self.batch_orders = batch
+        self.order_store = order_store.OrderStore(self.name)
+        self.deal_amount = 0
+        self.requests = 0
+
+    def make_order(self, order_id):
+        return {'order_id': order_id, 'amount': 1, 'price': 0.1, 'deal_amount': self.deal_amount,
+                'avg_price': 0.1, 'status': constant.ORDER_STATE_PENDING}
+
+    def _get_order(self, order_id, order_type=None):
+        self.requests += 1
+        return self.make_order(order_id)
+
+    def _get_orders(self, order_ids):
+        self.requests += 1
+        return [self.make_order(x) for x in order_ids]
+
+
+class ManualTracker(order_tracker.OrderTracker):
+    """不启动后台线程, 测试里直接调用poll"""
+
+    def ensure_thread(self):
+        pass
+
+
+class OrderTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ManualTracker()
+        self.min_interval = config.ORDER_TRACKER_MIN_INTERVAL
+        self.calls = []
+
+    def track(self, broker, order_id):
+        tracked = self.tracker.track(broker, order_id, callback=self.calls.append)
+        # 订单存在时间足够长, 间隔不受ORDER_TRACKER_AGE_RATIO限制
+        tracked.created = time.time() - 1000
+        return tracked
+
+    def poll_intervals(self, broker, tracked, count):
+        intervals = []
+        for _ in range(count):
+            self.tracker.poll(broker, [tracked])
+            intervals.append(tracked.interval)
+        return intervals
+
+    def test_unchanged_order_backs_off(self):
+        # get_order会写OrderStore并触发listener, 每次查询也只能处理一次
+        broker = FakeBroker()
+        tracked = self.track(broker, 1)
+        intervals = self.poll_intervals(broker, tracked, 3)
+        self.assertEqual(intervals, [self.min_interval, 2 * self.min_interval, 4 * self.min_interval])
+        self.assertEqual(tracked.polls, 3)
+        self.assertEqual(broker.requests, 3)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_batch_unchanged_order_backs_off(self):
+        broker = FakeBroker(batch=True)
+        tracked = self.track(broker, 1)
+        intervals = self.poll_intervals(broker, tracked, 3)
+        self.assertEqual(intervals, [self.min_interval, 2 * self.min_interval, 4 * self.min_interval])
+        self.assertEqual(tracked.polls, 3)
+
+    def test_fill_resets_interval(self):
+        broker = FakeBroker()
+        tracked = self.track(broker, 1)
+        self.poll_intervals(broker, tracked, 3)
+        broker.deal_amount = 0.5
+        self.assertEqual(self.poll_intervals(broker, tracked, 2), [self.min_interval, 2 * self.min_interval])
+        self.assertEqual([x['deal_amount'] for x in self.calls], [0, 0.5])
+
+    def test_failed_poll_backs_off(self):
+        broker = FakeBroker()
+
+        def poll_orders(orders):
+            raise IOError('exchange down')
+        broker.poll_orders = poll_orders
+        tracked = self.track(broker, 1)
+        intervals = self.poll_intervals(broker, tracked, 3)
+        self.assertEqual(intervals, [2 * self.min_interval, 4 * self.min_interval, 8 * self.min_interval])
+        intervals = self.poll_intervals(broker, tracked, 10)
+        self.assertEqual(intervals[-1], config.ORDER_TRACKER_MAX_INTERVAL)
+        self.assertGreater(tracked.next_poll, time.time() + self.min_interval)
+        self.assertEqual(tracked.polls, 0)
+
+    def test_done_order_untracked(self):
+        broker = FakeBroker()
+        tracked = self.track(broker, 1)
+        broker.order_store.update({'order_id': 1, 'deal_amount': 1, 'status': constant.ORDER_STATE_CLOSED})
+        self.assertEqual(tracked.order['status'], constant.ORDER_STATE_CLOSED)
+        self.assertNotIn((broker, '1'), self.tracker.orders)
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+
+import unittest
+
+from quant import config
+from quant.common import rate_limiter
+
+
+class MarketLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.limiters = dict(rate_limiter._limiters)
+        rate_limiter._limiters.clear()
+
+    def tearDown(self):
+        rate_limiter._limiters.clear()
+        rate_limiter._limiters.update(self.limiters)
+
+    def test_separate_market_bucket(self):
+        market = rate_limiter.get_market_limiter('Bitfinex')
+        private = rate_limiter.get_limiter('Bitfinex')
+        self.assertIsNot(market, private)
+        self.assertEqual(market.rate, config.EXCHANGE_MARKET_RATE_LIMIT['Bitfinex'] / 60.)
+        self.assertIs(rate_limiter.get_market_limiter('Bitfinex'), market)
+
+        # 行情把自己的桶用完, 不影响下单和账户查询
+        while market.try_acquire(rate_limiter.PRIORITY_MARKET):
+            pass
+        self.assertEqual(market.stats[rate_limiter.PRIORITY_MARKET].acquired, market.burst)
+        self.assertTrue(private.try_acquire(rate_limiter.PRIORITY_ACCOUNT))
+        self.assertTrue(private.try_acquire(rate_limiter.PRIORITY_TRADE))
+
+    def test_shared_bucket(self):
+        self.assertNotIn('Liqui', config.EXCHANGE_MARKET_RATE_LIMIT)
+        self.assertIs(rate_limiter.get_market_limiter('Liqui'), rate_limiter.get_limiter('Liqui'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+
+import threading
+import time
+import unittest
+
+from quant.api import http_pool
+from quant.common.single_flight import SingleFlight
+
+
+class SingleFlightDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.group = SingleFlight(freshness=0)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.results = []
+
+    def slow(self):
+        self.started.set()
+        self.release.wait(5)
+        return 'depth'
+
+    def start_leader(self):
+        thread = threading.Thread(target=lambda: self.results.append(self.group.do('depth', self.slow)))
+        thread.daemon = True
+        thread.start()
+        self.assertTrue(self.started.wait(5))
+        return thread
+
+    def test_follower_times_out_at_deadline(self):
+        leader = self.start_leader()
+        begin = time.time()
+        with http_pool.deadline(0.1):
+            self.assertRaises(http_pool.DeadlineExceeded, self.group.do, 'depth', self.slow)
+        self.assertLess(time.time() - begin, 1)
+        self.assertEqual(self.group.get_stats(), {'executed': 1, 'shared': 1, 'timeouts': 1})
+
+        # 领头的请求不受影响
+        self.release.set()
+        leader.join(5)
+        self.assertEqual(self.results, ['depth'])
+
+    def test_follower_without_deadline_waits_for_result(self):
+        leader = self.start_leader()
+        threading.Timer(0.1, self.release.set).start()
+        self.assertEqual(self.group.do('depth', self.slow), 'depth')
+        leader.join(5)
+        self.assertEqual(self.group.get_stats()['timeouts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import time
+import unittest
+
+from quant import config
+from quant.markets import streaming_market
+from quant.markets.streaming_market import StreamingMarket
+from quant.tool.ws_replay_server import ReplayServer
+
+
+class ReplayMarket(StreamingMarket):
+    """推送里带快照, 序号和binance一样是U/u"""
+
+    def __init__(self, url):
+        super(ReplayMarket, self).__init__('BTC', 'ETH', 'ethbtc', 0.001)
+        self.name = 'Replay_ETH_BTC'
+        self.ws_url = url
+
+    def get_subscribe_messages(self):
+        return [{'op': 'subscribe', 'symbol': self.pair_code}]
+
+    def handle_message(self, message):
+        if message['type'] == 'snapshot':
+            self.apply_snapshot(message['b'], message['a'], message['seq'])
+        else:
+            self.apply_diff(message['b'], message['a'], message['U'], message['u'])
+
+
+class RestSnapshotMarket(ReplayMarket):
+    """推送里没有快照, 从REST接口拉取, 每次拉到的快照序号更新一些"""
+    snapshot_from_rest = True
+
+    def __init__(self, url, snapshots):
+        super(RestSnapshotMarket, self).__init__(url)
+        self.snapshots = list(snapshots)
+
+    def fetch_snapshot(self):
+        return self.snapshots.pop(0)
+
+
+def snapshot(seq, bids, asks, delay=0.05):
+    return {'delay': delay, 'data': {'type': 'snapshot', 'seq': seq, 'b': bids, 'a': asks}}
+
+
+def diff(first_seq, last_seq, bids, asks, delay=0.05):
+    return {'delay': delay, 'data': {'type': 'diff', 'U': first_seq, 'u': last_seq, 'b': bids, 'a': asks}}
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+@unittest.skipIf(streaming_market.websocket is None, 'websocket-client is not installed')
+class StreamingMarketReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.reconnect_delay = config.STREAM_RECONNECT_DELAY
+        config.STREAM_RECONNECT_DELAY = 0.1
+        self.server = None
+        self.market = None
+
+    def tearDown(self):
+        if self.market:
+            self.market.stop()
+        if self.server:
+            self.server.stop()
+        config.STREAM_RECONNECT_DELAY = self.reconnect_delay
+
+    def start(self, frames, market_class=ReplayMarket, *args):
+        self.server = ReplayServer(frames)
+        self.server.start()
+        self.market = market_class(self.server.url, *args)
+        self.market.start()
+        return self.market
+
+    def test_snapshot_and_diffs(self):
+        market = self.start([
+            snapshot(10, [[99, 1], [98, 2]], [[101, 1], [102, 2]]),
+            # 比快照旧, 丢弃
+            diff(5, 9, [[97, 5]], []),
+            diff(11, 12, [[99, 0], [99.5, 3]], [[100.5, 1]]),
+        ])
+        self.assertTrue(wait_until(lambda: market.last_seq == 12))
+        depth = market.get_depth()
+        self.assertEqual(depth.bids.prices.tolist(), [99.5, 98])
+        self.assertEqual(depth.asks.prices.tolist(), [100.5, 101, 102])
+        self.assertIs(market.book_entry.depth, market.depth)
+
+    def test_gap_resubscribes(self):
+        market = self.start([
+            snapshot(10, [[99, 1]], [[101, 1]]),
+            diff(11, 12, [[99.5, 1]], []),
+            # 13, 14丢了
+            diff(15, 16, [[99.8, 1]], []),
+        ])
+        self.assertTrue(wait_until(lambda: market.stream_stats['gaps'] == 1))
+        self.assertEqual(market.stream_stats['resyncs'], 1)
+        self.assertFalse(market.synced)
+        self.assertRaises(ValueError, market.update_depth)
+        self.assertFalse(market.ask_update_depth())
+        # 推送快照的交易所重新订阅拿新的快照
+        self.assertTrue(wait_until(lambda: len(self.server.received) == 2))
+        self.assertEqual([json.loads(x)['op'] for x in self.server.received], ['subscribe', 'subscribe'])
+
+    def test_gap_reloads_rest_snapshot(self):
+        market = self.start([
+            diff(11, 12, [[99.5, 1]], [], delay=0.2),
+            # 13丢了
+            diff(14, 15, [[99.8, 1]], []),
+            diff(16, 16, [], [[100.5, 1]], delay=0.3),
+        ], RestSnapshotMarket, [([[99, 1]], [[101, 1]], 10), ([[99.8, 1]], [[101, 1]], 15)])
+        self.assertTrue(wait_until(lambda: market.stream_stats['gaps'] == 1))
+        self.assertTrue(wait_until(lambda: market.last_seq == 16))
+        self.assertEqual(market.stream_stats['snapshots'], 2)
+        self.assertEqual(market.depth.bids.prices.tolist(), [99.8])
+        self.assertEqual(market.depth.asks.prices.tolist(), [100.5, 101])
+
+    def test_disconnect_resets_book(self):
+        market = self.start([
+            snapshot(10, [[99, 1]], [[101, 1]]),
+            {'delay': 0.1, 'close': True},
+        ])
+        self.assertTrue(wait_until(lambda: self.server.connections >= 2))
+        self.assertGreaterEqual(market.stream_stats['disconnects'], 1)
+        self.assertTrue(wait_until(lambda: market.synced))
+
+
+if __name__ == '__main__':
+    unittest.main()